@@ -2,13 +2,14 @@ import ast
 import copy
 import os
 import pathlib
-from typing import Any, Dict, Iterable, Optional, Union
+from typing import Any, Dict, Iterable, List, Optional, Union
 
 import requests
 import yaml
 
 from .cli_constants import BUILD_DIR
 from .cli_utils import echo_error, echo_info, echo_warning
+from .io_utils import write_if_changed
 
 
 class AirbyteError(Exception):
@@ -54,11 +55,7 @@ class AirbyteFactory:
 
         return workspaces[0].get("workspaceId")
 
-    def create_update_connections(self) -> None:
-        """Create and update Airbyte connections defined in config yaml file"""
-        if not self.airbyte_config["connections"]:
-            return
-
+    def _get_workspace_id(self) -> str:
         workspace_id = self.airbyte_config.get("workspace_id")
         if workspace_id is None:
             echo_warning(
@@ -66,6 +63,36 @@ class AirbyteFactory:
                 "fetching the default one from Airbyte deployment"
             )
             workspace_id = self.get_default_workspace_id()
+        return workspace_id
+
+    def plan_connections(self) -> Dict[str, List[str]]:
+        """
+        Check which Airbyte connections defined in config yaml file would
+        be created and which updated, without changing anything.
+
+        :return: Names of connections to ``create`` and to ``update``
+        :rtype: Dict[str, List[str]]
+        """
+        plan: Dict[str, List[str]] = {"create": [], "update": []}
+        if not self.airbyte_config["connections"]:
+            return plan
+
+        existing_connections = self.request_handler(
+            "connections/list", data={"workspaceId": self._get_workspace_id()}
+        )["connections"]
+        for connection_config in self.airbyte_config["connections"].values():
+            if self._find_matching_connections(connection_config, existing_connections):
+                plan["update"].append(connection_config["name"])
+            else:
+                plan["create"].append(connection_config["name"])
+        return plan
+
+    def create_update_connections(self) -> None:
+        """Create and update Airbyte connections defined in config yaml file"""
+        if not self.airbyte_config["connections"]:
+            return
+
+        workspace_id = self._get_workspace_id()
 
         for connection in self.airbyte_config["connections"]:
             self.create_update_connection(
@@ -78,7 +105,10 @@ class AirbyteFactory:
 
         self.update_file(self.airbyte_config)
 
-    def create_update_connection(self, connection_config: Dict[str, Any], workspace_id: str) -> Any:
+    @staticmethod
+    def _find_matching_connections(
+        connection_config: Dict[str, Any], connections: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
         def configs_equal(
             conf_a: Dict[str, Any], conf_b: Dict[str, Any], equality_fields: Iterable[str]
         ) -> bool:
@@ -86,12 +116,6 @@ class AirbyteFactory:
             conn_b = {k: v for k, v in conf_b.items() if k in equality_fields}
             return conn_a == conn_b
 
-        connection_config_copy = copy.deepcopy(connection_config)
-
-        response_search = self.request_handler(
-            "connections/list", data={"workspaceId": workspace_id}
-        )
-
         equality_fields = [
             "sourceId",
             "destinationId",
@@ -99,12 +123,23 @@ class AirbyteFactory:
             "namespaceFormat",
         ]
 
-        matching_connections = [
+        return [
             connection
-            for connection in response_search["connections"]
-            if configs_equal(connection_config_copy, connection, equality_fields)
+            for connection in connections
+            if configs_equal(connection_config, connection, equality_fields)
         ]
 
+    def create_update_connection(self, connection_config: Dict[str, Any], workspace_id: str) -> Any:
+        connection_config_copy = copy.deepcopy(connection_config)
+
+        response_search = self.request_handler(
+            "connections/list", data={"workspaceId": workspace_id}
+        )
+
+        matching_connections = self._find_matching_connections(
+            connection_config_copy, response_search["connections"]
+        )
+
         if not matching_connections:
             echo_info(f"Creating connection config for {connection_config_copy['name']}")
             response_create = self.request_handler(
@@ -125,8 +160,7 @@ class AirbyteFactory:
         os.environ[response_update["name"]] = response_update["connectionId"]
 
     def update_file(self, updated_config: Dict[str, Any]) -> None:
-        with open(self.airbyte_config_path, "w") as airbyte_config_file:
-            yaml.safe_dump(updated_config, airbyte_config_file)
+        write_if_changed(self.airbyte_config_path, yaml.safe_dump(updated_config))
 
     def request_handler(
         self, endpoint: str, data: Optional[Dict[str, Any]] = None
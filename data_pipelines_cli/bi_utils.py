@@ -3,6 +3,7 @@ from typing import Any, Dict, Optional, Tuple
 
 from .cli_constants import BUILD_DIR
 from .cli_utils import echo_info
+from .command_context import CommandContext
 from .config_generation import read_dictionary_from_config_directory
 from .errors import DataPipelinesError, NotSuppertedBIError
 from .looker_utils import deploy_lookML_model, generate_lookML_model
@@ -13,20 +14,28 @@ class BiAction(Enum):
     DEPLOY = 2
 
 
-def read_bi_config(env: str) -> Dict[str, Any]:
+def read_bi_config(env: str, context: Optional[CommandContext] = None) -> Dict[str, Any]:
     """
     Read BI configuration.
 
     :param env: Name of the environment
     :type env: str
+    :param context: Context of the running command, if any
+    :type context: Optional[CommandContext]
     :return: Compiled dictionary
     :rtype: Dict[str, Any]
     """
+    if context is not None:
+        return context.read_config("bi.yml")
     return read_dictionary_from_config_directory(BUILD_DIR.joinpath("dag"), env, "bi.yml")
 
 
 def _bi_looker(
-    env: str, generate_code: bool, deploy: bool = False, key_path: Optional[str] = None
+    env: str,
+    generate_code: bool,
+    deploy: bool = False,
+    key_path: Optional[str] = None,
+    context: Optional[CommandContext] = None,
 ) -> None:
     if generate_code:
         echo_info("Generating Looker codes")
@@ -39,10 +48,15 @@ def _bi_looker(
                 "Error raised when pushing Looker code. No repository key provided. "
                 "Provide key using '--bi-git-key-path' option or disable BI in bi.yml"
             )
-        deploy_lookML_model(key_path, env)
+        deploy_lookML_model(key_path, env, context)
 
 
-def bi(env: str, bi_action: BiAction, key_path: Optional[str] = None) -> None:
+def bi(
+    env: str,
+    bi_action: BiAction,
+    key_path: Optional[str] = None,
+    context: Optional[CommandContext] = None,
+) -> None:
     """
     Generate and deploy BI codes using dbt compiled data.
 
@@ -52,9 +66,11 @@ def bi(env: str, bi_action: BiAction, key_path: Optional[str] = None) -> None:
     :type env: BiAction
     :param key_path: Path to the key with write access to git repository
     :type env: str
+    :param context: Context of the running command, if any
+    :type context: Optional[CommandContext]
     :raises NotSuppertedBIError: Not supported bi in bi.yml configuration
     """
-    bi_config = read_bi_config(env)
+    bi_config = read_bi_config(env, context)
 
     if not bi_config.get("is_bi_enabled", False):
         echo_info("BI is disabled")
@@ -63,7 +79,7 @@ def bi(env: str, bi_action: BiAction, key_path: Optional[str] = None) -> None:
     if bi_config["bi_target"] == "looker":
         echo_info("Running BI...")
         compile, deploy = _prepare_bi_parameters(bi_action, bi_config)
-        _bi_looker(env, compile, deploy, key_path)
+        _bi_looker(env, compile, deploy, key_path, context)
     else:
         raise NotSuppertedBIError()
 
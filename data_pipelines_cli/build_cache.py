@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pathlib
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+from importlib import metadata
+from typing import Any, Dict, Optional, Set
+
+import fsspec
+
+from .cli_utils import echo_info, echo_subinfo, echo_warning
+from .docker_build_context import list_build_context_files
+
+#: Local artifacts that are outputs of the build, not its inputs
+BUILD_CACHE_KEY_EXCLUDES = [".git", "build", "dbt_packages", "logs", "target"]
+_BUILD_CACHE_KEY_VERSION = "2"
+#: Names of environment variables read by dbt and `dp` Jinja templates
+_ENV_VAR_REGEX = re.compile(rb"""env_var\(\s*['"]([^'"]+)['"]""")
+
+
+def _package_version(package_name: str) -> str:
+    try:
+        return metadata.version(package_name)
+    except metadata.PackageNotFoundError:
+        return "not installed"
+
+
+def compute_build_cache_key(
+    project_path: pathlib.Path, env: str, dbt_vars: Dict[str, Any], adapter_type: str
+) -> str:
+    """
+    Hash everything the outputs of dbt commands depend on.
+
+    The key covers the paths and contents of project files (including the
+    ``config`` directory, but not the :data:`BUILD_CACHE_KEY_EXCLUDES`), the
+    name of the environment, dbt variables, and versions of dbt and its
+    adapter. Environment variables referenced in the files with
+    ``env_var(...)`` (e.g. a BigQuery project in ``config/<env>`` or a
+    schema in models) are covered as well, by their names and hashes of
+    their current values.
+
+    :param project_path: Path to the project
+    :type project_path: pathlib.Path
+    :param env: Name of the environment
+    :type env: str
+    :param dbt_vars: Variables passed to dbt
+    :type dbt_vars: Dict[str, Any]
+    :param adapter_type: Type of the dbt adapter, e.g. `bigquery`
+    :type adapter_type: str
+    :return: SHA-256 hash of the inputs
+    :rtype: str
+    """
+    files_hash = hashlib.sha256()
+    env_var_names: Set[str] = set()
+    for file in list_build_context_files(project_path, exclude=BUILD_CACHE_KEY_EXCLUDES):
+        file_path = project_path.joinpath(file)
+        if not file_path.is_file():
+            continue
+        content = file_path.read_bytes()
+        env_var_names.update(
+            name.decode("utf-8", "replace") for name in _ENV_VAR_REGEX.findall(content)
+        )
+        files_hash.update(f"\0{file}\0{hashlib.sha256(content).hexdigest()}".encode("utf-8"))
+
+    header = {
+        "version": _BUILD_CACHE_KEY_VERSION,
+        "env": env,
+        "vars": dbt_vars,
+        "env_vars": {
+            # Only hashes of the values, as they may be secrets
+            name: hashlib.sha256(os.environ[name].encode("utf-8")).hexdigest()
+            if name in os.environ
+            else None
+            for name in sorted(env_var_names)
+        },
+        "dbt": _package_version("dbt-core"),
+        "adapter": adapter_type,
+        "adapter_version": _package_version(f"dbt-{adapter_type}"),
+    }
+    key_hash = hashlib.sha256(json.dumps(header, sort_keys=True, default=str).encode("utf-8"))
+    key_hash.update(files_hash.digest())
+    return key_hash.hexdigest()
+
+
+def _extract_all(archive: tarfile.TarFile, path: pathlib.Path) -> None:
+    # Extraction filters are available in security releases since Python 3.9.17
+    if hasattr(tarfile, "data_filter"):
+        archive.extractall(path, filter="data")
+        return
+    for member in archive.getmembers():
+        if member.name.startswith("/") or ".." in pathlib.PurePosixPath(member.name).parts:
+            raise tarfile.TarError(f"Unsafe path in the archive: {member.name}")
+    archive.extractall(path)
+
+
+class BuildCache:
+    """
+    Remote cache of dbt artifacts, addressed by :func:`compute_build_cache_key`.
+
+    Every entry is a single `tar.gz` archive named after its key, so entries
+    are never modified, and any fsspec filesystem (e.g. `file://` for a local
+    directory) can hold them.
+    """
+
+    uri: str
+    """URI of the directory holding the cache entries"""
+
+    def __init__(self, uri: str, storage_options: Optional[Dict[str, Any]] = None) -> None:
+        self.uri = uri.rstrip("/")
+        self._fs, self._path = fsspec.core.url_to_fs(self.uri, **(storage_options or {}))
+
+    def _entry_path(self, key: str) -> str:
+        return f"{self._path}/{key}.tar.gz"
+
+    def restore(self, key: str, directory: pathlib.Path) -> bool:
+        """
+        Replace *directory* with the contents of the *key* entry, if it exists.
+
+        :param key: Key of the entry
+        :type key: str
+        :param directory: Directory to restore, e.g. ``target``
+        :type directory: pathlib.Path
+        :return: Whether the entry got restored
+        :rtype: bool
+        """
+        entry_path = self._entry_path(key)
+        if not self._fs.exists(entry_path):
+            echo_info(f"Build cache miss for key {key}")
+            return False
+
+        start_time = time.perf_counter()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            archive_path = pathlib.Path(tmp_dir).joinpath("entry.tar.gz")
+            extracted_path = pathlib.Path(tmp_dir).joinpath("entry")
+            try:
+                self._fs.get_file(entry_path, str(archive_path))
+                with tarfile.open(archive_path, "r:gz") as archive:
+                    _extract_all(archive, extracted_path)
+            except (OSError, EOFError, tarfile.TarError) as err:
+                echo_warning(f"Could not restore build cache entry {entry_path}: {err}")
+                return False
+            if directory.exists():
+                shutil.rmtree(directory)
+            shutil.move(str(extracted_path), str(directory))
+            size = archive_path.stat().st_size
+
+        echo_info(f"Build cache hit for key {key}")
+        echo_subinfo(
+            f"Restored {directory.name} from {self.uri}: downloaded {size} bytes "
+            f"in {time.perf_counter() - start_time:.2f} s"
+        )
+        return True
+
+    def save(self, key: str, directory: pathlib.Path) -> None:
+        """
+        Upload contents of *directory* as the *key* entry. Failures are only
+        reported, as the cache is not needed for the build to succeed.
+
+        :param key: Key of the entry
+        :type key: str
+        :param directory: Directory to save, e.g. ``target``
+        :type directory: pathlib.Path
+        """
+        start_time = time.perf_counter()
+        entry_path = self._entry_path(key)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            archive_path = pathlib.Path(tmp_dir).joinpath("entry.tar.gz")
+            with tarfile.open(archive_path, "w:gz") as archive:
+                archive.add(directory, arcname=".")
+            try:
+                self._fs.makedirs(self._path, exist_ok=True)
+                self._fs.put_file(str(archive_path), entry_path)
+            except OSError as err:
+                echo_warning(f"Could not save build cache entry {entry_path}: {err}")
+                return
+            size = archive_path.stat().st_size
+
+        echo_subinfo(
+            f"Saved {directory.name} to {self.uri}: uploaded {size} bytes "
+            f"in {time.perf_counter() - start_time:.2f} s"
+        )
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import pathlib
+import tarfile
+import tempfile
+import time
+from typing import IO, Any, Dict, Iterator, Optional, Set, Union
+
+import fsspec
+
+from .cli_utils import echo_info, echo_subinfo
+from .errors import DataPipelinesError, DependencyNotInstalledError
+from .filesystem_utils import UploadSettings, split_upload_kwargs
+
+BUNDLE_FILE_NAMES = {"gzip": "dag_bundle.tar.gz", "zstd": "dag_bundle.tar.zst"}
+"""Names of the bundle objects, by their compression"""
+BUNDLE_INDEX_FILE_NAME = "dag_bundle.index.json"
+"""Name of the object describing the bundle, uploaded after the bundle itself"""
+
+
+def _import_zstandard() -> Any:
+    try:
+        import zstandard
+    except ModuleNotFoundError:
+        raise DependencyNotInstalledError("zstd")
+    return zstandard
+
+
+@contextlib.contextmanager
+def _compressing_writer(fileobj: IO[bytes], compression: str) -> Iterator[Any]:
+    if compression == "zstd":
+        with _import_zstandard().ZstdCompressor().stream_writer(fileobj, closefd=False) as writer:
+            yield writer
+    else:
+        # Fixed mtime keeps the bundle identical for unchanged files
+        with gzip.GzipFile(fileobj=fileobj, mode="wb", mtime=0) as writer:
+            yield writer
+
+
+@contextlib.contextmanager
+def _decompressing_reader(fileobj: IO[bytes], compression: str) -> Iterator[Any]:
+    if compression == "zstd":
+        with _import_zstandard().ZstdDecompressor().stream_reader(fileobj) as reader:
+            yield reader
+    else:
+        with gzip.GzipFile(fileobj=fileobj, mode="rb") as reader:
+            yield reader
+
+
+class _HashingReader:
+    """Wraps a binary file, hashing everything read out of it."""
+
+    def __init__(self, fileobj: IO[bytes]) -> None:
+        self._fileobj = fileobj
+        self.hash = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._fileobj.read(size)
+        self.hash.update(chunk)
+        return chunk
+
+
+def create_bundle(
+    local_path: Union[str, os.PathLike[str]], fileobj: IO[bytes], compression: str = "gzip"
+) -> Dict[str, Any]:
+    """
+    Pack every file of *local_path* into a compressed tarball.
+
+    The tarball is deterministic: files are sorted, and their owners and
+    modification times are reset.
+
+    :param local_path: Directory to pack
+    :type local_path: Union[str, os.PathLike[str]]
+    :param fileobj: Binary file to write the bundle to
+    :type fileobj: IO[bytes]
+    :param compression: One of the keys of :data:`BUNDLE_FILE_NAMES`
+    :type compression: str
+    :return: Index of the bundle: its compression, and sizes and SHA-256 \
+        hashes of the files, by their paths relative to *local_path*
+    :rtype: Dict[str, Any]
+    :raises DependencyNotInstalledError: `zstd` compression requested, but \
+        `zstandard` is not installed
+    """
+    local_path = pathlib.Path(local_path)
+    files: Dict[str, Dict[str, Any]] = {}
+    with _compressing_writer(fileobj, compression) as writer, tarfile.open(
+        fileobj=writer, mode="w|", format=tarfile.PAX_FORMAT
+    ) as tar:
+        for file_path in sorted(path for path in local_path.rglob("*") if path.is_file()):
+            file = file_path.relative_to(local_path).as_posix()
+            tar_info = tar.gettarinfo(str(file_path), arcname=file)
+            tar_info.mtime = 0
+            tar_info.uid = tar_info.gid = 0
+            tar_info.uname = tar_info.gname = ""
+            with open(file_path, "rb") as f:
+                reader = _HashingReader(f)
+                tar.addfile(tar_info, fileobj=reader)
+            files[file] = {"size": tar_info.size, "sha256": reader.hash.hexdigest()}
+    return {"compression": compression, "files": files}
+
+
+def unpack_bundle(
+    remote_path: str,
+    destination_path: str,
+    remote_kwargs: Optional[Dict[str, Any]] = None,
+    destination_kwargs: Optional[Dict[str, Any]] = None,
+    delete: bool = True,
+) -> Dict[str, Any]:
+    """
+    Unpack bundle uploaded by :class:`LocalRemoteBundleSync` into separate files.
+
+    Meant to be used by the DAG loader (e.g. to fill a local DAG folder out
+    of the bucket) or by a job running next to the bucket, as *destination_path*
+    can be any fsspec URI. Every file is verified against the index.
+
+    :param remote_path: URI of the directory holding the bundle and its index
+    :type remote_path: str
+    :param destination_path: URI of the directory to unpack the files to
+    :type destination_path: str
+    :param remote_kwargs: Arguments of the filesystem of *remote_path*
+    :type remote_kwargs: Optional[Dict[str, Any]]
+    :param destination_kwargs: Arguments of the filesystem of *destination_path*
+    :type destination_kwargs: Optional[Dict[str, Any]]
+    :param delete: Whether to remove files of *destination_path* that are \
+        not in the bundle
+    :type delete: bool
+    :return: Index of the bundle
+    :rtype: Dict[str, Any]
+    :raises DataPipelinesError: Bundle does not match its index
+    :raises DependencyNotInstalledError: `zstd` compressed bundle, but \
+        `zstandard` is not installed
+    """
+    remote_fs, remote_path_str = fsspec.core.url_to_fs(
+        remote_path.rstrip("/"), **split_upload_kwargs(remote_kwargs or {})[0]
+    )
+    destination_fs, destination_path_str = fsspec.core.url_to_fs(
+        destination_path.rstrip("/"), **(destination_kwargs or {})
+    )
+    index = json.loads(remote_fs.cat_file(f"{remote_path_str}/{BUNDLE_INDEX_FILE_NAME}"))
+
+    unpacked_files = set()
+    with remote_fs.open(f"{remote_path_str}/{index['bundle']}", "rb") as bundle_file:
+        with _decompressing_reader(bundle_file, index["compression"]) as reader, tarfile.open(
+            fileobj=reader, mode="r|"
+        ) as tar:
+            for member in tar:
+                file_info = index["files"].get(member.name)
+                extracted_file = tar.extractfile(member)
+                if file_info is None or extracted_file is None:
+                    raise DataPipelinesError(f"Unexpected {member.name} in the bundle")
+                file_reader = _HashingReader(extracted_file)
+                destination_file_path = f"{destination_path_str}/{member.name}"
+                destination_fs.makedirs(destination_file_path.rsplit("/", 1)[0], exist_ok=True)
+                with destination_fs.open(destination_file_path, "wb") as destination_file:
+                    for chunk in iter(lambda: file_reader.read(1 << 20), b""):
+                        destination_file.write(chunk)
+                if file_reader.hash.hexdigest() != file_info["sha256"]:
+                    raise DataPipelinesError(f"{member.name} does not match the bundle index")
+                unpacked_files.add(member.name)
+
+    missing_files = set(index["files"]) - unpacked_files
+    if missing_files:
+        raise DataPipelinesError(f"Files missing in the bundle: {', '.join(sorted(missing_files))}")
+    if delete and destination_fs.exists(destination_path_str):
+        for existing_file in destination_fs.find(destination_path_str):
+            if existing_file[len(destination_path_str) + 1 :] not in unpacked_files:
+                destination_fs.rm(existing_file)
+    return index
+
+
+class LocalRemoteBundleSync:
+    """
+    Sends local directory to a cloud storage as a single compressed bundle.
+
+    Instead of one object per file, the storage gets the bundle and a small
+    JSON index (see :func:`create_bundle`), uploaded in this order, so the
+    index always describes a complete bundle. Use :func:`unpack_bundle` to
+    get the files back.
+    """
+
+    local_path: pathlib.Path
+    """Path to local directory"""
+    remote_path_str: str
+    """Path/URI of the cloud storage directory"""
+    compression: str
+    """One of the keys of :data:`BUNDLE_FILE_NAMES`"""
+    upload_settings: UploadSettings
+    """Parameters of the upload of the bundle, from the ``upload`` provider kwarg"""
+
+    def __init__(
+        self,
+        local_path: Union[str, os.PathLike[str]],
+        remote_path: str,
+        remote_kwargs: Dict[str, Any],
+        compression: str = "gzip",
+    ) -> None:
+        if not pathlib.Path(local_path).exists():
+            raise DataPipelinesError(f"{local_path} does not exists. Run 'dp compile' before.")
+
+        self.local_path = pathlib.Path(local_path)
+        fs_kwargs, self.upload_settings = split_upload_kwargs(remote_kwargs)
+        self.remote_fs, self.remote_path_str = fsspec.core.url_to_fs(
+            remote_path.rstrip("/"), **fs_kwargs
+        )
+        self.compression = compression
+
+    def sync(self, delete: bool = True) -> None:
+        """
+        Send the bundle and its index to the remote directory and
+        (optionally) delete other files.
+
+        :param delete: Whether to delete remote files other than the bundle \
+        and its index, e.g. left by a file by file sync
+        :type delete: bool
+        """
+        bundle_name = BUNDLE_FILE_NAMES[self.compression]
+        start_time = time.perf_counter()
+        with tempfile.TemporaryFile() as bundle_file:
+            index = create_bundle(self.local_path, bundle_file, self.compression)
+            bundle_size = bundle_file.tell()
+            bundle_file.seek(0)
+            index["bundle"] = bundle_name
+            reader = _HashingReader(bundle_file)
+            for _ in iter(lambda: reader.read(1 << 20), b""):
+                pass
+            index["bundle_sha256"] = reader.hash.hexdigest()
+            bundle_file.seek(0)
+            files_size = sum(file["size"] for file in index["files"].values())
+            echo_info(
+                f"Packed {len(index['files'])} files ({files_size} bytes) into "
+                f"{bundle_name} ({bundle_size} bytes)"
+            )
+
+            echo_subinfo(f"- Pushing {bundle_name} to {self.remote_path_str}")
+            # Remote filesystems upload big files in parts of `block_size` on their own
+            part_size = self.upload_settings.part_size_for(bundle_size)
+            with self.remote_fs.open(
+                f"{self.remote_path_str}/{bundle_name}", "wb", block_size=part_size
+            ) as remote_file:
+                for chunk in iter(lambda: bundle_file.read(part_size), b""):
+                    remote_file.write(chunk)
+        self.remote_fs.pipe_file(
+            f"{self.remote_path_str}/{BUNDLE_INDEX_FILE_NAME}",
+            json.dumps(index, indent=2, sort_keys=True).encode("utf-8"),
+        )
+        echo_subinfo(f"Uploaded the bundle in {time.perf_counter() - start_time:.2f} s")
+
+        if delete:
+            self._delete({bundle_name, BUNDLE_INDEX_FILE_NAME})
+
+    def plan(self, delete: bool = True) -> Dict[str, Any]:
+        """
+        Compute what :meth:`sync` would do, without sending or deleting anything.
+
+        :param delete: Whether other remote files would be deleted
+        :type delete: bool
+        :return: Plan in the format of :meth:`.LocalRemoteSync.plan`; the \
+            size of the bundle is the size of the files before compression
+        :rtype: Dict[str, Any]
+        """
+        bundle_name = BUNDLE_FILE_NAMES[self.compression]
+        files_size = sum(
+            path.stat().st_size for path in self.local_path.rglob("*") if path.is_file()
+        )
+        kept_files = {bundle_name, BUNDLE_INDEX_FILE_NAME}
+        remote_files = (
+            self.remote_fs.find(self.remote_path_str, detail=True)
+            if delete and self.remote_fs.exists(self.remote_path_str)
+            else {}
+        )
+        return {
+            "upload": {f"/{bundle_name}": files_size},
+            "delete": {
+                remote_file[len(self.remote_path_str) :]: info.get("size") or 0
+                for remote_file, info in remote_files.items()
+                if remote_file[len(self.remote_path_str) + 1 :] not in kept_files
+            },
+            "large_files": [f"/{bundle_name}"]
+            if files_size >= self.upload_settings.multipart_threshold
+            else [],
+        }
+
+    def _delete(self, kept_files: Set[str]) -> None:
+        for remote_file in self.remote_fs.find(self.remote_path_str):
+            if remote_file[len(self.remote_path_str) + 1 :] not in kept_files:
+                self.remote_fs.rm(remote_file)
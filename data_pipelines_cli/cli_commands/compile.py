@@ -1,32 +1,88 @@
+import io
 import json
 import pathlib
 import shutil
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import click
 import yaml
 
 from ..bi_utils import BiAction, bi
+from ..build_cache import BuildCache, compute_build_cache_key
 from ..cli_configs import find_datahub_config_file
 from ..cli_constants import BUILD_DIR, IMAGE_TAG_TO_REPLACE
-from ..cli_utils import echo_info, echo_warning
+from ..cli_utils import echo_info, echo_subinfo, echo_warning
+from ..command_context import CommandContext
 from ..config_generation import (
     copy_config_dir_to_build_dir,
     copy_dag_dir_to_build_dir,
     generate_profiles_yml,
+    write_resolved_config,
 )
 from ..data_structures import DockerArgs
 from ..dbt_utils import read_dbt_vars_from_configs, run_dbt_command
-from ..docker_response_reader import DockerResponseReader
+from ..docker_build_context import create_build_context
+from ..docker_response_reader import DockerBuildStageTimer, DockerResponseReader
 from ..errors import DockerErrorResponseError, DockerNotInstalledError
-from ..io_utils import replace
-from ..jinja import replace_vars_with_values
+from ..io_utils import (
+    git_ancestor_revision_hashes,
+    git_revision_hash,
+    read_json_or_yaml,
+    replace,
+    write_if_changed,
+)
+from ..jinja import render_templated_tree
+from ..manifest_utils import (
+    SLIM_MANIFEST_FILE_NAMES,
+    build_slim_manifest,
+    write_slim_manifest,
+)
+
+
+def _pull_cache_images(
+    docker_client: Any, docker_args: DockerArgs, cache_from_ancestors: int
+) -> List[str]:
+    import docker.errors
+
+    cache_from = []
+    for image in docker_args.cache_from:
+        try:
+            docker_client.images.pull(image)
+        except docker.errors.APIError as err:
+            # The image may still be available locally
+            echo_warning(f"Could not pull cache image {image}: {err}")
+        cache_from.append(image)
+
+    # Images built out of previous commits are pushed with their hashes as tags
+    for revision_hash in git_ancestor_revision_hashes(cache_from_ancestors):
+        image = f"{docker_args.repository}:{revision_hash}"
+        try:
+            docker_client.images.pull(image)
+        except docker.errors.APIError:
+            continue
+        cache_from.append(image)
+        break
 
+    for image in cache_from:
+        echo_subinfo(f"Using {image} as a build cache source")
+    return cache_from
 
-def _docker_build(docker_args: DockerArgs) -> None:
+
+def _docker_build_labels(docker_args: DockerArgs) -> Dict[str, str]:
+    labels = {}
+    revision_hash = git_revision_hash()
+    if revision_hash:
+        labels["org.opencontainers.image.revision"] = revision_hash
+    labels.update(docker_args.labels)
+    return labels
+
+
+def _docker_build(docker_args: DockerArgs, cache_from_ancestors: int = 0) -> None:
     """
     :param docker_args: Arguments required by the Docker to make a push to \
         the repository
+    :param cache_from_ancestors: Number of ancestor Git revisions whose images \
+        to look for in the repository to use as a build cache
     :raises DataPipelinesError: Docker not installed
     """
     try:
@@ -38,14 +94,33 @@ def _docker_build(docker_args: DockerArgs) -> None:
     echo_info("Building Docker image")
     docker_client = docker.from_env()
     docker_tag = docker_args.docker_build_tag()
+    cache_from = _pull_cache_images(docker_client, docker_args, cache_from_ancestors)
+    build_context = create_build_context(pathlib.Path.cwd())
+    echo_subinfo(
+        f"Prepared build context: {build_context.files_count} files, "
+        f"{build_context.size / 1_000_000:.1f} MB in {build_context.elapsed:.2f} s"
+    )
     try:
         _, logs_generator = docker_client.images.build(
-            path=".", tag=docker_tag, buildargs=docker_args.build_args
+            fileobj=build_context.fileobj,
+            custom_context=True,
+            tag=docker_tag,
+            buildargs=docker_args.build_args,
+            cache_from=cache_from or None,
+            target=docker_args.target,
+            labels=_docker_build_labels(docker_args),
         )
-        DockerResponseReader(logs_generator).click_echo_ok_responses()
+        stage_timer = DockerBuildStageTimer()
+        for response in DockerResponseReader(logs_generator).iter_ok_responses():
+            click.echo(response.msg)
+            stage_timer.update(response.msg)
+        for stage_name, elapsed in stage_timer.finish():
+            echo_subinfo(f"Built stage {stage_name} in {elapsed:.2f} s")
     except docker.errors.BuildError as err:
         build_log = "\n".join([str(log) for log in err.build_log])
         raise DockerErrorResponseError(f"{err.msg}\n{build_log}")
+    finally:
+        build_context.fileobj.close()
 
 
 def _dbt_compile(env: str) -> None:
@@ -57,18 +132,54 @@ def _dbt_compile(env: str) -> None:
     run_dbt_command(("source", "freshness"), env, profiles_path)
 
 
-def _copy_dbt_manifest() -> None:
+def _dbt_compile_with_cache(
+    env: str, context: CommandContext, build_cache: Optional[BuildCache]
+) -> None:
+    if build_cache is None:
+        _dbt_compile(env)
+        return
+
+    target_path = pathlib.Path.cwd().joinpath("target")
+    cache_key = compute_build_cache_key(
+        pathlib.Path.cwd(),
+        env,
+        read_dbt_vars_from_configs(env),
+        context.read_config("dbt.yml")["target_type"],
+    )
+    if build_cache.restore(cache_key, target_path):
+        # Later steps still need the profile, even if dbt does not run
+        generate_profiles_yml(env, False)
+        return
+    _dbt_compile(env)
+    build_cache.save(cache_key, target_path)
+
+
+def _copy_dbt_manifest(slim_manifest_encoding: str = "json") -> None:
     echo_info("Copying DBT manifest")
-    shutil.copyfile(
-        pathlib.Path.cwd().joinpath("target", "manifest.json"),
-        BUILD_DIR.joinpath("dag", "manifest.json"),
+    manifest_path = BUILD_DIR.joinpath("dag", "manifest.json")
+    shutil.copyfile(pathlib.Path.cwd().joinpath("target", "manifest.json"), manifest_path)
+
+    echo_info("Writing slim DBT manifest")
+    slim_manifest_path = write_slim_manifest(
+        build_slim_manifest(manifest_path), BUILD_DIR.joinpath("dag"), slim_manifest_encoding
+    )
+    for file_name in SLIM_MANIFEST_FILE_NAMES.values():
+        # Left by builds using other encodings
+        if file_name != slim_manifest_path.name:
+            BUILD_DIR.joinpath("dag", file_name).unlink(missing_ok=True)
+    manifest_size = manifest_path.stat().st_size
+    slim_manifest_size = slim_manifest_path.stat().st_size
+    echo_subinfo(
+        f"{slim_manifest_path.name}: {slim_manifest_size / 1024:.1f} KiB, "
+        f"{manifest_size / 1024:.1f} KiB for {manifest_path.name} "
+        f"({slim_manifest_size / max(manifest_size, 1):.1%} of the size)"
     )
 
 
 def replace_image_settings(image_tag: str) -> None:
     k8s_config = BUILD_DIR.joinpath("dag", "config", "base", "execution_env.yml")
     echo_info(f"Replacing {IMAGE_TAG_TO_REPLACE} with image tag = {image_tag}")
-    replace(k8s_config, IMAGE_TAG_TO_REPLACE, image_tag)
+    replace(k8s_config, IMAGE_TAG_TO_REPLACE, image_tag, literal=True)
 
 
 def _replace_datahub_with_jinja_vars(env: str) -> None:
@@ -82,12 +193,23 @@ def _replace_datahub_with_jinja_vars(env: str) -> None:
         return
 
     echo_info(f"Replacing Jinja variables in {datahub_config_path}.")
+    templated_paths: Dict[str, float] = {}
     with open(datahub_config_path, "r") as datahub_config_file:
-        updated_config = replace_vars_with_values(
-            yaml.safe_load(datahub_config_file), read_dbt_vars_from_configs(env)
+        updated_config = render_templated_tree(
+            yaml.safe_load(datahub_config_file), read_dbt_vars_from_configs(env), templated_paths
         )
-    with open(datahub_config_path, "w") as datahub_config_file:
-        yaml.dump(updated_config, datahub_config_file)
+    for templated_path, render_time in templated_paths.items():
+        echo_subinfo(f"- Rendered {templated_path} in {render_time * 1000:.2f} ms")
+    if not write_if_changed(datahub_config_path, yaml.dump(updated_config)):
+        echo_subinfo(f"{datahub_config_path} is up to date")
+
+
+def _write_resolved_config(env: str) -> None:
+    echo_info(f"Writing resolved config snapshot for {env} environment")
+    config_hash = write_resolved_config(
+        BUILD_DIR.joinpath("dag"), env, read_dbt_vars_from_configs(env)
+    )
+    echo_subinfo(f"Config hash: {config_hash}")
 
 
 def compile_project(
@@ -95,6 +217,13 @@ def compile_project(
     docker_tag: Optional[str] = None,
     docker_build: bool = False,
     docker_build_args: Optional[Dict[str, str]] = None,
+    docker_cache_from: Optional[List[str]] = None,
+    docker_cache_from_ancestors: int = 0,
+    docker_target: Optional[str] = None,
+    docker_labels: Optional[Dict[str, str]] = None,
+    slim_manifest_encoding: str = "json",
+    build_cache_uri: Optional[str] = None,
+    build_cache_kwargs: Optional[Dict[str, Any]] = None,
 ) -> None:
     """
     Create local working directories and build artifacts.
@@ -105,25 +234,69 @@ def compile_project(
     :type docker_tag: Optional[str]
     :param docker_build: Whether to build a Docker image
     :type docker_build: bool
+    :param docker_build_args: Docker build arguments
+    :type docker_build_args: Optional[Dict[str, str]]
+    :param docker_cache_from: Images to use as sources of the build cache
+    :type docker_cache_from: Optional[List[str]]
+    :param docker_cache_from_ancestors: Number of ancestor Git revisions whose \
+        images to look for in the repository to use as a build cache
+    :type docker_cache_from_ancestors: int
+    :param docker_target: Name of the build stage to build
+    :type docker_target: Optional[str]
+    :param docker_labels: Labels to set on the built image
+    :type docker_labels: Optional[Dict[str, str]]
+    :param slim_manifest_encoding: Encoding of the slim manifest written next \
+        to `manifest.json`, one of `json`, `gzip` or `msgpack`
+    :type slim_manifest_encoding: str
+    :param build_cache_uri: URI of the remote cache of dbt artifacts. dbt \
+        does not run if the cache holds artifacts built out of the same inputs
+    :type build_cache_uri: Optional[str]
+    :param build_cache_kwargs: Arguments of the cache's filesystem, e.g. \
+        credentials
+    :type build_cache_kwargs: Optional[Dict[str, Any]]
     :param bi_build: Whether to generate a BI codes
     :raises DataPipelinesError:
     """
     copy_dag_dir_to_build_dir()
     copy_config_dir_to_build_dir()
 
-    docker_args = DockerArgs(env, docker_tag, docker_build_args or {})
+    context = CommandContext(env, BUILD_DIR)
+    docker_args = context.docker_args(
+        docker_tag,
+        docker_build_args,
+        cache_from=docker_cache_from,
+        target=docker_target,
+        labels=docker_labels,
+    )
 
     replace_image_settings(docker_args.image_tag or "Empty")
 
     _replace_datahub_with_jinja_vars(env)
+    _write_resolved_config(env)
 
-    _dbt_compile(env)
-    _copy_dbt_manifest()
+    _dbt_compile_with_cache(
+        env,
+        context,
+        BuildCache(build_cache_uri, build_cache_kwargs) if build_cache_uri else None,
+    )
+    _copy_dbt_manifest(slim_manifest_encoding)
 
     if docker_build:
-        _docker_build(docker_args)
+        _docker_build(docker_args, docker_cache_from_ancestors)
+
+    bi(env, BiAction.COMPILE, context=context)
 
-    bi(env, BiAction.COMPILE)
+
+def _parse_docker_labels(docker_labels: Sequence[str]) -> Dict[str, str]:
+    labels = {}
+    for label in docker_labels:
+        key, separator, value = label.partition("=")
+        if not separator or not key:
+            raise click.BadParameter(
+                f"'{label}' is not in KEY=VALUE format", param_hint="'--docker-label'"
+            )
+        labels[key] = value
+    return labels
 
 
 @click.command(
@@ -150,10 +323,72 @@ def compile_project(
 @click.option(
     "--docker-args", type=str, required=False, help="Args required to build project in json format"
 )
+@click.option(
+    "--docker-cache-from",
+    type=str,
+    multiple=True,
+    help="Image to use as a source of the build cache. Can be repeated",
+)
+@click.option(
+    "--docker-cache-from-ancestors",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Number of ancestor commits whose images to look for in the repository "
+    "to use as a build cache",
+)
+@click.option(
+    "--docker-target", type=str, required=False, help="Build stage of the Dockerfile to build"
+)
+@click.option(
+    "--docker-label",
+    type=str,
+    multiple=True,
+    help="Label to set on the image, in KEY=VALUE format. Can be repeated",
+)
+@click.option(
+    "--slim-manifest-encoding",
+    type=click.Choice(list(SLIM_MANIFEST_FILE_NAMES)),
+    default="json",
+    show_default=True,
+    help="Encoding of the slim DBT manifest written for the DAG builder",
+)
+@click.option(
+    "--build-cache",
+    type=str,
+    required=False,
+    help="URI of the remote cache of dbt artifacts, e.g. gs://bucket/dp-cache or file:///tmp/cache",
+)
+@click.option(
+    "--build-cache-args",
+    type=click.File("r"),
+    required=False,
+    help="Path to JSON or YAML file with arguments that should be passed to "
+    "the filesystem of the build cache",
+)
 def compile_project_command(
     env: str,
     docker_build: bool,
     docker_tag: Optional[str],
     docker_args: Optional[str],
+    docker_cache_from: Tuple[str, ...],
+    docker_cache_from_ancestors: int,
+    docker_target: Optional[str],
+    docker_label: Tuple[str, ...],
+    slim_manifest_encoding: str,
+    build_cache: Optional[str],
+    build_cache_args: Optional[io.TextIOWrapper],
 ) -> None:
-    compile_project(env, docker_tag, docker_build, json.loads(docker_args or "{}"))
+    compile_project(
+        env,
+        docker_tag,
+        docker_build,
+        json.loads(docker_args or "{}"),
+        list(docker_cache_from),
+        docker_cache_from_ancestors,
+        docker_target,
+        _parse_docker_labels(docker_label),
+        slim_manifest_encoding,
+        build_cache,
+        read_json_or_yaml(build_cache_args) if build_cache_args else None,
+    )
@@ -1,18 +1,28 @@
 import io
-import json
-from typing import Any, Dict, Optional, cast
+from typing import Any, Dict, List, Optional, Tuple, cast
 
 import click
-import yaml
+import requests
 
 from ..airbyte_utils import AirbyteFactory
 from ..bi_utils import BiAction, bi
+from ..bundle_utils import BUNDLE_FILE_NAMES, LocalRemoteBundleSync
 from ..cli_configs import find_datahub_config_file
 from ..cli_constants import BUILD_DIR
-from ..cli_utils import echo_error, echo_info, subprocess_run
-from ..config_generation import read_dictionary_from_config_directory
+from ..cli_utils import (
+    echo_error,
+    echo_info,
+    echo_subinfo,
+    echo_warning,
+    subprocess_run,
+)
+from ..command_context import CommandContext
+from ..config_generation import RESOLVED_CONFIG_FILE_NAME, write_resolved_config
 from ..data_structures import DockerArgs
-from ..docker_response_reader import DockerResponseReader
+from ..dbt_utils import read_dbt_vars_from_configs
+from ..deploy_versions import VersionedRemoteSync
+from ..docker_registry import DockerRegistry, image_platform
+from ..docker_response_reader import DockerProgressAggregator, DockerResponseReader
 from ..errors import (
     AirflowDagsPathKeyError,
     DataPipelinesError,
@@ -20,7 +30,16 @@ from ..errors import (
     DockerErrorResponseError,
     DockerNotInstalledError,
 )
-from ..filesystem_utils import LocalRemoteSync
+from ..filesystem_utils import (
+    SYNC_JOURNAL_FILE_NAME,
+    THROUGHPUT_HISTORY_FILE_NAME,
+    LocalRemoteSync,
+    estimate_upload_duration,
+)
+from ..io_utils import git_ancestor_revision_hashes, read_json_or_yaml
+
+#: Number of ancestor Git revisions whose images the plan compares layers with
+_PLAN_DOCKER_ANCESTORS = 5
 
 
 class DeployCommand:
@@ -42,6 +61,20 @@ class DeployCommand:
     """Authorization OIDC ID token for a service account to communication with Airbyte instance"""
     disable_bucket_sync: bool
     """Whether to disable bucket sync with artefacts"""
+    context: CommandContext
+    """State shared by all the deployment steps"""
+    bundle_compression: Optional[str]
+    """Compression of the single bundle to send build artifacts in, or
+    ``None`` to send them file by file"""
+    versioned: bool
+    """Whether to deploy build artifacts as an immutable version, see
+    :class:`.VersionedRemoteSync`"""
+    keep_versions: int
+    """Number of most recently deployed versions to keep"""
+    rollback_version: Optional[str]
+    """Already deployed version to switch back to, instead of deploying"""
+    plan: bool
+    """Whether to only print what the deployment would do, see :meth:`print_plan`"""
 
     def __init__(
         self,
@@ -53,37 +86,57 @@ class DeployCommand:
         bi_git_key_path: str,
         auth_token: Optional[str],
         disable_bucket_sync: bool,
+        bundle_compression: Optional[str] = None,
+        versioned: bool = False,
+        keep_versions: int = 5,
+        rollback_version: Optional[str] = None,
+        plan: bool = False,
     ) -> None:
-        self.docker_args = DockerArgs(env, None, {}) if docker_push else None
+        if bundle_compression and versioned:
+            raise DataPipelinesError(
+                "Cannot deploy a bundle as a version.",
+                submessage="A version is loaded by Airflow straight from its DAG files, "
+                "while a bundle has to be unpacked first. Use either --bundle or --versioned.",
+            )
+        self.context = CommandContext(env, BUILD_DIR)
+        self.docker_args = self.context.docker_args() if docker_push else None
         self.datahub_ingest = datahub_ingest
         self.provider_kwargs_dict = provider_kwargs_dict or {}
         self.env = env
         self.bi_git_key_path = bi_git_key_path
         self.auth_token = auth_token
         self.disable_bucket_sync = disable_bucket_sync
+        self.bundle_compression = bundle_compression
+        self.versioned = versioned
+        self.keep_versions = keep_versions
+        self.rollback_version = rollback_version
+        self.plan = plan
 
         try:
             self.blob_address_path = (
-                dags_path
-                or read_dictionary_from_config_directory(
-                    BUILD_DIR.joinpath("dag"),
-                    env,
-                    "airflow.yml",
-                )["dags_path"]
+                dags_path or self.context.read_config("airflow.yml")["dags_path"]
             )
         except KeyError as key_error:
             raise AirflowDagsPathKeyError from key_error
 
-        self.enable_ingest = read_dictionary_from_config_directory(
-            BUILD_DIR.joinpath("dag"), env, "ingestion.yml"
-        ).get("enable", False)
+        self.enable_ingest = self.context.read_config("ingestion.yml").get("enable", False)
 
     def deploy(self) -> None:
         """Push and deploy the project to the remote machine.
 
         :raises DependencyNotInstalledError: DataHub or Docker not installed
-        :raises DataPipelinesError: Error while pushing Docker image
+        :raises DataPipelinesError: Error while pushing Docker image, or \
+            version to roll back to does not exist
         """
+        if self.plan:
+            self.print_plan()
+            return
+
+        if self.rollback_version:
+            echo_info(f"Rolling back to version {self.rollback_version}")
+            self._versioned_sync().rollback(self.rollback_version)
+            return
+
         if self.docker_args:
             self._docker_push()
 
@@ -98,8 +151,137 @@ class DeployCommand:
         if not self.disable_bucket_sync:
             self._bucket_sync()
 
+    def print_plan(self) -> None:
+        """
+        Print what :meth:`deploy` would do, without changing anything: files
+        to upload and delete, Docker layers missing in the registry and
+        Airbyte connections to create or update, with an estimate of the
+        upload duration based on throughput measured by previous deployments.
+
+        :raises DockerNotInstalledError: Docker not installed
+        """
+        echo_info("Deployment plan (nothing gets changed)")
+        if self.rollback_version:
+            echo_subinfo(f"Switch to already uploaded version {self.rollback_version}")
+            return
+        if self.docker_args:
+            self._plan_docker_push()
+        if self.datahub_ingest:
+            echo_subinfo("Ingest DataHub metadata")
+        if self.enable_ingest:
+            self._plan_enable_ingest()
+        if not self.disable_bucket_sync:
+            self._plan_bucket_sync()
+
+    def _plan_docker_push(self) -> None:
+        try:
+            import docker
+        except ModuleNotFoundError:
+            raise DockerNotInstalledError()
+
+        docker_client = docker.from_env()
+        docker_args = cast(DockerArgs, self.docker_args)
+        docker_tag = docker_args.docker_build_tag()
+        if self._get_pushed_image_digest(docker_client, docker_args):
+            echo_subinfo(f"Docker image {docker_tag} is already present in the registry")
+            return
+        try:
+            image = docker_client.images.get(docker_tag)
+        except docker.errors.APIError:
+            echo_subinfo(f"Docker image {docker_tag} does not exist locally")
+            return
+        layers = image.attrs.get("RootFS", {}).get("Layers", [])
+        summary = f"Push Docker image {docker_tag} ({image.attrs.get('Size', 0)} bytes)"
+        try:
+            compared_image, registry_layers = self._get_registry_image_layers(
+                docker_args, image_platform(image.attrs)
+            )
+        except (requests.RequestException, ValueError, KeyError) as err:
+            echo_warning(f"Could not read layers of earlier images from the registry: {err}")
+            echo_subinfo(f"{summary}: {len(layers)} layers, unknown how many are in the registry")
+            return
+        if compared_image is None:
+            echo_subinfo(
+                f"{summary}: {len(layers)} layers, no earlier image in the registry to compare with"
+            )
+            return
+        missing_layers = [layer for layer in layers if layer not in registry_layers]
+        echo_subinfo(
+            f"{summary}: {len(missing_layers)} of {len(layers)} layers not in {compared_image} "
+            "in the registry"
+        )
+
+    @staticmethod
+    def _get_registry_image_layers(
+        docker_args: DockerArgs, platform: Dict[str, str]
+    ) -> Tuple[Optional[str], List[str]]:
+        """
+        Read layers of the image the new one most likely shares layers with
+        from the registry: the image of the nearest ancestor Git revision
+        present there, as images get tagged with revision hashes.
+        """
+        registry = DockerRegistry(docker_args.repository)
+        for revision_hash in git_ancestor_revision_hashes(_PLAN_DOCKER_ANCESTORS):
+            layers = registry.get_image_layers(revision_hash, platform)
+            if layers is not None:
+                return f"{docker_args.repository}:{revision_hash}", layers
+        return None, []
+
+    def _plan_enable_ingest(self) -> None:
+        connections_plan = AirbyteFactory(
+            airbyte_config_path=AirbyteFactory.find_config_file(self.env, "airbyte"),
+            auth_token=self.auth_token,
+        ).plan_connections()
+        for action in ("create", "update"):
+            for connection_name in connections_plan[action]:
+                echo_subinfo(f"{action.capitalize()} Airbyte connection {connection_name}")
+
+    def _plan_bucket_sync(self) -> None:
+        journal_path = BUILD_DIR.joinpath(SYNC_JOURNAL_FILE_NAME)
+        if self.versioned:
+            sync_plan = self._versioned_sync().plan(BUILD_DIR.joinpath("dag"), journal_path)
+            echo_subinfo(f"Upload version {sync_plan['version']} and switch to it")
+        elif self.bundle_compression:
+            sync_plan = LocalRemoteBundleSync(
+                BUILD_DIR.joinpath("dag"),
+                self.blob_address_path,
+                self.provider_kwargs_dict,
+                self.bundle_compression,
+            ).plan(delete=True)
+        else:
+            sync_plan = LocalRemoteSync(
+                BUILD_DIR.joinpath("dag"),
+                self.blob_address_path,
+                self.provider_kwargs_dict,
+                journal_path=journal_path,
+            ).plan(delete=True)
+
+        for action in ("upload", "delete"):
+            for path, size in sorted(sync_plan[action].items()):
+                echo_subinfo(f"- {action.capitalize()} {path.lstrip('/')} ({size} bytes)")
+            echo_subinfo(
+                f"{action.capitalize()} {len(sync_plan[action])} files "
+                f"({sum(sync_plan[action].values())} bytes) "
+                f"{'to' if action == 'upload' else 'from'} {self.blob_address_path}"
+            )
+
+        large_files = set(sync_plan["large_files"])
+        files = {
+            path: size for path, size in sync_plan["upload"].items() if path not in large_files
+        }
+        duration = estimate_upload_duration(
+            BUILD_DIR.joinpath(THROUGHPUT_HISTORY_FILE_NAME),
+            len(files),
+            sum(files.values()),
+            sum(sync_plan["upload"][path] for path in large_files),
+        )
+        if duration is None:
+            echo_subinfo("No upload throughput measured by previous deployments to estimate from")
+        else:
+            echo_subinfo(f"Estimated upload duration: {duration:.1f} s")
+
     def _bi_push(self) -> None:
-        bi(self.env, BiAction.DEPLOY, self.bi_git_key_path)
+        bi(self.env, BiAction.DEPLOY, self.bi_git_key_path, self.context)
 
     def _docker_push(self) -> None:
         """
@@ -111,10 +293,19 @@ class DeployCommand:
         except ModuleNotFoundError:
             raise DockerNotInstalledError()
 
-        echo_info("Pushing Docker image")
         docker_client = docker.from_env()
         docker_args = cast(DockerArgs, self.docker_args)
 
+        pushed_digest = self._get_pushed_image_digest(docker_client, docker_args)
+        if pushed_digest:
+            echo_info(
+                f"Docker image {docker_args.docker_build_tag()} is already present "
+                f"in the registry ({pushed_digest}), skipping the push"
+            )
+            return
+
+        echo_info("Pushing Docker image")
+
         try:
             DockerResponseReader(
                 docker_client.images.push(
@@ -122,7 +313,8 @@ class DeployCommand:
                     tag=docker_args.image_tag,
                     stream=True,
                     decode=True,
-                )
+                ),
+                progress=DockerProgressAggregator(),
             ).click_echo_ok_responses()
         except DockerErrorResponseError as err:
             echo_error(err.message)
@@ -132,6 +324,36 @@ class DeployCommand:
                 "'dp compile' first?"
             )
 
+    @staticmethod
+    def _get_pushed_image_digest(docker_client: Any, docker_args: DockerArgs) -> Optional[str]:
+        """
+        Get ID of the local image, if the registry already holds the same
+        image under the tag, i.e. the digest of the pushed image's
+        configuration is the local image ID. This holds for images built
+        anew as well, e.g. on a fresh CI runner, as long as the build
+        produced the same image.
+
+        :return: ID (digest) of the image, if it is up to date in the registry
+        :rtype: Optional[str]
+        """
+        import docker
+
+        try:
+            image = docker_client.images.get(docker_args.docker_build_tag())
+        except docker.errors.APIError:
+            # Missing image; let the push handle it
+            return None
+        try:
+            pushed_config_digest = DockerRegistry(docker_args.repository).get_image_config_digest(
+                docker_args.image_tag, image_platform(image.attrs)
+            )
+        except (requests.RequestException, ValueError, KeyError) as err:
+            echo_warning(
+                f"Could not read image {docker_args.docker_build_tag()} from registry: {err}"
+            )
+            return None
+        return image.id if pushed_config_digest == image.id else None
+
     def _datahub_ingest(self) -> None:
         """:raises DependencyNotInstalledError: DataHub not installed"""
         try:
@@ -155,11 +377,42 @@ class DeployCommand:
         AirbyteFactory(
             airbyte_config_path=airbyte_config_path, auth_token=self.auth_token
         ).create_update_connections()
+        # Connection IDs got saved in the config, so the snapshot is outdated
+        snapshot_path = BUILD_DIR.joinpath("dag", RESOLVED_CONFIG_FILE_NAME)
+        if snapshot_path.exists():
+            snapshot_path.unlink()
+            write_resolved_config(
+                BUILD_DIR.joinpath("dag"), self.env, read_dbt_vars_from_configs(self.env)
+            )
+
+    def _versioned_sync(self) -> VersionedRemoteSync:
+        return VersionedRemoteSync(
+            self.blob_address_path, self.provider_kwargs_dict, self.keep_versions
+        )
 
     def _bucket_sync(self) -> None:
         echo_info("Syncing Bucket")
+        if self.versioned:
+            self._versioned_sync().sync(
+                BUILD_DIR.joinpath("dag"),
+                journal_path=BUILD_DIR.joinpath(SYNC_JOURNAL_FILE_NAME),
+                throughput_history_path=BUILD_DIR.joinpath(THROUGHPUT_HISTORY_FILE_NAME),
+            )
+            return
+        if self.bundle_compression:
+            LocalRemoteBundleSync(
+                BUILD_DIR.joinpath("dag"),
+                self.blob_address_path,
+                self.provider_kwargs_dict,
+                self.bundle_compression,
+            ).sync(delete=True)
+            return
         LocalRemoteSync(
-            BUILD_DIR.joinpath("dag"), self.blob_address_path, self.provider_kwargs_dict
+            BUILD_DIR.joinpath("dag"),
+            self.blob_address_path,
+            self.provider_kwargs_dict,
+            journal_path=BUILD_DIR.joinpath(SYNC_JOURNAL_FILE_NAME),
+            throughput_history_path=BUILD_DIR.joinpath(THROUGHPUT_HISTORY_FILE_NAME),
         ).sync(delete=True)
 
 
@@ -207,6 +460,41 @@ class DeployCommand:
     default=False,
     help="Whether to disable bucket sync with artefacts",
 )
+@click.option(
+    "--bundle",
+    type=click.Choice(list(BUNDLE_FILE_NAMES)),
+    required=False,
+    help="Send artefacts to the bucket as a single bundle with the given compression, "
+    "instead of file by file; it has to be unpacked on the Airflow side. "
+    "Cannot be used with --versioned",
+)
+@click.option(
+    "--versioned",
+    is_flag=True,
+    default=False,
+    help="Upload artefacts to an immutable, content-addressed version prefix "
+    "and switch the CURRENT.json pointer to it",
+)
+@click.option(
+    "--keep-versions",
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+    help="Number of most recently deployed versions to keep with --versioned",
+)
+@click.option(
+    "--rollback",
+    type=str,
+    required=False,
+    help="Switch the CURRENT.json pointer to an already uploaded version and exit",
+)
+@click.option(
+    "--plan",
+    is_flag=True,
+    default=False,
+    help="Print what the deployment would do, with an estimate of its duration, "
+    "without changing anything",
+)
 def deploy_command(
     env: str,
     dags_path: Optional[str],
@@ -216,23 +504,24 @@ def deploy_command(
     bi_git_key_path: str,
     auth_token: Optional[str],
     disable_bucket_sync: bool,
+    bundle: Optional[str],
+    versioned: bool,
+    keep_versions: int,
+    rollback: Optional[str],
+    plan: bool,
 ) -> None:
-    if blob_args:
-        try:
-            provider_kwargs_dict = json.load(blob_args)
-        except json.JSONDecodeError:
-            blob_args.seek(0)
-            provider_kwargs_dict = yaml.safe_load(blob_args)
-    else:
-        provider_kwargs_dict = None
-
     DeployCommand(
         env,
         docker_push,
         dags_path,
-        provider_kwargs_dict,
+        read_json_or_yaml(blob_args) if blob_args else None,
         datahub_ingest,
         bi_git_key_path,
         auth_token,
         disable_bucket_sync,
+        bundle_compression=bundle,
+        versioned=versioned,
+        keep_versions=keep_versions,
+        rollback_version=rollback,
+        plan=plan,
     ).deploy()
@@ -1,22 +1,23 @@
-import json
 import pathlib
 import shutil
-from typing import Any, Dict, List, Tuple, cast
+from typing import Any, Dict, List, Optional, Tuple
 
 import click
 import yaml
-from dbt.contracts.graph.manifest import Manifest
-from dbt.contracts.graph.nodes import ColumnInfo, ManifestNode
 
 from ..cli_constants import BUILD_DIR
-from ..cli_utils import echo_info, echo_warning
-from ..config_generation import read_dictionary_from_config_directory
+from ..cli_utils import echo_info, echo_subinfo, echo_warning
+from ..command_context import CommandContext
 from ..data_structures import DbtModel, DbtSource, DbtTableColumn
 from ..errors import DataPipelinesError
+from ..io_utils import write_if_changed
+from ..manifest_utils import iter_manifest_nodes
 
 try:
     from git import Repo
 
+    from ..git_workspace import GitWorkspace, stage_all_changes
+
     GIT_EXISTS = True
 except ImportError:
     echo_warning("Git support not installed.")
@@ -29,62 +30,53 @@ def _get_project_name_and_version() -> Tuple[str, str]:
         return dbt_project_config["name"], dbt_project_config["version"]
 
 
-def _get_database_and_schema_name(manifest: Manifest) -> Tuple[str, str]:
-    try:
-        model = next(
-            node
-            for node in (cast(ManifestNode, n) for n in manifest.nodes.values())
-            if node.resource_type == "model"
-        )
-        return model.database, model.schema
-    except StopIteration:
-        raise DataPipelinesError("There is no model in 'manifest.json' file.")
+_MODEL_FIELDS = ("name", "description", "tags", "meta", "columns", "database", "schema")
 
 
-def _parse_columns_dict_into_table_list(columns: Dict[str, ColumnInfo]) -> List[DbtTableColumn]:
+def _parse_columns_dict_into_table_list(columns: Dict[str, Any]) -> List[DbtTableColumn]:
     return [
         DbtTableColumn(
-            name=column.name,
-            description=column.description,
-            meta=column.meta,
-            quote=column.quote,
-            tags=column.tags,
+            name=column["name"],
+            description=column.get("description", ""),
+            meta=column.get("meta", {}),
+            quote=column.get("quote"),
+            tags=column.get("tags", []),
         )
         for column in columns.values()
     ]
 
 
-def _parse_models_schema(manifest: Manifest) -> List[DbtModel]:
-    return [
-        DbtModel(
-            name=node.name,
-            description=node.description,
-            tags=node.tags,
-            meta=node.meta,
-            columns=_parse_columns_dict_into_table_list(node.columns),
-        )
-        for node in (cast(ManifestNode, n) for n in manifest.nodes.values())
-        if node.resource_type == "model"
-    ]
-
-
 def _get_dag_id() -> str:
     with open(BUILD_DIR.joinpath("dag", "config", "base", "airflow.yml"), "r") as airflow_yml:
         return yaml.safe_load(airflow_yml)["dag"]["dag_id"]
 
 
 def _create_source(project_name: str) -> DbtSource:
-    with open(pathlib.Path.cwd().joinpath("target", "manifest.json"), "r") as manifest_json:
-        manifest_dict = json.load(manifest_json)
-        manifest = Manifest.from_dict(manifest_dict)
-
-    database_name, schema_name = _get_database_and_schema_name(manifest)
+    # The manifest may take hundreds of MB, so only the needed fields of
+    # models are read out of it, node by node
+    models = [
+        model
+        for _, model in iter_manifest_nodes(
+            pathlib.Path.cwd().joinpath("target", "manifest.json"), "model", _MODEL_FIELDS
+        )
+    ]
+    if not models:
+        raise DataPipelinesError("There is no model in 'manifest.json' file.")
 
     return DbtSource(
         name=project_name,
-        database=database_name,
-        schema=schema_name,
-        tables=_parse_models_schema(manifest),
+        database=models[0]["database"],
+        schema=models[0]["schema"],
+        tables=[
+            DbtModel(
+                name=model["name"],
+                description=model.get("description", ""),
+                tags=model.get("tags", []),
+                meta=model.get("meta", {}),
+                columns=_parse_columns_dict_into_table_list(model.get("columns", {})),
+            )
+            for model in models
+        ],
         meta={"dag": _get_dag_id()},
         tags=[f"project:{project_name}"],
     )
@@ -109,28 +101,27 @@ def create_package() -> pathlib.Path:
 
     sources_path = package_path.joinpath("models", "sources.yml")
     sources_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(sources_path, "w") as sources_yml:
-        yaml.dump(
-            {"version": 2, "sources": [_create_source(project_name)]},
-            sources_yml,
-            default_flow_style=False,
-        )
-
-    with open(package_path.joinpath("dbt_project.yml"), "w") as dbt_project_yml:
-        yaml.dump(
-            _create_dbt_project(project_name, project_version),
-            dbt_project_yml,
-            default_flow_style=False,
-        )
+    changed_files_count = sum(
+        [
+            write_if_changed(
+                sources_path,
+                yaml.dump(
+                    {"version": 2, "sources": [_create_source(project_name)]},
+                    default_flow_style=False,
+                ),
+            ),
+            write_if_changed(
+                package_path.joinpath("dbt_project.yml"),
+                yaml.dump(
+                    _create_dbt_project(project_name, project_version), default_flow_style=False
+                ),
+            ),
+        ]
+    )
+    echo_subinfo(f"{changed_files_count} of 2 package files changed in {package_path}")
     return package_path
 
 
-def _clean_repo(packages_repo: pathlib.Path) -> None:
-    if packages_repo.exists():
-        echo_info(f"Removing {packages_repo}")
-        shutil.rmtree(packages_repo)
-
-
 def _copy_publication_to_repo(package_dest: pathlib.Path, package_path: pathlib.Path) -> None:
     if package_dest.exists():
         echo_info(f"Removing {package_dest}")
@@ -145,29 +136,42 @@ if GIT_EXISTS:
         repo.config_writer().set_value("user", "name", config["username"]).release()
         repo.config_writer().set_value("user", "email", config["email"]).release()
 
-    def _commit_and_push_changes(repo: Repo, project_name: str, project_version: str) -> None:
+    def _commit_and_push_changes(repo: Repo, project_name: str, project_version: str) -> bool:
+        changed_files = stage_all_changes(repo)
+        if not changed_files:
+            echo_info("Published package is up to date, nothing to publish")
+            return False
+
         echo_info("Publishing")
-        repo.git.add(all=True)
-        repo.index.commit(f"Publication from project {project_name}, version: {project_version}")
+        for status, path in changed_files:
+            echo_subinfo(f"{status} {path}")
+        # Sparse checkouts use an index format GitPython cannot write to
+        repo.git.commit(
+            "-m", f"Publication from project {project_name}, version: {project_version}"
+        )
         origin = repo.remote(name="origin")
         origin.push()
+        return True
 
 
-def publish_package(package_path: pathlib.Path, key_path: str, env: str) -> None:
+def publish_package(
+    package_path: pathlib.Path,
+    key_path: str,
+    env: str,
+    context: Optional[CommandContext] = None,
+) -> None:
     packages_repo = BUILD_DIR.joinpath("packages_repo")
-    publish_config = read_dictionary_from_config_directory(
-        BUILD_DIR.joinpath("dag"), env, "publish.yml"
-    )
-    _clean_repo(packages_repo)
-    ssh_command_with_key = f"ssh -i {key_path}"
-    repo = Repo.clone_from(
-        publish_config["repository"],
+    publish_config = (context or CommandContext(env, BUILD_DIR)).read_config("publish.yml")
+    project_name, project_version = _get_project_name_and_version()
+    workspace = GitWorkspace(
         packages_repo,
-        branch=publish_config["branch"],
-        env={"GIT_SSH_COMMAND": ssh_command_with_key},
+        publish_config["repository"],
+        publish_config["branch"],
+        key_path,
+        sparse_paths=[project_name],
     )
-    with repo.git.custom_environment(GIT_SSH_COMMAND=ssh_command_with_key):
-        project_name, project_version = _get_project_name_and_version()
+    repo = workspace.sync()
+    with repo.git.custom_environment(**workspace.git_env):
         _copy_publication_to_repo(packages_repo.joinpath(project_name), package_path)
         _configure_git_env(repo, publish_config)
         _commit_and_push_changes(repo, project_name, project_version)
@@ -189,5 +193,6 @@ def publish_package(package_path: pathlib.Path, key_path: str, env: str) -> None
     help="Name of the environment",
 )
 def publish_command(key_path: str, env: str) -> None:
+    context = CommandContext(env, BUILD_DIR)
     package_path = create_package()
-    publish_package(package_path, key_path, env)
+    publish_package(package_path, key_path, env, context)
@@ -0,0 +1,97 @@
+import pathlib
+from typing import Any, Dict, List, Optional
+
+from .config_generation import read_dictionary_from_config_directory
+from .data_structures import DockerArgs
+
+
+class CommandContext:
+    """
+    State resolved once per `dp` command and shared by all of its steps.
+
+    Configuration files are read and merged lazily, on first use, and kept
+    for the rest of the command. Consequently, the context has to be created
+    after ``build/dag/config`` gets populated, and returned dictionaries
+    should not be modified by their users.
+    """
+
+    env: str
+    """Name of the environment"""
+    build_dir: pathlib.Path
+    """Path to the ``build`` directory"""
+    dag_path: pathlib.Path
+    """Path to the ``build/dag`` directory holding the ``config`` directory"""
+    _configs: Dict[str, Dict[str, Any]]
+    _docker_args: Optional[DockerArgs]
+
+    def __init__(self, env: str, build_dir: pathlib.Path) -> None:
+        self.env = env
+        self.build_dir = build_dir
+        self.dag_path = build_dir.joinpath("dag")
+        self._configs = {}
+        self._docker_args = None
+
+    def read_config(self, file_name: str) -> Dict[str, Any]:
+        """
+        Get dictionary compiled out of *file_name* in both `base` and *env*
+        config directories, reading the files only the first time.
+
+        :param file_name: Name of the YAML file to parse dictionary from
+        :type file_name: str
+        :return: Compiled dictionary
+        :rtype: Dict[str, Any]
+        """
+        if file_name not in self._configs:
+            self._configs[file_name] = read_dictionary_from_config_directory(
+                self.dag_path, self.env, file_name
+            )
+        return self._configs[file_name]
+
+    def invalidate_config(self, file_name: str) -> None:
+        """
+        Forget already read *file_name* config, e.g. after it got modified.
+
+        :param file_name: Name of the YAML file
+        :type file_name: str
+        """
+        self._configs.pop(file_name, None)
+
+    def docker_args(
+        self,
+        image_tag: Optional[str] = None,
+        build_args: Optional[Dict[str, str]] = None,
+        cache_from: Optional[List[str]] = None,
+        target: Optional[str] = None,
+        labels: Optional[Dict[str, str]] = None,
+    ) -> DockerArgs:
+        """
+        Get :class:`.DockerArgs` of the command, creating them on the first call.
+        Arguments are used only on the first call; see :class:`.DockerArgs`
+        for their meaning. `execution_env.yml` is taken from the context.
+
+        :param image_tag: Image tag overriding the one from `execution_env.yml`
+        :type image_tag: Optional[str]
+        :param build_args: Docker build arguments
+        :type build_args: Optional[Dict[str, str]]
+        :param cache_from: Images to use as sources of the build cache
+        :type cache_from: Optional[List[str]]
+        :param target: Name of the build stage to build
+        :type target: Optional[str]
+        :param labels: Labels to set on the built image
+        :type labels: Optional[Dict[str, str]]
+        :return: Arguments required by the Docker
+        :rtype: DockerArgs
+        :raises DataPipelinesError: *repository* variable not set
+        """
+        if self._docker_args is None:
+            self._docker_args = DockerArgs(
+                self.env,
+                image_tag,
+                build_args or {},
+                execution_env_config=self.read_config("execution_env.yml"),
+                cache_from=cache_from,
+                target=target,
+                labels=labels,
+                build_dir=self.build_dir,
+            )
+        return self._docker_args
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import copy
+import hashlib
+import json
 import os
 import pathlib
 import shutil
 import sys
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import yaml
 
@@ -15,6 +18,8 @@ from .cli_constants import (
     get_dbt_profiles_env_name,
 )
 from .cli_utils import echo_info, echo_subinfo, echo_warning
+from .io_utils import write_if_changed
+from .jinja import render_build_time_values
 
 if sys.version_info >= (3, 8):
     from typing import TypedDict  # pylint: disable=no-name-in-module
@@ -22,6 +27,10 @@ else:
     from typing_extensions import TypedDict
 
 
+RESOLVED_CONFIG_FILE_NAME = "config.resolved.json"
+"""Name of the resolved config snapshot, kept next to the `config` directory"""
+
+
 def _copy_src_dir_to_dst_dir(src_dir: pathlib.Path, dst_dir: pathlib.Path) -> None:
     # It has to be deleted before copying, as `copytree` complains with
     # `FileExistsError`
@@ -43,6 +52,152 @@ def copy_config_dir_to_build_dir() -> None:
     dag_dst_path = BUILD_DIR.joinpath("dag", "config")
     echo_info(f"Copying 'config' directory to {dag_dst_path}")
     _copy_src_dir_to_dst_dir(config_src_path, dag_dst_path)
+    # The snapshot describes the previous contents of the directory
+    BUILD_DIR.joinpath("dag", RESOLVED_CONFIG_FILE_NAME).unlink(missing_ok=True)
+
+
+#: Snapshots read by :func:`read_resolved_config`, by their paths and
+#: environments, along with modification times and sizes of the files
+_resolved_configs_cache: Dict[Tuple[str, str], Tuple[Any, Optional[Dict[str, Any]]]] = {}
+
+
+def _hash_configs(configs: Dict[str, Dict[str, Any]]) -> str:
+    return hashlib.sha256(
+        json.dumps(configs, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+def _source_file_paths(config_dir_path: pathlib.Path, env: str) -> List[pathlib.Path]:
+    return sorted(
+        file_path
+        for config_env in {"base", env}
+        for file_path in config_dir_path.joinpath(config_env).glob("*.yml")
+    )
+
+
+def _hash_source_files(config_dir_path: pathlib.Path, env: str) -> Dict[str, str]:
+    return {
+        file_path.relative_to(config_dir_path)
+        .as_posix(): hashlib.sha256(file_path.read_bytes())
+        .hexdigest()
+        for file_path in _source_file_paths(config_dir_path, env)
+    }
+
+
+def write_resolved_config(
+    config_path: Union[str, os.PathLike[str]], env: str, dbt_vars: Dict[str, Any]
+) -> str:
+    """
+    Merge every YAML file of `base` and *env* config directories, render
+    Jinja templates depending on *dbt_vars* in them and save the results as
+    a single JSON snapshot, ``RESOLVED_CONFIG_FILE_NAME`` in *config_path*.
+    The snapshot holds the name of the environment, SHA-256 hashes of the
+    source YAML files, the dictionaries by their file names and a hash of
+    the dictionaries.
+
+    Any other template, e.g. an Airflow macro like ``{{ ds }}`` or a
+    reference to an environment variable, is kept as it is in the YAML
+    file. This way, the snapshot, synchronized with the DAG bucket, holds
+    no values of environment variables (e.g. secrets).
+
+    :param config_path: Path to the directory holding the `config` directory
+    :type config_path: Union[str, os.PathLike[str]]
+    :param env: Name of the environment
+    :type env: str
+    :param dbt_vars: Variables to render Jinja templates with
+    :type dbt_vars: Dict[str, Any]
+    :return: Hash of the rendered dictionaries
+    :rtype: str
+    """
+    config_dir_path = pathlib.Path(config_path).joinpath("config")
+    file_names = sorted({file_path.name for file_path in _source_file_paths(config_dir_path, env)})
+    configs: Dict[str, Dict[str, Any]] = {}
+    for file_name in file_names:
+        env_configs = [
+            _read_yaml_file(file_path)
+            for file_path in (
+                config_dir_path.joinpath("base", file_name),
+                config_dir_path.joinpath(env, file_name),
+            )
+            if file_path.is_file()
+        ]
+        # Files not holding dictionaries are not merged by `dp` in any case
+        if not all(isinstance(env_config, dict) for env_config in env_configs):
+            continue
+        configs[file_name] = render_build_time_values(
+            dict(env_configs[0], **env_configs[-1]), dbt_vars
+        )
+    # YAML dates and the like end up as strings, just as in other JSON outputs
+    configs = json.loads(json.dumps(configs, default=str))
+    config_hash = _hash_configs(configs)
+    write_if_changed(
+        pathlib.Path(config_path).joinpath(RESOLVED_CONFIG_FILE_NAME),
+        json.dumps(
+            {
+                "env": env,
+                "sources": _hash_source_files(config_dir_path, env),
+                "hash": config_hash,
+                "configs": configs,
+            },
+            indent=2,
+        ),
+    )
+    return config_hash
+
+
+def _load_resolved_config(
+    snapshot_path: pathlib.Path, config_dir_path: pathlib.Path, env: str
+) -> Optional[Dict[str, Any]]:
+    with open(snapshot_path, "r") as snapshot_file:
+        snapshot = json.load(snapshot_file)
+    if snapshot.get("env") != env:
+        return None
+    if snapshot.get("hash") != _hash_configs(snapshot.get("configs", {})):
+        echo_warning(f"{snapshot_path} does not match its hash, ignoring it")
+        return None
+    if snapshot.get("sources") != _hash_source_files(config_dir_path, env):
+        echo_warning(f"Config files changed since {snapshot_path} got written, ignoring it")
+        return None
+    return snapshot["configs"]
+
+
+def read_resolved_config(
+    config_path: Union[str, os.PathLike[str]], env: str
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Read snapshot saved by :func:`write_resolved_config`.
+
+    The snapshot is only parsed again once it or any of the source YAML
+    files changes.
+
+    :param config_path: Path to the directory holding the `config` directory
+    :type config_path: Union[str, os.PathLike[str]]
+    :param env: Name of the environment
+    :type env: str
+    :return: Rendered dictionaries by their file names, or ``None`` if there \
+        is no valid snapshot for *env*, or the YAML files changed since
+    :rtype: Optional[Dict[str, Dict[str, Any]]]
+    """
+    snapshot_path = pathlib.Path(config_path).joinpath(RESOLVED_CONFIG_FILE_NAME)
+    config_dir_path = pathlib.Path(config_path).joinpath("config")
+    try:
+        snapshot_stat = snapshot_path.stat()
+    except FileNotFoundError:
+        return None
+    files_state = (
+        snapshot_stat.st_mtime_ns,
+        snapshot_stat.st_size,
+        tuple(
+            (str(file_path), file_path.stat().st_mtime_ns, file_path.stat().st_size)
+            for file_path in _source_file_paths(config_dir_path, env)
+        ),
+    )
+    cache_key = (str(snapshot_path), env)
+    cached = _resolved_configs_cache.get(cache_key)
+    if cached is None or cached[0] != files_state:
+        cached = (files_state, _load_resolved_config(snapshot_path, config_dir_path, env))
+        _resolved_configs_cache[cache_key] = cached
+    return cached[1]
 
 
 # Heavily based on `config_utils.py` from
@@ -55,6 +210,11 @@ def read_dictionary_from_config_directory(
     and compile them into one. Values from *env* directory get precedence over
     `base` ones.
 
+    If `dp compile` saved a resolved config snapshot for *env* (see
+    :func:`write_resolved_config`) and the YAML files have not changed
+    since, the dictionary, with templates depending on dbt variables
+    rendered, is taken from it instead.
+
     :param config_path: Path to the `config` directory
     :type config_path: Union[str, os.PathLike[str]]
     :param env: Name of the environment
@@ -64,6 +224,16 @@ def read_dictionary_from_config_directory(
     :return: Compiled dictionary
     :rtype: Dict[str, Any]
     """
+    resolved_configs = read_resolved_config(config_path, env)
+    if resolved_configs is not None and file_name in resolved_configs:
+        # The snapshot is cached, so callers get their own copy
+        return copy.deepcopy(resolved_configs[file_name])
+    return _merge_env_configs(config_path, env, file_name)
+
+
+def _merge_env_configs(
+    config_path: Union[str, os.PathLike[str]], env: str, file_name: str
+) -> Dict[str, Any]:
     return dict(
         _read_env_config(config_path, "base", file_name),
         **_read_env_config(config_path, env, file_name),
@@ -167,8 +337,11 @@ def generate_profiles_yml(env: str, copy_config_dir: bool = True) -> pathlib.Pat
 
     profiles_path = get_profiles_dir_build_path(env)
     profiles_path.mkdir(parents=True, exist_ok=True)
-    with open(profiles_path.joinpath("profiles.yml"), "w") as profiles:
-        yaml.dump(profile, profiles, default_flow_style=False)
-    echo_subinfo(f"Generated profiles.yml in {profiles_path}")
+    if write_if_changed(
+        profiles_path.joinpath("profiles.yml"), yaml.dump(profile, default_flow_style=False)
+    ):
+        echo_subinfo(f"Generated profiles.yml in {profiles_path}")
+    else:
+        echo_subinfo(f"profiles.yml in {profiles_path} is up to date")
 
     return profiles_path
@@ -1,3 +1,4 @@
+import pathlib
 import sys
 from typing import Any, Dict, List, Optional
 
@@ -67,11 +68,32 @@ class DockerArgs:
     image_tag: str
     """An image tag"""
     build_args: Dict[str, str]
-
-    def __init__(self, env: str, image_tag: Optional[str], build_args: Dict[str, str]) -> None:
-        self.repository = self._get_docker_repository_uri_from_k8s_config(env)
-        self.image_tag = self._get_image_tag_from_k8s_config(env, image_tag)
+    cache_from: List[str]
+    """Images to use as sources of the build cache"""
+    target: Optional[str]
+    """Name of the build stage to build, in case of a multi-stage Dockerfile"""
+    labels: Dict[str, str]
+    """Labels to set on the built image"""
+
+    def __init__(
+        self,
+        env: str,
+        image_tag: Optional[str],
+        build_args: Dict[str, str],
+        execution_env_config: Optional[Dict[str, Any]] = None,
+        cache_from: Optional[List[str]] = None,
+        target: Optional[str] = None,
+        labels: Optional[Dict[str, str]] = None,
+        build_dir: Optional[pathlib.Path] = None,
+    ) -> None:
+        if execution_env_config is None:
+            execution_env_config = self._read_execution_env_config(env, build_dir)
+        self.repository = self._get_docker_repository_uri_from_k8s_config(execution_env_config, env)
+        self.image_tag = self._get_image_tag_from_k8s_config(execution_env_config, env, image_tag)
         self.build_args = build_args
+        self.cache_from = cache_from or []
+        self.target = target
+        self.labels = labels or {}
 
     def docker_build_tag(self) -> str:
         """
@@ -82,13 +104,21 @@ class DockerArgs:
         """
         return f"{self.repository}:{self.image_tag}"
 
-    def _get_docker_repository_uri_from_k8s_config(self, env: str) -> str:
-        return self._get_docker_image_variable_from_k8s_config("repository", env)
+    def _get_docker_repository_uri_from_k8s_config(
+        self, execution_env_config: Dict[str, Any], env: str
+    ) -> str:
+        return self._get_docker_image_variable_from_k8s_config(
+            execution_env_config, "repository", env
+        )
 
-    def _get_image_tag_from_k8s_config(self, env: str, image_tag: Optional[str]) -> str:
+    def _get_image_tag_from_k8s_config(
+        self, execution_env_config: Dict[str, Any], env: str, image_tag: Optional[str]
+    ) -> str:
         from data_pipelines_cli.cli_constants import IMAGE_TAG_TO_REPLACE
 
-        config_tag = image_tag or self._get_docker_image_variable_from_k8s_config("tag", env)
+        config_tag = image_tag or self._get_docker_image_variable_from_k8s_config(
+            execution_env_config, "tag", env
+        )
         if config_tag != IMAGE_TAG_TO_REPLACE:
             return config_tag
 
@@ -99,16 +129,21 @@ class DockerArgs:
         return commit_sha
 
     @staticmethod
-    def _get_docker_image_variable_from_k8s_config(key: str, env: str) -> str:
+    def _read_execution_env_config(env: str, build_dir: Optional[pathlib.Path]) -> Dict[str, Any]:
         # Avoiding a dependency loop between `cli_constants` and `data_structures`
         from data_pipelines_cli.cli_constants import BUILD_DIR
         from data_pipelines_cli.config_generation import (
             read_dictionary_from_config_directory,
         )
 
-        execution_env_config = read_dictionary_from_config_directory(
-            BUILD_DIR.joinpath("dag"), env, "execution_env.yml"
+        return read_dictionary_from_config_directory(
+            (build_dir or BUILD_DIR).joinpath("dag"), env, "execution_env.yml"
         )
+
+    @staticmethod
+    def _get_docker_image_variable_from_k8s_config(
+        execution_env_config: Dict[str, Any], key: str, env: str
+    ) -> str:
         try:
             return execution_env_config["image"][key]
         except KeyError as key_error:
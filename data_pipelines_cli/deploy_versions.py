@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import datetime
+import hashlib
+import json
+import os
+import pathlib
+from typing import Any, Dict, List, Optional, Union
+
+import fsspec
+
+from .cli_utils import echo_info, echo_subinfo
+from .errors import DataPipelinesError
+from .filesystem_utils import LocalRemoteSync, split_upload_kwargs
+
+VERSIONS_DIR_NAME = "versions"
+"""Directory under the remote path holding one immutable prefix per version"""
+VERSION_INDEX_FILE_NAME = "_dp_version.json"
+"""Object marking a completely uploaded version, sent after all of its files"""
+POINTER_FILE_NAME = "CURRENT.json"
+"""Object pointing to the deployed version, kept in the remote path"""
+AIRFLOW_IGNORE_FILE_NAME = ".airflowignore"
+"""Object listing paths Airflow does not look for DAGs in, kept in the remote path"""
+AIRFLOW_IGNORE_PATTERN = f"^{VERSIONS_DIR_NAME}(/|$)"
+"""Pattern (in Airflow's default ``regexp`` syntax) excluding all the versions"""
+_MAX_HISTORY_LENGTH = 100
+
+
+def compute_version(local_path: Union[str, os.PathLike[str]]) -> str:
+    """
+    Hash paths and contents of all the files of *local_path*.
+
+    :param local_path: Directory to deploy
+    :type local_path: Union[str, os.PathLike[str]]
+    :return: First 16 hexadecimal digits of the SHA-256 hash
+    :rtype: str
+    """
+    local_path = pathlib.Path(local_path)
+    version_hash = hashlib.sha256()
+    for file_path in sorted(path for path in local_path.rglob("*") if path.is_file()):
+        file_hash = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                file_hash.update(chunk)
+        file = file_path.relative_to(local_path).as_posix()
+        version_hash.update(f"{file}\0{file_hash.hexdigest()}\0".encode("utf-8"))
+    return version_hash.hexdigest()[:16]
+
+
+def read_current_version(
+    remote_path: str, remote_kwargs: Optional[Dict[str, Any]] = None
+) -> Optional[str]:
+    """
+    Get URI of the currently deployed version, e.g. for the DAG loader.
+
+    Airflow does not parse the versions itself (see
+    :class:`VersionedRemoteSync`), so a DAG file next to the pointer loads
+    DAGs of the current version, reading the pointer through the path the
+    remote path is synchronized to by the Airflow deployment:
+
+    .. code-block:: python
+
+        from airflow.models import DagBag
+        from data_pipelines_cli.deploy_versions import read_current_version
+
+        version_path = read_current_version("/home/airflow/gcs/dags")
+        if version_path:
+            globals().update(DagBag(version_path, include_examples=False).dags)
+
+    :param remote_path: URI the versions get deployed to
+    :type remote_path: str
+    :param remote_kwargs: Arguments of the filesystem of *remote_path*
+    :type remote_kwargs: Optional[Dict[str, Any]]
+    :return: URI of the directory holding files of the current version, \
+        or ``None`` if nothing has been deployed yet
+    :rtype: Optional[str]
+    """
+    pointer = VersionedRemoteSync._read_pointer(
+        *fsspec.core.url_to_fs(
+            remote_path.rstrip("/"), **split_upload_kwargs(remote_kwargs or {})[0]
+        )
+    )
+    if pointer is None:
+        return None
+    return f"{remote_path.rstrip('/')}/{VERSIONS_DIR_NAME}/{pointer['version']}"
+
+
+class VersionedRemoteSync:
+    """
+    Deploys local directory to a cloud storage as immutable versions.
+
+    Files of every version are uploaded under ``versions/<version>``, where
+    the version is a hash of their contents (see :func:`compute_version`),
+    and never modified afterwards. Once a version is complete, a single
+    write of the ``CURRENT.json`` pointer object switches to it, so readers
+    never see a half-updated directory, and a rollback is just another
+    switch of the pointer. The pointer also keeps the history of deployed
+    versions, used to garbage-collect the old ones.
+
+    Airflow scans the remote path recursively, so ``versions`` gets listed
+    in its ``.airflowignore`` file. Otherwise, all the kept versions would
+    be parsed at once, and a version would be read while being uploaded.
+    DAGs of the current version get loaded by a DAG file resolving it with
+    :func:`read_current_version` instead.
+    """
+
+    remote_path: str
+    """URI the versions get deployed to"""
+    remote_kwargs: Dict[str, Any]
+    """Arguments of the filesystem of :attr:`remote_path`"""
+    keep_versions: int
+    """Number of most recently deployed versions to keep"""
+
+    def __init__(
+        self,
+        remote_path: str,
+        remote_kwargs: Dict[str, Any],
+        keep_versions: int = 5,
+    ) -> None:
+        if keep_versions < 1:
+            raise DataPipelinesError("At least one version has to be kept")
+        self.remote_path = remote_path.rstrip("/")
+        self.remote_kwargs = remote_kwargs
+        self.keep_versions = keep_versions
+        self.remote_fs, self.remote_path_str = fsspec.core.url_to_fs(
+            self.remote_path, **split_upload_kwargs(remote_kwargs)[0]
+        )
+
+    def _version_path(self, version: str) -> str:
+        return f"{self.remote_path_str}/{VERSIONS_DIR_NAME}/{version}"
+
+    @staticmethod
+    def _read_pointer(remote_fs: Any, remote_path_str: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(remote_fs.cat_file(f"{remote_path_str}/{POINTER_FILE_NAME}"))
+        except FileNotFoundError:
+            return None
+
+    def _ignore_versions_in_airflow(self) -> None:
+        """Add :data:`AIRFLOW_IGNORE_PATTERN` to ``.airflowignore``, keeping other patterns."""
+        ignore_file_path = f"{self.remote_path_str}/{AIRFLOW_IGNORE_FILE_NAME}"
+        try:
+            patterns = self.remote_fs.cat_file(ignore_file_path).decode("utf-8").splitlines()
+        except FileNotFoundError:
+            patterns = []
+        if AIRFLOW_IGNORE_PATTERN in patterns:
+            return
+        echo_subinfo(f"Adding {AIRFLOW_IGNORE_PATTERN} to {AIRFLOW_IGNORE_FILE_NAME}")
+        self.remote_fs.pipe_file(
+            ignore_file_path,
+            "".join(f"{pattern}\n" for pattern in [*patterns, AIRFLOW_IGNORE_PATTERN]).encode(
+                "utf-8"
+            ),
+        )
+
+    def is_complete(self, version: str) -> bool:
+        """
+        :param version: Version to check
+        :type version: str
+        :return: Whether all files of *version* have been uploaded
+        :rtype: bool
+        """
+        return bool(
+            self.remote_fs.exists(f"{self._version_path(version)}/{VERSION_INDEX_FILE_NAME}")
+        )
+
+    def current_version(self) -> Optional[str]:
+        """
+        :return: Currently deployed version, if any
+        :rtype: Optional[str]
+        """
+        pointer = self._read_pointer(self.remote_fs, self.remote_path_str)
+        return pointer["version"] if pointer else None
+
+    def sync(
+        self,
+        local_path: Union[str, os.PathLike[str]],
+        max_workers: int = 8,
+        journal_path: Optional[Union[str, os.PathLike[str]]] = None,
+        throughput_history_path: Optional[Union[str, os.PathLike[str]]] = None,
+    ) -> str:
+        """
+        Upload *local_path* as a new version, unless it is already uploaded,
+        switch the pointer to it and garbage-collect old versions. Airflow
+        gets told to ignore the versions before anything is uploaded.
+
+        :param local_path: Directory to deploy
+        :type local_path: Union[str, os.PathLike[str]]
+        :param max_workers: Maximum number of files sent at once
+        :type max_workers: int
+        :param journal_path: Journal letting an interrupted file by file \
+            upload resume, see :class:`.LocalRemoteSync`
+        :type journal_path: Optional[Union[str, os.PathLike[str]]]
+        :param throughput_history_path: File to record throughput of a file \
+            by file upload to, see :class:`.LocalRemoteSync`
+        :type throughput_history_path: Optional[Union[str, os.PathLike[str]]]
+        :return: Deployed version
+        :rtype: str
+        """
+        version = compute_version(local_path)
+        version_uri = f"{self.remote_path}/{VERSIONS_DIR_NAME}/{version}"
+        self._ignore_versions_in_airflow()
+        if self.is_complete(version):
+            echo_info(f"Version {version} is already uploaded to {version_uri}")
+        else:
+            echo_info(f"Uploading version {version} to {version_uri}")
+            LocalRemoteSync(
+                local_path,
+                version_uri,
+                self.remote_kwargs,
+                max_workers,
+                journal_path,
+                throughput_history_path,
+            ).sync(delete=False)
+            self.remote_fs.pipe_file(
+                f"{self._version_path(version)}/{VERSION_INDEX_FILE_NAME}",
+                json.dumps(
+                    {
+                        "version": version,
+                        "uploaded_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    }
+                ).encode("utf-8"),
+            )
+        self._switch_pointer(version)
+        self.garbage_collect()
+        return version
+
+    def plan(
+        self,
+        local_path: Union[str, os.PathLike[str]],
+        journal_path: Optional[Union[str, os.PathLike[str]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Compute what :meth:`sync` would upload, without uploading anything.
+
+        :param local_path: Directory to deploy
+        :type local_path: Union[str, os.PathLike[str]]
+        :param journal_path: Journal of a previous, interrupted upload
+        :type journal_path: Optional[Union[str, os.PathLike[str]]]
+        :return: Plan of :meth:`.LocalRemoteSync.plan` of the version's \
+            prefix, and the ``version``
+        :rtype: Dict[str, Any]
+        """
+        version = compute_version(local_path)
+        if self.is_complete(version):
+            plan: Dict[str, Any] = {"upload": {}, "delete": {}, "large_files": []}
+        else:
+            plan = LocalRemoteSync(
+                local_path,
+                f"{self.remote_path}/{VERSIONS_DIR_NAME}/{version}",
+                self.remote_kwargs,
+                journal_path=journal_path,
+            ).plan(delete=False)
+        plan["version"] = version
+        return plan
+
+    def rollback(self, version: str) -> None:
+        """
+        Switch the pointer to an already uploaded *version*.
+
+        :param version: Version to deploy
+        :type version: str
+        :raises DataPipelinesError: *version* is not completely uploaded
+        """
+        if not self.is_complete(version):
+            raise DataPipelinesError(
+                f"Version {version} does not exist in {self.remote_path}. "
+                f"Available versions: {', '.join(self.list_versions()) or 'none'}"
+            )
+        self._switch_pointer(version)
+
+    def list_versions(self) -> List[str]:
+        """
+        :return: Completely uploaded versions
+        :rtype: List[str]
+        """
+        versions_path = f"{self.remote_path_str}/{VERSIONS_DIR_NAME}"
+        if not self.remote_fs.exists(versions_path):
+            return []
+        versions = [
+            path.rstrip("/").rsplit("/", 1)[-1]
+            for path in self.remote_fs.ls(versions_path, detail=False)
+        ]
+        return sorted(version for version in versions if self.is_complete(version))
+
+    def _switch_pointer(self, version: str) -> None:
+        pointer = self._read_pointer(self.remote_fs, self.remote_path_str) or {}
+        previous_version = pointer.get("version")
+        history = [version] + [v for v in pointer.get("history", []) if v != version]
+        del history[_MAX_HISTORY_LENGTH:]
+        self.remote_fs.pipe_file(
+            f"{self.remote_path_str}/{POINTER_FILE_NAME}",
+            json.dumps(
+                {
+                    "version": version,
+                    "path": f"{VERSIONS_DIR_NAME}/{version}",
+                    "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    "history": history,
+                },
+                indent=2,
+            ).encode("utf-8"),
+        )
+        if previous_version == version:
+            echo_subinfo(f"Version {version} is already current")
+        else:
+            echo_subinfo(f"Switched current version from {previous_version} to {version}")
+
+    def garbage_collect(self) -> List[str]:
+        """
+        Remove versions other than the :attr:`keep_versions` most recently
+        deployed ones. Incomplete versions are left alone, as they may be
+        being uploaded by another deployment.
+
+        :return: Removed versions
+        :rtype: List[str]
+        """
+        pointer = self._read_pointer(self.remote_fs, self.remote_path_str) or {}
+        kept_versions = set(pointer.get("history", [])[: self.keep_versions])
+        if not kept_versions:
+            return []
+
+        removed_versions = []
+        for version in self.list_versions():
+            if version not in kept_versions:
+                echo_subinfo(f"Removing old version {version}")
+                self.remote_fs.rm(self._version_path(version), recursive=True)
+                removed_versions.append(version)
+        return removed_versions
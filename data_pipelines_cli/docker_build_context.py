@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import os
+import pathlib
+import re
+import tarfile
+import tempfile
+import time
+from typing import IO, Iterator, List, Optional, Sequence, Tuple
+
+#: Patterns (in `.dockerignore` format) of local artifacts that are never
+#: sent to Docker, unless re-included by the project's `.dockerignore`
+DEFAULT_BUILD_CONTEXT_EXCLUDES: List[str] = [
+    ".git",
+    "build",
+    "!build/profiles",
+    "dbt_packages",
+    "logs",
+    "target",
+]
+
+
+class DockerBuildContext:
+    """POD representing a build context prepared by :func:`create_build_context`."""
+
+    fileobj: IO[bytes]
+    """Temporary file with the tarball, rewound to its beginning"""
+    files_count: int
+    """Number of files and directories put into the tarball"""
+    size: int
+    """Size of the tarball in bytes"""
+    elapsed: float
+    """Time it took to create the tarball, in seconds"""
+
+    def __init__(self, fileobj: IO[bytes], files_count: int, size: int, elapsed: float) -> None:
+        self.fileobj = fileobj
+        self.files_count = files_count
+        self.size = size
+        self.elapsed = elapsed
+
+
+class _DockerignoreMatcher:
+    _patterns: List[Tuple[re.Pattern[str], str, bool]]
+
+    def __init__(self, patterns: Sequence[str]) -> None:
+        self._patterns = []
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            is_exception = pattern.startswith("!")
+            pattern = os.path.normpath(pattern.lstrip("!").strip()).lstrip("/")
+            self._patterns.append((self._translate(pattern), pattern, is_exception))
+
+    @staticmethod
+    def _translate(pattern: str) -> re.Pattern[str]:
+        regex = ""
+        i = 0
+        while i < len(pattern):
+            char = pattern[i]
+            if pattern.startswith("**", i):
+                # `**` matches any number of directories, including none
+                i += 2
+                if pattern.startswith("/", i):
+                    i += 1
+                    regex += "(?:.*/)?"
+                else:
+                    regex += ".*"
+                continue
+            if char == "*":
+                regex += "[^/]*"
+            elif char == "?":
+                regex += "[^/]"
+            elif char == "[":
+                end = pattern.find("]", i + 1)
+                if end == -1:
+                    regex += re.escape(char)
+                else:
+                    char_class = pattern[i + 1 : end].replace("\\", "\\\\")
+                    if char_class.startswith(("!", "^")):
+                        char_class = "^" + char_class[1:]
+                    regex += "[" + char_class + "]"
+                    i = end
+            else:
+                regex += re.escape(char)
+            i += 1
+        return re.compile(regex + r"\Z")
+
+    @staticmethod
+    def _path_and_parents(path: str) -> Iterator[str]:
+        parts = path.split("/")
+        for i in range(len(parts), 0, -1):
+            yield "/".join(parts[:i])
+
+    def is_excluded(self, path: str) -> bool:
+        excluded = False
+        for regex, _, is_exception in self._patterns:
+            if excluded == is_exception and any(
+                regex.match(candidate) for candidate in self._path_and_parents(path)
+            ):
+                excluded = not is_exception
+        return excluded
+
+    def may_reinclude_inside(self, directory: str) -> bool:
+        # An exception can match something inside *directory* if the part of
+        # the pattern preceding any wildcard does not rule it out
+        directory_prefix = directory + "/"
+        for _, pattern, is_exception in self._patterns:
+            if not is_exception:
+                continue
+            literal_prefix = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+            if directory_prefix.startswith(literal_prefix) or literal_prefix.startswith(
+                directory_prefix
+            ):
+                return True
+        return False
+
+
+def read_dockerignore(context_path: pathlib.Path) -> List[str]:
+    """
+    Read patterns out of the `.dockerignore` file in *context_path*, if it exists.
+
+    :param context_path: Path to the directory to be sent to Docker
+    :type context_path: pathlib.Path
+    :return: List of patterns
+    :rtype: List[str]
+    """
+    dockerignore_path = context_path.joinpath(".dockerignore")
+    if not dockerignore_path.is_file():
+        return []
+    with open(dockerignore_path, "r") as dockerignore:
+        return dockerignore.read().splitlines()
+
+
+def list_build_context_files(
+    context_path: pathlib.Path,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    dockerfile: str = "Dockerfile",
+) -> List[str]:
+    """
+    List files and directories to be sent to Docker, sorted.
+
+    :param context_path: Path to the directory to be sent to Docker
+    :type context_path: pathlib.Path
+    :param include: Paths, relative to *context_path*, to put into \
+        the context. All of the directory, if ``None``
+    :type include: Optional[Sequence[str]]
+    :param exclude: Patterns in `.dockerignore` format. \
+        :data:`DEFAULT_BUILD_CONTEXT_EXCLUDES` and the project's \
+        `.dockerignore`, if ``None``
+    :type exclude: Optional[Sequence[str]]
+    :param dockerfile: Path to the Dockerfile, always put into the context
+    :type dockerfile: str
+    :return: Paths relative to *context_path*, using `/` as a separator
+    :rtype: List[str]
+    """
+    if exclude is None:
+        exclude = DEFAULT_BUILD_CONTEXT_EXCLUDES + read_dockerignore(context_path)
+    matcher = _DockerignoreMatcher([*exclude, "!" + dockerfile, "!.dockerignore"])
+    roots = [os.path.normpath(path).lstrip("/") for path in include] if include else ["."]
+
+    files = set()
+    for root in roots:
+        root_path = context_path.joinpath(root)
+        if root_path.is_file() or root_path.is_symlink():
+            if not matcher.is_excluded(root):
+                files.add(root)
+            continue
+        for dir_path, dir_names, file_names in os.walk(root_path):
+            relative_dir = pathlib.Path(dir_path).relative_to(context_path).as_posix()
+            prefix = "" if relative_dir == "." else relative_dir + "/"
+            kept_dir_names = []
+            for dir_name in sorted(dir_names):
+                relative_path = prefix + dir_name
+                if not matcher.is_excluded(relative_path):
+                    files.add(relative_path)
+                    kept_dir_names.append(dir_name)
+                elif matcher.may_reinclude_inside(relative_path):
+                    kept_dir_names.append(dir_name)
+            # Pruning `dir_names` in place stops `os.walk` from descending
+            dir_names[:] = kept_dir_names
+            files.update(
+                prefix + file_name
+                for file_name in file_names
+                if not matcher.is_excluded(prefix + file_name)
+            )
+    return sorted(files)
+
+
+def create_build_context(
+    context_path: pathlib.Path,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    dockerfile: str = "Dockerfile",
+) -> DockerBuildContext:
+    """
+    Pack a filtered build context into a tarball, ready to be streamed to Docker.
+
+    The tarball is deterministic: files are sorted, and their owners and
+    modification times are reset, so unchanged sources give the same bytes.
+    See :func:`list_build_context_files` for the meaning of the arguments.
+
+    :return: Build context with its size and the time it took to create
+    :rtype: DockerBuildContext
+    """
+    start_time = time.perf_counter()
+    files = list_build_context_files(context_path, include, exclude, dockerfile)
+
+    fileobj = tempfile.TemporaryFile()
+    with tarfile.open(mode="w", fileobj=fileobj, format=tarfile.PAX_FORMAT) as tar:
+        for file in files:
+            tar_info = tar.gettarinfo(str(context_path.joinpath(file)), arcname=file)
+            if tar_info is None:
+                # Sockets and the like cannot be archived
+                continue
+            tar_info.mtime = 0
+            tar_info.uid = tar_info.gid = 0
+            tar_info.uname = tar_info.gname = ""
+            if tar_info.isfile():
+                with open(context_path.joinpath(file), "rb") as f:
+                    tar.addfile(tar_info, f)
+            else:
+                tar.addfile(tar_info)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return DockerBuildContext(fileobj, len(files), size, time.perf_counter() - start_time)
@@ -0,0 +1,165 @@
+import re
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from .errors import DockerNotInstalledError
+
+#: Host serving the HTTP API of Docker Hub, whose index is named `docker.io`
+DOCKER_HUB_REGISTRY = "registry-1.docker.io"
+_MANIFEST_MEDIA_TYPES = ", ".join(
+    [
+        "application/vnd.docker.distribution.manifest.v2+json",
+        "application/vnd.docker.distribution.manifest.list.v2+json",
+        "application/vnd.oci.image.manifest.v1+json",
+        "application/vnd.oci.image.index.v1+json",
+    ]
+)
+_REQUEST_TIMEOUT = 30
+
+
+def image_platform(image_attrs: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Get platform of a local image, to choose its manifest out of a list.
+
+    :param image_attrs: Attributes of the image, as returned by Docker's `inspect`
+    :type image_attrs: Dict[str, Any]
+    :return: ``os``, ``architecture`` and ``variant`` of the image, if known
+    :rtype: Dict[str, str]
+    """
+    return {
+        key: image_attrs[attr]
+        for key, attr in (("os", "Os"), ("architecture", "Architecture"), ("variant", "Variant"))
+        if image_attrs.get(attr)
+    }
+
+
+class DockerRegistry:
+    """
+    Client of the HTTP API (v2) of the registry holding a Docker repository.
+
+    Credentials are read from the Docker configuration, including
+    credential helpers, the way ``docker push`` does.
+
+    :raises DockerNotInstalledError: Docker not installed
+    """
+
+    registry: str
+    """Host of the registry"""
+    repository: str
+    """Name of the repository in the registry"""
+
+    def __init__(self, repository: str) -> None:
+        try:
+            import docker
+        except ModuleNotFoundError:
+            raise DockerNotInstalledError()
+
+        index_name, self.repository = docker.auth.resolve_repository_name(repository)
+        self.registry = DOCKER_HUB_REGISTRY if index_name == docker.auth.INDEX_NAME else index_name
+        auth_config = docker.auth.resolve_authconfig(docker.auth.load_config(), index_name) or {}
+        self._credentials = {key.lower(): value for key, value in auth_config.items()}
+        self._session = requests.Session()
+
+    def get_image_config_digest(self, tag: str, platform: Dict[str, str]) -> Optional[str]:
+        """
+        Get digest of the configuration of the image pushed under *tag*. It
+        is equal to the ID of the local image it got pushed from.
+
+        :param tag: Tag of the image
+        :type tag: str
+        :param platform: Platform to choose, if *tag* refers to a list of \
+            images, see :func:`image_platform`
+        :type platform: Dict[str, str]
+        :return: Digest of the image configuration, or ``None`` if there is \
+            no such image in the registry
+        :rtype: Optional[str]
+        :raises requests.RequestException: Registry could not be read
+        """
+        manifest = self._get_manifest(tag, platform)
+        return manifest["config"]["digest"] if manifest else None
+
+    def get_image_layers(self, tag: str, platform: Dict[str, str]) -> Optional[List[str]]:
+        """
+        Get layers of the image pushed under *tag*, as digests of their
+        uncompressed contents, like in `RootFS` of local images.
+
+        :param tag: Tag of the image
+        :type tag: str
+        :param platform: Platform to choose, if *tag* refers to a list of \
+            images, see :func:`image_platform`
+        :type platform: Dict[str, str]
+        :return: Digests of the layers, or ``None`` if there is no such \
+            image in the registry
+        :rtype: Optional[List[str]]
+        :raises requests.RequestException: Registry could not be read
+        """
+        config_digest = self.get_image_config_digest(tag, platform)
+        if config_digest is None:
+            return None
+        response = self._get(f"blobs/{config_digest}")
+        if response is None:
+            return None
+        return response.json().get("rootfs", {}).get("diff_ids", [])
+
+    def _get_manifest(self, reference: str, platform: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        response = self._get(f"manifests/{reference}", _MANIFEST_MEDIA_TYPES)
+        if response is None:
+            return None
+        manifest = response.json()
+        if "manifests" not in manifest:
+            return manifest
+        # A list of images built for different platforms
+        for entry in manifest["manifests"]:
+            entry_platform = entry.get("platform", {})
+            if all(entry_platform.get(key) == value for key, value in platform.items()):
+                return self._get_manifest(entry["digest"], platform)
+        return None
+
+    def _get(self, path: str, accept: Optional[str] = None) -> Optional[requests.Response]:
+        url = f"https://{self.registry}/v2/{self.repository}/{path}"
+        headers = {"Accept": accept} if accept else {}
+        response = self._session.get(url, headers=headers, timeout=_REQUEST_TIMEOUT)
+        if response.status_code == 401 and self._authenticate(response):
+            response = self._session.get(url, headers=headers, timeout=_REQUEST_TIMEOUT)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response
+
+    def _authenticate(self, response: requests.Response) -> bool:
+        """Authenticate the session as asked by the registry, returning whether it is possible."""
+        scheme, _, params = response.headers.get("WWW-Authenticate", "").partition(" ")
+        basic_auth = (
+            (self._credentials["username"], self._credentials.get("password", ""))
+            if "username" in self._credentials
+            else None
+        )
+        if scheme.lower() == "basic":
+            self._session.auth = basic_auth
+            return basic_auth is not None
+        challenge = dict(re.findall(r'(\w+)="([^"]*)"', params))
+        realm = challenge.pop("realm", None)
+        if scheme.lower() != "bearer" or realm is None or "Authorization" in self._session.headers:
+            return False
+
+        if "identitytoken" in self._credentials:
+            token_response = requests.post(
+                realm,
+                data={
+                    **challenge,
+                    "grant_type": "refresh_token",
+                    "refresh_token": self._credentials["identitytoken"],
+                    "client_id": "data-pipelines-cli",
+                },
+                timeout=_REQUEST_TIMEOUT,
+            )
+        else:
+            token_response = requests.get(
+                realm, params=challenge, auth=basic_auth, timeout=_REQUEST_TIMEOUT
+            )
+        token_response.raise_for_status()
+        token_json = token_response.json()
+        token = token_json.get("token") or token_json.get("access_token")
+        self._session.headers["Authorization"] = f"Bearer {token}"
+        return True
@@ -1,5 +1,20 @@
+import collections
 import json
-from typing import Dict, Iterable, List, Optional, Union, cast
+import re
+import time
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+    cast,
+)
 
 import click
 
@@ -22,24 +37,286 @@ class DockerReadResponse:
         return self.msg
 
 
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "kB", "MB", "GB"):
+        if size < 1000:
+            return f"{size:.1f} {unit}"
+        size /= 1000
+    return f"{size:.1f} TB"
+
+
+class DockerLayerProgress:
+    """POD representing the state of a single layer reported by Docker."""
+
+    status: str
+    """Last status of the layer, e.g. `Pushing` or `Pushed`"""
+    current: int
+    """Number of bytes already transferred"""
+    total: int
+    """Size of the layer in bytes, if known"""
+
+    def __init__(self, status: str) -> None:
+        self.status = status
+        self.current = 0
+        self.total = 0
+
+    def __str__(self) -> str:
+        if self.total:
+            return f"{self.status} {_format_bytes(self.current)} / {_format_bytes(self.total)}"
+        return self.status
+
+
+class DockerProgressAggregator:
+    """
+    Collapse per-layer progress updates of Docker into one line per layer.
+
+    On a terminal, the lines are redrawn in place. Otherwise, a summary of
+    all layers is printed every :attr:`summary_interval` seconds.
+    """
+
+    FINISHED_STATUSES = ("Pushed", "Layer already exists", "Already exists", "Pull complete")
+    """Statuses meaning that the layer will not be updated anymore"""
+
+    layers: Dict[str, DockerLayerProgress]
+    """State of every layer, by its ID"""
+    is_tty: bool
+    """Whether to redraw lines in place"""
+    summary_interval: float
+    """Seconds between summaries if not on a terminal"""
+    redraw_interval: float
+    """Minimal number of seconds between two redraws on a terminal"""
+
+    def __init__(
+        self,
+        output: Optional[TextIO] = None,
+        is_tty: Optional[bool] = None,
+        summary_interval: float = 10.0,
+        redraw_interval: float = 0.1,
+    ) -> None:
+        self._output = output or click.get_text_stream("stdout")
+        self.is_tty = self._output.isatty() if is_tty is None else is_tty
+        self.summary_interval = summary_interval
+        self.redraw_interval = redraw_interval
+        self.layers = {}
+        self._start_time: Optional[float] = None
+        self._last_render_time = 0.0
+        self._rendered_lines = 0
+
+    @staticmethod
+    def is_progress_log(log: Dict[str, Union[str, Dict[str, str]]]) -> bool:
+        """
+        Check whether *log* is a per-layer status update.
+
+        :param log: Single, decoded line of Docker response
+        :type log: Dict[str, Union[str, Dict[str, str]]]
+        :return: Whether *log* can be passed to :meth:`update`
+        :rtype: bool
+        """
+        return "status" in log and "id" in log and "error" not in log and "errorDetail" not in log
+
+    def update(self, log: Dict[str, Union[str, Dict[str, str]]]) -> None:
+        """
+        Update the state of the layer described by *log* and print it, if it is time to.
+
+        :param log: Single, decoded per-layer line of Docker response
+        :type log: Dict[str, Union[str, Dict[str, str]]]
+        """
+        now = time.monotonic()
+        if self._start_time is None:
+            self._start_time = now
+            self._last_render_time = now
+
+        layer_id = cast(str, log["id"])
+        layer = self.layers.setdefault(layer_id, DockerLayerProgress(""))
+        layer.status = cast(str, log["status"])
+        progress_detail = cast(Dict[str, int], log.get("progressDetail") or {})
+        layer.current = max(layer.current, int(progress_detail.get("current", 0)))
+        layer.total = max(layer.total, int(progress_detail.get("total", 0)))
+        if layer.status == "Pushed":
+            layer.current = layer.total
+
+        if self.is_tty:
+            if now - self._last_render_time >= self.redraw_interval:
+                self._redraw()
+                self._last_render_time = now
+        elif now - self._last_render_time >= self.summary_interval:
+            self._write(self.summary_line() + "\n")
+            self._last_render_time = now
+
+    def bytes_transferred(self) -> int:
+        """
+        Count bytes transferred so far, skipping layers the other side already had.
+
+        :return: Number of bytes
+        :rtype: int
+        """
+        return sum(
+            layer.current
+            for layer in self.layers.values()
+            if layer.status not in ("Layer already exists", "Already exists")
+        )
+
+    def summary_line(self) -> str:
+        """
+        Prepare a one-line summary of all the layers.
+
+        :return: Summary of the layers
+        :rtype: str
+        """
+        finished = sum(
+            1 for layer in self.layers.values() if layer.status in self.FINISHED_STATUSES
+        )
+        return (
+            f"Layers: {finished}/{len(self.layers)} done, "
+            f"{_format_bytes(self.bytes_transferred())} transferred"
+        )
+
+    def finish(self) -> None:
+        """Print the final state of the layers, the amount of transferred data and throughput."""
+        if self._start_time is None:
+            return
+        if self.is_tty:
+            self._redraw()
+        elapsed = max(time.monotonic() - self._start_time, 1e-6)
+        transferred = self.bytes_transferred()
+        self._write(
+            f"{self.summary_line()} in {elapsed:.1f} s "
+            f"({_format_bytes(transferred / elapsed)}/s)\n"
+        )
+
+    def release_lines(self) -> None:
+        """
+        Stop redrawing already printed layer lines, e.g. before printing
+        anything else. The following updates will be printed below.
+        """
+        if self.is_tty and self._rendered_lines:
+            self._redraw()
+            self._rendered_lines = 0
+
+    def _redraw(self) -> None:
+        # Move the cursor to the first line of the layers block and rewrite it
+        lines = [f"{layer_id}: {layer}" for layer_id, layer in self.layers.items()]
+        prefix = f"\x1b[{self._rendered_lines}F" if self._rendered_lines else ""
+        self._write(prefix + "".join(f"\x1b[2K{line}\n" for line in lines))
+        self._rendered_lines = len(lines)
+
+    def _write(self, text: str) -> None:
+        self._output.write(text)
+        self._output.flush()
+
+
+class DockerBuildStageTimer:
+    """
+    Measure how long every stage of a Docker build takes, based on the
+    ``Step n/m : INSTRUCTION`` lines of the build log.
+
+    A stage starts with each ``FROM`` instruction and lasts until the next
+    one or until :meth:`finish` gets called.
+    """
+
+    STEP_REGEX = re.compile(r"^Step \d+/\d+ : (\S+)\s*(.*)$")
+    """Regex matching a build step line, capturing its instruction and arguments"""
+
+    stages: List[Tuple[str, float]]
+    """Names of already finished stages with their build times, in seconds"""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.stages = []
+        self._clock = clock
+        self._current_stage: Optional[str] = None
+        self._stage_start = 0.0
+
+    def update(self, line: str) -> None:
+        """
+        Process a single line of the build log.
+
+        :param line: Line of the build log
+        :type line: str
+        """
+        step_match = self.STEP_REGEX.match(line)
+        if not step_match or step_match.group(1).upper() != "FROM":
+            return
+        self._finish_current_stage()
+        from_args = step_match.group(2).split()
+        if len(from_args) >= 3 and from_args[-2].upper() == "AS":
+            stage_name = from_args[-1]
+        else:
+            stage_name = f"{len(self.stages)} ({from_args[0] if from_args else '?'})"
+        self._current_stage = stage_name
+        self._stage_start = self._clock()
+
+    def finish(self) -> List[Tuple[str, float]]:
+        """
+        Close the last stage.
+
+        :return: Names of all stages with their build times, in seconds
+        :rtype: List[Tuple[str, float]]
+        """
+        self._finish_current_stage()
+        return self.stages
+
+    def _finish_current_stage(self) -> None:
+        if self._current_stage is not None:
+            self.stages.append((self._current_stage, self._clock() - self._stage_start))
+            self._current_stage = None
+
+
 class DockerResponseReader:
     """
     Read and process Docker response.
 
     Docker response turns into processed strings instead of plain dictionaries.
+    Response gets processed lazily, as it arrives from Docker.
     """
 
     logs_generator: Iterable[Union[str, Dict[str, Union[str, Dict[str, str]]]]]
     """Iterable representing Docker response"""
     cached_read_response: Optional[List[DockerReadResponse]]
     """Internal cache of already processed response"""
+    cache_response: bool
+    """Whether to keep every processed line of response in :attr:`cached_read_response`"""
+    error_context_lines: int
+    """Number of the last lines of response attached to a raised error"""
+    progress: Optional[DockerProgressAggregator]
+    """If set, per-layer status updates are passed to it instead of being
+    turned into separate lines of response"""
 
     def __init__(
         self,
         logs_generator: Iterable[Union[str, Dict[str, Union[str, Dict[str, str]]]]],
+        cache_response: bool = False,
+        error_context_lines: int = 20,
+        progress: Optional[DockerProgressAggregator] = None,
     ):
         self.logs_generator = logs_generator
         self.cached_read_response = None
+        self.cache_response = cache_response
+        self.error_context_lines = error_context_lines
+        self.progress = progress
+
+    def iter_response(self) -> Iterator[DockerReadResponse]:
+        """
+        Read and process Docker response, yielding lines as soon as they arrive.
+
+        Unless read before with :attr:`cache_response` set, the response can
+        be iterated over only once.
+
+        :return: Iterator over processed lines of response
+        :rtype: Iterator[DockerReadResponse]
+        """
+        if self.cached_read_response is not None:
+            yield from self.cached_read_response
+            return
+
+        read_response: Optional[List[DockerReadResponse]] = [] if self.cache_response else None
+        for log in self.logs_generator:
+            for response in self._prepare_log(log):
+                if read_response is not None:
+                    read_response.append(response)
+                yield response
+        if self.progress is not None:
+            self.progress.finish()
+        self.cached_read_response = read_response
 
     def read_response(self) -> List[DockerReadResponse]:
         """
@@ -48,40 +325,61 @@ class DockerResponseReader:
         :return: List of processed lines of response
         :rtype: List[DockerReadResponse]
         """
-        to_return = []
-
-        for log in self.logs_generator:
-            if isinstance(log, str):
-                log = json.loads(log)
-            log = cast(Dict[str, Union[str, Dict[str, str]]], log)
-
-            if "status" in log:
-                to_return.append(self._prepare_status(log))
-            if "stream" in log:
-                to_return += self._prepare_stream(log)
-            if "aux" in log:
-                to_return += self._prepare_aux(log)
-
-            if "errorDetail" in log:
-                to_return.append(self._prepare_error_detail(log))
-            elif "error" in log:
-                to_return.append(self._prepare_error(log))
-
+        to_return = list(self.iter_response())
         self.cached_read_response = to_return
         return to_return
 
+    def iter_ok_responses(self) -> Iterator[DockerReadResponse]:
+        """
+        Read and process Docker response, yielding positive updates as soon
+        as they arrive.
+
+        :return: Iterator over processed positive lines of response
+        :rtype: Iterator[DockerReadResponse]
+        :raises DockerErrorResponseError: Came across error update in Docker response.
+        """
+        last_lines: Deque[str] = collections.deque(maxlen=self.error_context_lines)
+        for response in self.iter_response():
+            if response.is_error:
+                raise DockerErrorResponseError(response.msg, list(last_lines))
+            last_lines.append(response.msg)
+            yield response
+
     def click_echo_ok_responses(self) -> None:
         """Read, process and print positive Docker updates.
 
         :raises DockerErrorResponseError: Came across error update in Docker response.
         """
-        read_response = self.cached_read_response or self.read_response()
-
-        for response in read_response:
-            if response.is_error:
-                raise DockerErrorResponseError(response.msg)
+        for response in self.iter_ok_responses():
             click.echo(response.msg)
 
+    def _prepare_log(
+        self, log: Union[str, Dict[str, Union[str, Dict[str, str]]]]
+    ) -> List[DockerReadResponse]:
+        if isinstance(log, str):
+            log = json.loads(log)
+        log = cast(Dict[str, Union[str, Dict[str, str]]], log)
+
+        if self.progress is not None:
+            if self.progress.is_progress_log(log):
+                self.progress.update(log)
+                return []
+            self.progress.release_lines()
+
+        to_return = []
+        if "status" in log:
+            to_return.append(self._prepare_status(log))
+        if "stream" in log:
+            to_return += self._prepare_stream(log)
+        if "aux" in log:
+            to_return += self._prepare_aux(log)
+
+        if "errorDetail" in log:
+            to_return.append(self._prepare_error_detail(log))
+        elif "error" in log:
+            to_return.append(self._prepare_error(log))
+        return to_return
+
     @staticmethod
     def _prepare_status(log: Dict[str, Union[str, Dict[str, str]]]) -> DockerReadResponse:
         status_message = cast(str, log["status"])
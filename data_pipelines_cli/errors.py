@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 
 class DataPipelinesError(Exception):
@@ -89,8 +89,13 @@ class AirflowDagsPathKeyError(DataPipelinesError):
 class DockerErrorResponseError(DataPipelinesError):
     """Exception raised if there is an error response from Docker client."""
 
-    def __init__(self, error_msg: str) -> None:
-        super().__init__("Error raised when using Docker.\n" + error_msg)
+    def __init__(self, error_msg: str, last_lines: Optional[List[str]] = None) -> None:
+        super().__init__(
+            "Error raised when using Docker.\n" + error_msg,
+            submessage=(
+                "Last lines of Docker response:\n" + "\n".join(last_lines) if last_lines else None
+            ),
+        )
 
 
 class NotSuppertedBIError(DataPipelinesError):
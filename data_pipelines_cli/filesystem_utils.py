@@ -1,14 +1,280 @@
 from __future__ import annotations
 
+import base64
+import hashlib
+import inspect
+import json
 import os
 import pathlib
-from typing import Dict, Set, Union
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 import fsspec
 from fsspec import AbstractFileSystem
 
-from .cli_utils import echo_subinfo
+from .cli_utils import echo_info, echo_subinfo
 from .errors import DataPipelinesError
+from .rate_limiting import RateLimiter, ThrottledReader
+
+SYNC_JOURNAL_FILE_NAME = "sync_journal.jsonl"
+"""Name of the journal of completed transfers, kept in the ``build`` directory"""
+
+THROUGHPUT_HISTORY_FILE_NAME = "deploy_throughput.json"
+"""Name of the file with throughput measured by previous syncs, kept in the ``build`` directory"""
+UPLOAD_KWARGS_KEY = "upload"
+"""Key of the provider kwargs holding :class:`UploadSettings` arguments"""
+
+#: Keys of remote file details identifying their contents, by preference
+_REMOTE_FINGERPRINT_KEYS = ("ETag", "etag", "md5Hash", "crc32c")
+_MIN_PART_SIZE = 8 * 2**20
+_MAX_PART_SIZE = 512 * 2**20
+#: Number of parts a large file gets split into, unless `part_size` is set
+_TARGET_PART_COUNT = 32
+#: Limit of S3 multipart uploads, other providers allow at least as many
+_MAX_PART_COUNT = 10_000
+_MAX_THROUGHPUT_HISTORY_LENGTH = 10
+#: Size of chunks the bytes limit is charged for, when set
+_THROTTLED_CHUNK_SIZE = 64 * 2**10
+
+
+class UploadSettings:
+    """
+    Parameters of chunked (multipart) uploads of large files, and limits
+    of the upload rate.
+
+    Set in the ``upload`` key of the provider kwargs (``--blob-args``), e.g.
+    ``{"upload": {"multipart_threshold": 104857600, "max_concurrency": 8}}``.
+    Part size and concurrency get passed to the filesystem's ``put_file``
+    as ``chunksize`` and ``max_concurrency``, if it accepts them. With
+    ``max_bytes_per_second`` set, files are written in chunks instead,
+    waiting for the limit before every chunk, and their parts get sent
+    one at a time.
+    """
+
+    multipart_threshold: int
+    """Size (in bytes) from which a file is sent in parts"""
+    part_size: Optional[int]
+    """Size of a part, or ``None`` to derive it from the file size"""
+    max_concurrency: Optional[int]
+    """Number of parts of a file sent at once, or ``None`` for the provider's default"""
+    part_checksums: bool
+    """Whether to check MD5-based ETags (S3) or hashes (GCS) of sent large files
+    against MD5 hashes of their parts. Do not use with keys not producing such
+    ETags, e.g. S3 SSE-KMS"""
+    max_bytes_per_second: Optional[float]
+    """Limit of bytes sent per second, or ``None`` for no limit"""
+    max_requests_per_second: Optional[float]
+    """Limit of requests sent per second, or ``None`` for no limit"""
+    max_retries: int
+    """Number of times a request throttled by the provider gets repeated"""
+
+    def __init__(
+        self,
+        multipart_threshold: int = 64 * 2**20,
+        part_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        part_checksums: bool = False,
+        max_bytes_per_second: Optional[float] = None,
+        max_requests_per_second: Optional[float] = None,
+        max_retries: int = 5,
+    ) -> None:
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.part_checksums = part_checksums
+        self.max_bytes_per_second = max_bytes_per_second
+        self.max_requests_per_second = max_requests_per_second
+        self.max_retries = max_retries
+
+    def rate_limiter(self) -> RateLimiter:
+        """
+        :return: New limiter of the upload rate
+        :rtype: RateLimiter
+        """
+        return RateLimiter(
+            self.max_bytes_per_second, self.max_requests_per_second, self.max_retries
+        )
+
+    def part_count(self, size: int) -> int:
+        """
+        :param size: Size of the file to send
+        :type size: int
+        :return: Number of requests sending the file takes
+        :rtype: int
+        """
+        if size < self.multipart_threshold:
+            return 1
+        # Parts, and requests starting and completing the upload
+        return -(-size // self.part_size_for(size)) + 2
+
+    def part_size_for(self, size: int) -> int:
+        """
+        :param size: Size of the file to send
+        :type size: int
+        :return: Size of the parts of the file, respecting the part count limit
+        :rtype: int
+        """
+        part_size = self.part_size or min(
+            max(-(-size // _TARGET_PART_COUNT), _MIN_PART_SIZE), _MAX_PART_SIZE
+        )
+        return max(part_size, -(-size // _MAX_PART_COUNT))
+
+
+def split_upload_kwargs(remote_kwargs: Dict[str, Any]) -> Tuple[Dict[str, Any], UploadSettings]:
+    """
+    Separate :class:`UploadSettings` from arguments of the filesystem.
+
+    :param remote_kwargs: Provider kwargs, possibly with the ``upload`` key
+    :type remote_kwargs: Dict[str, Any]
+    :return: Provider kwargs without the ``upload`` key, and upload settings
+    :rtype: Tuple[Dict[str, Any], UploadSettings]
+    :raises DataPipelinesError: Unknown upload setting
+    """
+    fs_kwargs = {key: value for key, value in remote_kwargs.items() if key != UPLOAD_KWARGS_KEY}
+    try:
+        return fs_kwargs, UploadSettings(**remote_kwargs.get(UPLOAD_KWARGS_KEY, {}))
+    except TypeError as err:
+        raise DataPipelinesError(f"Wrong '{UPLOAD_KWARGS_KEY}' provider kwargs: {err}") from err
+
+
+def remote_fingerprint(info: Dict[str, Any]) -> str:
+    """
+    Get a value changing whenever the remote file gets rewritten.
+
+    :param info: Details of the remote file, as returned by fsspec's `info`
+    :type info: Dict[str, Any]
+    :return: Entity tag or checksum of the file, if the filesystem provides \
+        any, or its size and modification time otherwise
+    :rtype: str
+    """
+    for key in _REMOTE_FINGERPRINT_KEYS:
+        if info.get(key):
+            return str(info[key]).strip('"')
+    return f"{info.get('size')}:{info.get('mtime', info.get('created'))}"
+
+
+def _file_sha256(file_path: str) -> str:
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _expected_checksums(file_path: str, part_size: int) -> Set[str]:
+    """Get ETags/hashes a provider may report for the file sent in *part_size* parts."""
+    file_md5 = hashlib.md5()
+    part_digests = []
+    with open(file_path, "rb") as f:
+        for part in iter(lambda: f.read(part_size), b""):
+            file_md5.update(part)
+            part_digests.append(hashlib.md5(part).digest())
+    multipart_etag = hashlib.md5(b"".join(part_digests)).hexdigest()
+    return {
+        file_md5.hexdigest(),
+        base64.b64encode(file_md5.digest()).decode("ascii"),
+        f"{multipart_etag}-{len(part_digests)}",
+    }
+
+
+def read_throughput_history(
+    history_path: Union[str, os.PathLike[str]]
+) -> List[Dict[str, Dict[str, float]]]:
+    """
+    :param history_path: File the syncs record their throughput to
+    :type history_path: Union[str, os.PathLike[str]]
+    :return: Files, bytes and seconds of transfers of ``files`` and \
+        ``large_files`` measured by the most recent syncs
+    :rtype: List[Dict[str, Dict[str, float]]]
+    """
+    try:
+        with open(history_path, "r") as history_file:
+            return json.load(history_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+
+def _rate(amount: float, seconds: float) -> Optional[float]:
+    return amount / seconds if amount > 0 and seconds > 0 else None
+
+
+def estimate_upload_duration(
+    history_path: Union[str, os.PathLike[str]], files: int, files_size: int, large_files_size: int
+) -> Optional[float]:
+    """
+    Estimate how long sending files takes, from the throughput measured by
+    previous syncs: files per second for files sent in one request, and
+    bytes per second for large ones, sent in parts.
+
+    :param history_path: File the syncs record their throughput to
+    :type history_path: Union[str, os.PathLike[str]]
+    :param files: Number of files sent in one request
+    :type files: int
+    :param files_size: Total size of files sent in one request
+    :type files_size: int
+    :param large_files_size: Total size of large files
+    :type large_files_size: int
+    :return: Estimated seconds, or ``None`` if nothing got measured yet
+    :rtype: Optional[float]
+    """
+    history = read_throughput_history(history_path)
+    totals = {
+        key: {
+            measure: sum(entry.get(key, {}).get(measure, 0) for entry in history)
+            for measure in ("files", "bytes", "seconds")
+        }
+        for key in ("files", "large_files")
+    }
+    bytes_per_second = _rate(
+        totals["files"]["bytes"] + totals["large_files"]["bytes"],
+        totals["files"]["seconds"] + totals["large_files"]["seconds"],
+    )
+    if bytes_per_second is None:
+        return None
+    files_per_second = _rate(totals["files"]["files"], totals["files"]["seconds"])
+    large_bytes_per_second = _rate(totals["large_files"]["bytes"], totals["large_files"]["seconds"])
+    return (
+        files / files_per_second if files_per_second else files_size / bytes_per_second
+    ) + large_files_size / (large_bytes_per_second or bytes_per_second)
+
+
+class _TransferStats:
+    """Counts files and bytes sent, and the time between the first and last transfer."""
+
+    def __init__(self) -> None:
+        self.files = 0
+        self.bytes = 0
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add(self, size: int, start_time: float, end_time: float) -> None:
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+            self.start_time = min(start_time, self.start_time or start_time)
+            self.end_time = max(end_time, self.end_time or end_time)
+
+    @property
+    def seconds(self) -> float:
+        if self.start_time is None or self.end_time is None:
+            return 0.0
+        return max(self.end_time - self.start_time, 1e-9)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {"files": self.files, "bytes": self.bytes, "seconds": self.seconds}
+
+    def report(self, label: str) -> None:
+        if not self.files:
+            return
+        elapsed = self.seconds
+        echo_info(
+            f"Sent {self.files} {label} ({self.bytes / 1_000_000:.1f} MB) in {elapsed:.2f} s, "
+            f"{self.bytes / 1_000_000 / elapsed:.1f} MB/s"
+        )
 
 
 class LocalRemoteSync:
@@ -20,54 +286,376 @@ class LocalRemoteSync:
     """Path to local directory"""
     remote_path_str: str
     """Path/URI of the cloud storage directory"""
+    max_workers: int
+    """Maximum number of files sent at once"""
+    journal_path: Optional[pathlib.Path]
+    """Journal of completed transfers, letting an interrupted sync resume,
+    or ``None`` to send every file"""
+    throughput_history_path: Optional[pathlib.Path]
+    """File to record the measured throughput to, for
+    :func:`estimate_upload_duration`, or ``None`` not to record it"""
+    upload_settings: UploadSettings
+    """Parameters of uploads of large files, from the ``upload`` provider kwarg"""
+    rate_limiter: RateLimiter
+    """Limiter of the bytes and requests sent, retrying throttled requests"""
+    inventory: Dict[str, Dict[str, Any]]
+    """Remote files, by their paths relative to the remote directory, with
+    their ``size``, ``fingerprint`` (see :func:`remote_fingerprint`) and
+    ``checksum`` (MD5-based ETag or hash, if the provider reports one).
+    Filled by :meth:`list_remote`"""
     _local_directory_suffixes: Set[str]
+    _large_files_part_sizes: Dict[str, int]
+    _journal: Dict[str, Dict[str, Any]]
+    _journal_lock: threading.Lock
 
     def __init__(
         self,
         local_path: Union[str, os.PathLike[str]],
         remote_path: str,
-        remote_kwargs: Dict[str, str],
+        remote_kwargs: Dict[str, Any],
+        max_workers: int = 1,
+        journal_path: Optional[Union[str, os.PathLike[str]]] = None,
+        throughput_history_path: Optional[Union[str, os.PathLike[str]]] = None,
     ) -> None:
         if not pathlib.Path(local_path).exists():
             raise DataPipelinesError(f"{local_path} does not exists. Run 'dp compile' before.")
 
         self.local_path_str = str(local_path).rstrip("/")
         self.local_fs = fsspec.filesystem("file")
+        fs_kwargs, self.upload_settings = split_upload_kwargs(remote_kwargs)
         self.remote_fs, self.remote_path_str = fsspec.core.url_to_fs(
-            remote_path.rstrip("/"), **remote_kwargs
+            remote_path.rstrip("/"), **fs_kwargs
+        )
+        self.max_workers = max_workers
+        self.journal_path = pathlib.Path(journal_path) if journal_path else None
+        self.throughput_history_path = (
+            pathlib.Path(throughput_history_path) if throughput_history_path else None
         )
+        self.rate_limiter = self.upload_settings.rate_limiter()
+        self.inventory = {}
         self._local_directory_suffixes = set()
+        self._large_files_part_sizes = {}
+        self._journal = {}
+        self._journal_lock = threading.Lock()
+        self._small_files_stats = _TransferStats()
+        self._large_files_stats = _TransferStats()
+
+    @property
+    def _journal_remote(self) -> str:
+        protocol = self.remote_fs.protocol
+        protocol = protocol if isinstance(protocol, str) else protocol[0]
+        return f"{protocol}://{self.remote_path_str}"
+
+    def list_remote(self) -> Dict[str, Dict[str, Any]]:
+        """
+        List the remote directory once, with details, into :attr:`inventory`.
+
+        :return: :attr:`inventory`
+        :rtype: Dict[str, Dict[str, Any]]
+        """
+        self.remote_fs.invalidate_cache(self.remote_path_str)
+        start_time = time.perf_counter()
+        self.inventory = {}
+        remote_files = self.rate_limiter.call(
+            self.remote_fs.find, self.remote_path_str, detail=True
+        )
+        for remote_file, info in remote_files.items():
+            self.inventory[remote_file[len(self.remote_path_str) :]] = self._inventory_entry(info)
+        echo_subinfo(
+            f"Listed {len(self.inventory)} remote files "
+            f"({sum(file['size'] or 0 for file in self.inventory.values())} bytes) "
+            f"in {time.perf_counter() - start_time:.2f} s"
+        )
+        return self.inventory
+
+    @staticmethod
+    def _inventory_entry(info: Dict[str, Any]) -> Dict[str, Any]:
+        checksum = info.get("ETag") or info.get("md5Hash")
+        return {
+            "size": info.get("size"),
+            "fingerprint": remote_fingerprint(info),
+            "checksum": str(checksum).strip('"') if checksum else None,
+        }
 
     def sync(self, delete: bool = True) -> None:
         """
         Send local files to the remote directory and (optionally) delete
         unnecessary ones.
 
+        The remote directory gets listed into :attr:`inventory` once, up
+        front; entries of sent files get updated with their details
+        requested right after the transfer. Files whose size and checksum
+        in the inventory match the local ones are not sent again. Deletion
+        starts only once every local file is confirmed to be present in the
+        remote directory. If :attr:`journal_path` is set, files sent by a
+        previous (e.g. interrupted) sync are not sent again either, as long
+        as neither the local nor the remote file has changed since, even
+        if the provider reports no checksums.
+
         :param delete: Whether to delete remote files that are \
         no longer present in local directory
         :type delete: bool
+        :raises DataPipelinesError: Sent file is missing in the remote directory
         """
-        self._push_sync()
+        self._read_journal()
+        self.list_remote()
+        if self._push_sync():
+            self._record_throughput()
+        self._verify()
         if delete:
             self._delete()
+        self._compact_journal()
+
+    def plan(self, delete: bool = True) -> Dict[str, Any]:
+        """
+        Compute what :meth:`sync` would do, without sending or deleting anything.
 
-    def _push_sync(self) -> None:
-        """Push every file to the remote."""
+        :param delete: Whether remote files that are no longer present in \
+        local directory would be deleted
+        :type delete: bool
+        :return: Files to send (``upload``) and to delete (``delete``), \
+            both mapping paths relative to the remote directory to sizes, \
+            and ``large_files``, paths of files to send in parts
+        :rtype: Dict[str, Any]
+        """
+        self._read_journal()
+        self.list_remote()
+        upload: Dict[str, int] = {}
+        local_suffixes = set()
+        for local_file in self.local_fs.find(self.local_path_str):
+            suffix = local_file[len(self.local_path_str) :]
+            local_suffixes.add(suffix)
+            size = os.path.getsize(local_file)
+            local_sha256 = _file_sha256(local_file) if self.journal_path else ""
+            if self._needs_upload(local_file, suffix, size, local_sha256):
+                upload[suffix] = size
+        return {
+            "upload": upload,
+            "delete": {
+                suffix: remote_file["size"] or 0
+                for suffix, remote_file in self.inventory.items()
+                if delete and suffix not in local_suffixes
+            },
+            "large_files": sorted(
+                suffix
+                for suffix, size in upload.items()
+                if size >= self.upload_settings.multipart_threshold
+            ),
+        }
+
+    def _record_throughput(self) -> None:
+        if self.throughput_history_path is None:
+            return
+        history = read_throughput_history(self.throughput_history_path)
+        history.append(
+            {
+                "files": self._small_files_stats.as_dict(),
+                "large_files": self._large_files_stats.as_dict(),
+            }
+        )
+        self.throughput_history_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.throughput_history_path, "w") as history_file:
+            json.dump(history[-_MAX_THROUGHPUT_HISTORY_LENGTH:], history_file, indent=2)
 
-        # TODO: Is it "lazy" (checking what to update) or not?
-        local_directory = self.local_fs.find(self.local_path_str)
+    def _read_journal(self) -> None:
+        self._journal = {}
+        if self.journal_path is None or not self.journal_path.exists():
+            return
+        with open(self.journal_path, "r") as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be cut off by an interruption
+                    continue
+                if entry.get("remote") == self._journal_remote:
+                    self._journal[entry["path"]] = entry
+
+    def _record_transfer(self, entry: Dict[str, Any]) -> None:
+        if self.journal_path is None:
+            return
+        with self._journal_lock:
+            self._journal[entry["path"]] = entry
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.journal_path, "a") as journal_file:
+                journal_file.write(json.dumps(entry) + "\n")
+
+    def _compact_journal(self) -> None:
+        if self.journal_path is None or not self.journal_path.exists():
+            return
+        other_remotes_lines = []
+        with open(self.journal_path, "r") as journal_file:
+            for line in journal_file:
+                try:
+                    if json.loads(line).get("remote") != self._journal_remote:
+                        other_remotes_lines.append(line)
+                except json.JSONDecodeError:
+                    continue
+        with open(self.journal_path, "w") as journal_file:
+            journal_file.writelines(other_remotes_lines)
+            for suffix in sorted(self._local_directory_suffixes):
+                if suffix in self._journal:
+                    journal_file.write(json.dumps(self._journal[suffix]) + "\n")
+
+    def _is_transferred(self, suffix: str, local_sha256: str, local_size: int) -> bool:
+        entry = self._journal.get(suffix)
+        remote_file = self.inventory.get(suffix)
+        if entry is None or remote_file is None or entry["sha256"] != local_sha256:
+            return False
+        if entry["etag"] is None:
+            # Recorded before the remote file details got known
+            return remote_file["size"] == local_size
+        return remote_file["fingerprint"] == entry["etag"]
+
+    def _is_unchanged(self, local_file: str, suffix: str, local_size: int) -> bool:
+        """Check the local file against size and checksum of the remote one, if reported."""
+        remote_file = self.inventory.get(suffix)
+        if (
+            remote_file is None
+            or remote_file["size"] != local_size
+            or remote_file["checksum"] is None
+        ):
+            return False
+        return remote_file["checksum"] in _expected_checksums(
+            local_file, self.upload_settings.part_size_for(local_size)
+        )
+
+    def _needs_upload(self, local_file: str, suffix: str, size: int, local_sha256: str) -> bool:
+        if self.journal_path and self._is_transferred(suffix, local_sha256, size):
+            return False
+        return not self._is_unchanged(local_file, suffix, size)
+
+    def _put_file_kwargs(self, size: int) -> Dict[str, Any]:
+        remote_fs_class = type(self.remote_fs)
+        put_file = getattr(remote_fs_class, "_put_file", remote_fs_class.put_file)
+        parameters = inspect.signature(put_file).parameters
+        put_file_kwargs: Dict[str, Any] = {}
+        if "chunksize" in parameters:
+            put_file_kwargs["chunksize"] = self.upload_settings.part_size_for(size)
+        if self.upload_settings.max_concurrency and "max_concurrency" in parameters:
+            put_file_kwargs["max_concurrency"] = self.upload_settings.max_concurrency
+        return put_file_kwargs
+
+    def _push_file(self, local_file: str, suffix: str) -> bool:
+        remote_path_with_suffix = self.remote_path_str + suffix
+        size = os.path.getsize(local_file)
+        local_sha256 = _file_sha256(local_file) if self.journal_path else ""
+        if not self._needs_upload(local_file, suffix, size, local_sha256):
+            return False
+        echo_subinfo(f"- Pushing {str(local_file)} to {remote_path_with_suffix}")
+        start_time = time.perf_counter()
+        requests = self.upload_settings.part_count(size)
+        if self.rate_limiter.max_bytes_per_second:
+            self._put_file_throttled(local_file, remote_path_with_suffix, size, requests)
+        elif size >= self.upload_settings.multipart_threshold:
+            self.rate_limiter.call(
+                self.remote_fs.put_file,
+                local_file,
+                remote_path_with_suffix,
+                requests=requests,
+                **self._put_file_kwargs(size),
+            )
+        else:
+            self.rate_limiter.call(self.remote_fs.put_file, local_file, remote_path_with_suffix)
+        if size >= self.upload_settings.multipart_threshold:
+            self._large_files_part_sizes[suffix] = self.upload_settings.part_size_for(size)
+            self._large_files_stats.add(size, start_time, time.perf_counter())
+        else:
+            self._small_files_stats.add(size, start_time, time.perf_counter())
+        self.remote_fs.invalidate_cache(remote_path_with_suffix)
+        self.inventory[suffix] = self._inventory_entry(
+            self.rate_limiter.call(self.remote_fs.info, remote_path_with_suffix)
+        )
+        if self.journal_path:
+            self._record_transfer(
+                {
+                    "remote": self._journal_remote,
+                    "path": suffix,
+                    "sha256": local_sha256,
+                    "etag": self.inventory[suffix]["fingerprint"],
+                }
+            )
+        return True
+
+    def _put_file_throttled(
+        self, local_file: str, remote_path_with_suffix: str, size: int, requests: int
+    ) -> None:
+        """Write the file in chunks, each one sent once the bytes limit allows it."""
+        block_size = (
+            self.upload_settings.part_size_for(size)
+            if size >= self.upload_settings.multipart_threshold
+            else None
+        )
+        with open(local_file, "rb") as local_file_obj:
+            reader = ThrottledReader(local_file_obj, self.rate_limiter)
+
+            def _write() -> None:
+                reader.seek(0)
+                with self.remote_fs.open(
+                    remote_path_with_suffix, "wb", block_size=block_size
+                ) as remote_file_obj:
+                    shutil.copyfileobj(reader, remote_file_obj, _THROTTLED_CHUNK_SIZE)
+
+            self.rate_limiter.call(_write, requests=requests)
+
+    def _push_sync(self) -> int:
+        """
+        Push every file to the remote, the largest first.
+
+        :return: Number of files sent
+        :rtype: int
+        """
+        local_directory = sorted(
+            self.local_fs.find(self.local_path_str), key=os.path.getsize, reverse=True
+        )
         self._local_directory_suffixes = set()
-        for local_file in local_directory:
-            local_file_suffix = local_file[len(self.local_path_str) :]
-            self._local_directory_suffixes.add(local_file_suffix)
-            remote_path_with_suffix = self.remote_path_str + local_file_suffix
-            echo_subinfo(f"- Pushing {str(local_file)} to {remote_path_with_suffix}")
-            self.remote_fs.put_file(local_file, remote_path_with_suffix)
+        self._large_files_part_sizes = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = []
+            for local_file in local_directory:
+                local_file_suffix = local_file[len(self.local_path_str) :]
+                self._local_directory_suffixes.add(local_file_suffix)
+                futures.append(executor.submit(self._push_file, local_file, local_file_suffix))
+            # Re-raise the first error, if any
+            pushed_count = sum(1 for future in futures if future.result())
+        skipped_count = len(futures) - pushed_count
+        if skipped_count:
+            echo_info(f"Skipped {skipped_count} files already present in the remote directory")
+        self._small_files_stats.report("files")
+        self._large_files_stats.report("large files")
+        self.rate_limiter.report()
+        return pushed_count
+
+    def _verify(self) -> None:
+        """Make sure every local file is present in the remote directory."""
+        for suffix in sorted(self._local_directory_suffixes):
+            remote_path_with_suffix = self.remote_path_str + suffix
+            local_size = os.path.getsize(self.local_path_str + suffix)
+            remote_file = self.inventory.get(suffix, {})
+            if remote_file.get("size") != local_size:
+                raise DataPipelinesError(
+                    f"Could not confirm {remote_path_with_suffix} got sent: expected "
+                    f"{local_size} bytes, found {remote_file.get('size')}. "
+                    "Remote files are not deleted."
+                )
+            remote_checksum = remote_file.get("checksum")
+            if (
+                self.upload_settings.part_checksums
+                and suffix in self._large_files_part_sizes
+                and remote_checksum is not None
+                and remote_checksum
+                not in _expected_checksums(
+                    self.local_path_str + suffix, self._large_files_part_sizes[suffix]
+                )
+            ):
+                raise DataPipelinesError(
+                    f"Checksum {remote_checksum} of {remote_path_with_suffix} does not match "
+                    "the local file. Remote files are not deleted."
+                )
 
     def _delete(self) -> None:
         """Remove every file from remote that's not local."""
-        remote_directory = self.remote_fs.find(self.remote_path_str)
-        for remote_file in remote_directory:
-            remote_file_suffix = remote_file[len(self.remote_path_str) :]
+        for remote_file_suffix in sorted(self.inventory):
             if remote_file_suffix not in self._local_directory_suffixes:
-                self.remote_fs.rm(remote_file)
+                self.rate_limiter.call(self.remote_fs.rm, self.remote_path_str + remote_file_suffix)
+                del self.inventory[remote_file_suffix]
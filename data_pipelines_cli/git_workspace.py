@@ -0,0 +1,109 @@
+import pathlib
+import shutil
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from git import Repo
+
+from .cli_utils import echo_info, echo_subinfo
+
+
+def stage_all_changes(repo: Repo) -> List[Tuple[str, str]]:
+    """
+    Stage all changes of the working tree and list staged files.
+
+    :param repo: Repository to stage changes in
+    :type repo: Repo
+    :return: Status letters (e.g. `A`, `M`, `D`) and paths of the files \
+        that differ from ``HEAD``; empty if there is nothing to commit
+    :rtype: List[Tuple[str, str]]
+    """
+    repo.git.add(all=True)
+    changed_files = []
+    for line in repo.git.diff("--cached", "--name-status", "--no-renames").splitlines():
+        status, _, path = line.partition("\t")
+        changed_files.append((status, path))
+    return changed_files
+
+
+class GitWorkspace:
+    """
+    Persistent working copy of a single branch of a remote repository.
+
+    Instead of cloning the whole history on every run, the repository is
+    initialized once and then refreshed with a shallow fetch of the branch.
+    The working tree can be limited to a few directories with a sparse
+    checkout; files in the root of the repository are always checked out.
+    """
+
+    path: pathlib.Path
+    """Local directory holding the working copy"""
+    url: str
+    """URI of the remote repository"""
+    branch: str
+    """Name of the branch to check out and push to"""
+    sparse_paths: Optional[List[str]]
+    """Directories to check out, or ``None`` to check out the whole tree"""
+    git_env: Dict[str, str]
+    """Environment variables required by Git to communicate with the remote"""
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        url: str,
+        branch: str,
+        key_path: Optional[str] = None,
+        sparse_paths: Optional[Sequence[str]] = None,
+    ) -> None:
+        self.path = path
+        self.url = url
+        self.branch = branch
+        self.sparse_paths = list(sparse_paths) if sparse_paths is not None else None
+        self.git_env = {"GIT_SSH_COMMAND": f"ssh -i {key_path}"} if key_path else {}
+
+    def sync(self) -> Repo:
+        """
+        Bring the working copy to the state of the remote branch, discarding
+        any local changes and untracked files.
+
+        :return: Repository with the remote branch checked out and tracked
+        :rtype: Repo
+        """
+        repo = self._open_or_init()
+        with repo.git.custom_environment(**self.git_env):
+            echo_info(f"Fetching {self.branch} branch of {self.url}")
+            repo.git.fetch(
+                "--depth=1",
+                "--no-tags",
+                "origin",
+                f"+refs/heads/{self.branch}:refs/remotes/origin/{self.branch}",
+            )
+        self._configure_sparse_checkout(repo)
+        repo.git.checkout("--force", "-B", self.branch, "--track", f"origin/{self.branch}")
+        repo.git.clean("-ffdx")
+        return repo
+
+    def _open_or_init(self) -> Repo:
+        if self.path.exists() and not self.path.joinpath(".git").is_dir():
+            echo_subinfo(f"Removing {self.path}, as it is not a Git repository")
+            shutil.rmtree(self.path)
+
+        if not self.path.exists():
+            echo_subinfo(f"Initializing Git workspace in {self.path}")
+            repo = Repo.init(self.path)
+            repo.create_remote("origin", self.url)
+            return repo
+
+        repo = Repo(self.path)
+        origin = repo.remote(name="origin")
+        if origin.url != self.url:
+            origin.set_url(self.url)
+        return repo
+
+    def _configure_sparse_checkout(self, repo: Repo) -> None:
+        if self.sparse_paths is None:
+            # Sparse checkout settings are kept per worktree, so disabling
+            # them unconditionally is simpler than checking if they are set
+            repo.git.sparse_checkout("disable")
+            return
+        repo.git.sparse_checkout("init", "--cone")
+        repo.git.sparse_checkout("set", *self.sparse_paths)
@@ -1,52 +1,277 @@
 from __future__ import annotations
 
+import functools
+import json
+import locale
+import mmap
 import os
+import pathlib
 import re
 import shutil
 import subprocess
 import sys
 import tempfile
-from typing import Optional, Union
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
 
 import click
+import yaml
 
 
-# Python's `sed` equivalent, based on the following answer:
-# https://stackoverflow.com/a/31499114
-def replace(filename: Union[str, os.PathLike[str]], pattern: str, replacement: str) -> None:
+def _combine_patterns(patterns: Sequence[str], literal: bool) -> re.Pattern[str]:
+    if literal:
+        # The longest of the literals starting at the same position wins
+        return re.compile(
+            "|".join(re.escape(pattern) for pattern in sorted(patterns, key=len, reverse=True))
+        )
+    if len(patterns) == 1:
+        # Global flags, e.g. ``(?i)``, are allowed at the start of a single pattern only
+        return re.compile(patterns[0])
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+
+def _file_contains_any(
+    filename: Union[str, os.PathLike[str]], combined_pattern: re.Pattern[str], literal: bool
+) -> bool:
+    if literal:
+        # The encoded literals are found in the encoded file exactly where
+        # they are in its text, so the file needs not to be decoded.
+        encoding = locale.getpreferredencoding(False)
+        bytes_pattern = re.compile(combined_pattern.pattern.encode(encoding))
+        with open(filename, "rb") as src_file:
+            if os.fstat(src_file.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(src_file.fileno(), 0, access=mmap.ACCESS_READ) as src_mmap:
+                return bytes_pattern.search(src_mmap) is not None
+    # Classes like ``\w`` match differently in bytes, so regular expressions
+    # are searched for in the text, line by line, just like they get replaced.
+    with open(filename, newline="") as src_file:
+        return any(combined_pattern.search(line) for line in src_file)
+
+
+def _rewrite_file_atomically(
+    filename: Union[str, os.PathLike[str]], substitute: Callable[[str], str]
+) -> None:
+    # The temporary file lives in the same directory, so the final
+    # `os.replace` is an atomic rename rather than a cross-device copy.
+    dir_name = os.path.dirname(os.path.abspath(filename))
+    tmp_file = tempfile.NamedTemporaryFile(mode="w", dir=dir_name, newline="", delete=False)
+    replaced = False
+    try:
+        with tmp_file, open(filename, newline="") as src_file:
+            for line in src_file:
+                tmp_file.write(substitute(line))
+        # Overwrite the original file with the munged temporary file in a
+        # manner preserving file attributes (e.g., permissions).
+        shutil.copystat(filename, tmp_file.name)
+        os.replace(tmp_file.name, filename)
+        replaced = True
+    finally:
+        if not replaced:
+            os.remove(tmp_file.name)
+
+
+def replace_many(
+    filenames: Iterable[Union[str, os.PathLike[str]]],
+    replacements: Dict[str, str],
+    literal: bool = False,
+) -> List[Union[str, os.PathLike[str]]]:
     """
-    Perform the pure-Python equivalent of in-place `sed` substitution: e.g.,
-    ``sed -i -e 's/'${pattern}'/'${replacement}' "${filename}"``.
+    Substitute every pattern from *replacements* with its value in each of
+    *filenames*, in a single pass over every file.
+
+    The patterns are combined into a single alternation, applied once, so
+    a replacement is never matched by another pattern. Where more than one
+    pattern matches at the same position, the first one (or, if *literal*,
+    the longest one) is replaced. Global flags (e.g. ``(?i)``) and
+    numbered backreferences within a pattern (e.g. ``\\1``) may only be used
+    with a single pattern; groups in replacements work with any number.
+
+    A file is first checked for any occurrence of the patterns (through
+    `mmap`, if *literal*), and it is rewritten (atomically, using a
+    temporary file in the same directory) only if something is to be
+    replaced. Patterns are matched line by line, hence they cannot span
+    multiple lines.
 
-    Beware however, it uses Python regex dialect instead of `sed`'s one.
-    It can introduce regex-related bugs.
+    :param filenames: Paths to the files to modify
+    :type filenames: Iterable[Union[str, os.PathLike[str]]]
+    :param replacements: Dictionary of patterns and their replacements
+    :type replacements: Dict[str, str]
+    :param literal: Whether to treat patterns as plain strings instead of \
+        Python regular expressions
+    :type literal: bool
+    :return: Paths to the files that got modified
+    :rtype: List[Union[str, os.PathLike[str]]]
     """
+    patterns = list(replacements.keys())
+    if not patterns:
+        return []
+    combined_pattern = _combine_patterns(patterns, literal)
+    if literal:
 
-    # For efficiency, precompile the passed regular expression.
-    pattern_compiled = re.compile(pattern)
+        def substitute_match(match: re.Match[str]) -> str:
+            return replacements[match.group(0)]
 
-    # For portability, NamedTemporaryFile() defaults to mode "w+b" (i.e.,
-    # binary writing with updating). This is usually a good thing. In this
-    # case, however, binary writing imposes non-trivial encoding constraints
-    # trivially resolved by switching to text writing. Let's do that.
-    with tempfile.NamedTemporaryFile(mode="w", delete=False) as tmp_file:
-        with open(filename) as src_file:
-            for line in src_file:
-                tmp_file.write(pattern_compiled.sub(replacement, line))
+    else:
+        # For efficiency, precompile the passed regular expressions.
+        compiled_replacements = [
+            (re.compile(pattern), replacement) for pattern, replacement in replacements.items()
+        ]
 
-    # Overwrite the original file with the munged temporary file in a
-    # manner preserving file attributes (e.g., permissions).
-    shutil.copystat(filename, tmp_file.name)
-    shutil.move(tmp_file.name, filename)
+        def substitute_match(match: re.Match[str]) -> str:
+            # The first pattern matching where the alternation did, matching
+            # the same text, expands its replacement with its own groups
+            for pattern_compiled, replacement in compiled_replacements:
+                pattern_match = pattern_compiled.match(match.string, match.start())
+                if pattern_match is not None:
+                    return pattern_match.expand(replacement)
+            return match.group(0)
 
+    def substitute(line: str) -> str:
+        return combined_pattern.sub(substitute_match, line)
 
-def git_revision_hash() -> Optional[str]:
+    modified_files = []
+    for filename in filenames:
+        if _file_contains_any(filename, combined_pattern, literal):
+            _rewrite_file_atomically(filename, substitute)
+            modified_files.append(filename)
+    return modified_files
+
+
+def replace(
+    filename: Union[str, os.PathLike[str]], pattern: str, replacement: str, literal: bool = False
+) -> bool:
     """
-    Get current Git revision hash, if Git is installed and any revision exists.
+    Perform the pure-Python equivalent of in-place `sed` substitution: e.g.,
+    ``sed -i -e 's/'${pattern}'/'${replacement}' "${filename}"``.
 
-    :return: Git revision hash, if possible.
-    :rtype: Optional[str]
+    Beware however, unless *literal* is set, it uses Python regex dialect
+    instead of `sed`'s one. It can introduce regex-related bugs.
+
+    :param filename: Path to the file to modify
+    :type filename: Union[str, os.PathLike[str]]
+    :param pattern: Python regular expression or, if *literal*, plain string to replace
+    :type pattern: str
+    :param replacement: String to substitute the matched pattern with
+    :type replacement: str
+    :param literal: Whether to treat *pattern* as a plain string
+    :type literal: bool
+    :return: Whether the file got modified
+    :rtype: bool
+    """
+    return bool(replace_many([filename], {pattern: replacement}, literal))
+
+
+def write_if_changed(filename: Union[str, os.PathLike[str]], content: str) -> bool:
+    """
+    Save *content* to *filename*, unless the file already holds exactly
+    the same content.
+
+    Leaving unchanged files alone keeps their modification times, so tools
+    relying on them (e.g. dbt's partial parsing) do not see spurious
+    changes. The file gets replaced atomically, using a temporary file in
+    the same directory.
+
+    :param filename: Path to the file to write
+    :type filename: Union[str, os.PathLike[str]]
+    :param content: Text to save in the file
+    :type content: str
+    :return: Whether the file got (re)written
+    :rtype: bool
     """
+    encoded_content = content.encode()
+    try:
+        with open(filename, "rb") as old_file:
+            if old_file.read() == encoded_content:
+                return False
+    except FileNotFoundError:
+        pass
+
+    dir_name = os.path.dirname(os.path.abspath(filename))
+    with tempfile.NamedTemporaryFile(mode="wb", dir=dir_name, delete=False) as tmp_file:
+        tmp_file.write(encoded_content)
+    try:
+        if os.path.exists(filename):
+            shutil.copystat(filename, tmp_file.name)
+        else:
+            # `NamedTemporaryFile` is private to the user, unlike a file
+            # created with a plain `open`
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_file.name, 0o666 & ~umask)
+        os.replace(tmp_file.name, filename)
+    except OSError:
+        os.remove(tmp_file.name)
+        raise
+    return True
+
+
+_GIT_HASH_REGEX = re.compile(r"^(?:[0-9a-f]{40}|[0-9a-f]{64})$")
+
+
+def _find_git_dir(path: pathlib.Path) -> Optional[pathlib.Path]:
+    for directory in (path, *path.parents):
+        dot_git = directory.joinpath(".git")
+        if dot_git.is_dir():
+            return dot_git
+        if dot_git.is_file():
+            # Worktrees and submodules keep a `gitdir: <path>` pointer instead
+            with open(dot_git, "r") as dot_git_file:
+                content = dot_git_file.read().strip()
+            if not content.startswith("gitdir:"):
+                return None
+            return directory.joinpath(content[len("gitdir:") :].strip())
+    return None
+
+
+def _get_git_common_dir(git_dir: pathlib.Path) -> pathlib.Path:
+    commondir_path = git_dir.joinpath("commondir")
+    if not commondir_path.is_file():
+        return git_dir
+    with open(commondir_path, "r") as commondir_file:
+        return git_dir.joinpath(commondir_file.read().strip())
+
+
+def _read_packed_ref(common_dir: pathlib.Path, ref_name: str) -> Optional[str]:
+    packed_refs_path = common_dir.joinpath("packed-refs")
+    if not packed_refs_path.is_file():
+        return None
+    with open(packed_refs_path, "r") as packed_refs:
+        for line in packed_refs:
+            if line.startswith(("#", "^")):
+                continue
+            sha, _, name = line.strip().partition(" ")
+            if name == ref_name:
+                return sha
+    return None
+
+
+def _read_git_revision_hash_from_files(path: pathlib.Path) -> Optional[str]:
+    git_dir = _find_git_dir(path)
+    if git_dir is None or not git_dir.joinpath("HEAD").is_file():
+        return None
+    common_dir = _get_git_common_dir(git_dir)
+
+    with open(git_dir.joinpath("HEAD"), "r") as head_file:
+        head = head_file.read().strip()
+    # Symbolic refs may point to other symbolic refs, but not endlessly
+    for _ in range(5):
+        if not head.startswith("ref:"):
+            # Detached HEAD
+            return head if _GIT_HASH_REGEX.match(head) else None
+        ref_name = head[len("ref:") :].strip()
+        for ref_dir in (git_dir, common_dir):
+            ref_path = ref_dir.joinpath(ref_name)
+            if ref_path.is_file():
+                with open(ref_path, "r") as ref_file:
+                    head = ref_file.read().strip()
+                break
+        else:
+            packed_sha = _read_packed_ref(common_dir, ref_name)
+            return packed_sha if packed_sha and _GIT_HASH_REGEX.match(packed_sha) else None
+    return None
+
+
+def _git_revision_hash_from_subprocess() -> Optional[str]:
     try:
         rev_process = subprocess.run(["git", "rev-parse", "HEAD"], check=True, capture_output=True)
         return rev_process.stdout.decode("ascii").strip()
@@ -66,3 +291,66 @@ def git_revision_hash() -> Optional[str]:
         )
         click.echo(err.stderr, file=sys.stderr)
         return None
+
+
+@functools.lru_cache(maxsize=None)
+def _git_revision_hash(working_dir: str) -> Optional[str]:
+    if "GIT_DIR" not in os.environ:
+        revision_hash = _read_git_revision_hash_from_files(pathlib.Path(working_dir))
+        if revision_hash:
+            return revision_hash
+    # Unborn branches, reftables, `$GIT_DIR` and the like are left to Git itself
+    return _git_revision_hash_from_subprocess()
+
+
+def git_revision_hash() -> Optional[str]:
+    """
+    Get current Git revision hash, if Git is installed and any revision exists.
+
+    The hash is read straight from the `.git` directory (worktrees, detached
+    HEAD and packed refs included), falling back to ``git rev-parse HEAD``
+    only if that is not possible. The result is memoized per working directory.
+
+    :return: Git revision hash, if possible.
+    :rtype: Optional[str]
+    """
+    return _git_revision_hash(os.getcwd())
+
+
+def git_ancestor_revision_hashes(max_count: int) -> List[str]:
+    """
+    Get hashes of up to *max_count* ancestors of the current Git revision,
+    the nearest first. The current revision itself is not included.
+
+    :param max_count: Maximum number of hashes to return
+    :type max_count: int
+    :return: Ancestor revision hashes, empty if they cannot be read
+    :rtype: List[str]
+    """
+    if max_count <= 0:
+        return []
+    try:
+        rev_process = subprocess.run(
+            ["git", "rev-list", "--skip=1", f"--max-count={max_count}", "HEAD"],
+            check=True,
+            capture_output=True,
+        )
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        return []
+    return rev_process.stdout.decode("ascii").split()
+
+
+def read_json_or_yaml(file: IO[str]) -> Any:
+    """
+    Parse *file* as JSON, falling back to YAML.
+
+    :param file: Seekable text file, e.g. opened by a :class:`click.File` option
+    :type file: IO[str]
+    :return: Parsed document
+    :rtype: Any
+    """
+    try:
+        return json.load(file)
+    except json.JSONDecodeError:
+        file.seek(0)
+        return yaml.safe_load(file)
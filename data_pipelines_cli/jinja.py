@@ -1,22 +1,24 @@
+from __future__ import annotations
+
+import copy
 import os
-from typing import Any, Dict
+import time
+from typing import Any, Dict, Optional
 
-from jinja2 import BaseLoader, DictLoader
-from jinja2.nativetypes import NativeEnvironment
+from jinja2 import StrictUndefined, TemplateError, Undefined
+from jinja2.nativetypes import NativeEnvironment, native_concat
 
 from data_pipelines_cli.errors import JinjaVarKeyError
 
 
-def _prepare_jinja_replace_environment(
-    jinja_loader: BaseLoader, dbt_vars: Dict[str, Any]
-) -> NativeEnvironment:
+def _prepare_jinja_replace_environment(dbt_vars: Dict[str, Any]) -> NativeEnvironment:
     def _jinja_vars(var_name: str) -> Any:
         return dbt_vars[var_name]
 
     def _jinja_env_vars(var_name: str) -> Any:
         return os.environ[var_name]
 
-    jinja_env = NativeEnvironment(loader=jinja_loader)
+    jinja_env = NativeEnvironment()
     # Hacking Jinja to use our functions, following:
     # https://stackoverflow.com/a/6038550
     jinja_env.globals["var"] = _jinja_vars
@@ -25,34 +27,158 @@ def _prepare_jinja_replace_environment(
     return jinja_env
 
 
+class _RuntimeOnlyValueError(Exception):
+    """Value referenced in a template is known only where the DAG runs."""
+
+
+def _prepare_build_time_environment(dbt_vars: Dict[str, Any]) -> NativeEnvironment:
+    def _jinja_vars(var_name: str) -> Any:
+        return dbt_vars[var_name]
+
+    def _jinja_env_vars(var_name: str) -> Any:
+        # Values of environment variables, e.g. secrets, are not to be saved
+        raise _RuntimeOnlyValueError(var_name)
+
+    # Any other name (e.g. Airflow's ``ds`` or ``var.value``) fails rendering
+    jinja_env = NativeEnvironment(undefined=StrictUndefined)
+    jinja_env.globals["var"] = _jinja_vars
+    jinja_env.globals["env_var"] = _jinja_env_vars
+
+    return jinja_env
+
+
+def _is_templated(value: str, jinja_env: NativeEnvironment) -> bool:
+    return (
+        jinja_env.variable_start_string in value
+        or jinja_env.block_start_string in value
+        or jinja_env.comment_start_string in value
+    )
+
+
+def _render_value(
+    value: Any,
+    path: str,
+    jinja_env: NativeEnvironment,
+    templated_paths: Optional[Dict[str, float]],
+    keep_unrendered: bool = False,
+) -> Any:
+    if isinstance(value, dict):
+        for key, sub_value in value.items():
+            value[key] = _render_value(
+                sub_value,
+                f"{path}.{key}" if path else str(key),
+                jinja_env,
+                templated_paths,
+                keep_unrendered,
+            )
+        return value
+    if isinstance(value, list):
+        for index, sub_value in enumerate(value):
+            value[index] = _render_value(
+                sub_value, f"{path}[{index}]", jinja_env, templated_paths, keep_unrendered
+            )
+        return value
+    if not isinstance(value, str):
+        # Nothing to render: numbers, booleans and ``None`` are left as they are
+        return value
+    if keep_unrendered and not _is_templated(value, jinja_env):
+        return value
+    if value and "\n" not in value and "\r" not in value and not _is_templated(value, jinja_env):
+        # A plain string renders to itself, so only its conversion to a
+        # native type (e.g. ``"123"`` to ``123``) is done, without compiling
+        # a template. Empty and multiline strings still get rendered, as
+        # Jinja turns them into ``None`` and strips a trailing newline.
+        return native_concat([value])
+
+    start_time = time.perf_counter()
+    try:
+        rendered_value = jinja_env.from_string(value).render()
+    except KeyError as key_error:
+        if keep_unrendered:
+            return value
+        # Variable does not exist and _jinja_vars or _jinja_env_vars thrown
+        raise JinjaVarKeyError(key_error.args[0])
+    except (TemplateError, _RuntimeOnlyValueError):
+        if keep_unrendered:
+            return value
+        raise
+    if keep_unrendered and isinstance(rendered_value, Undefined):
+        # A lone undefined name (e.g. ``{{ ds }}``) is returned, not rendered
+        return value
+    if templated_paths is not None:
+        templated_paths[path] = time.perf_counter() - start_time
+    return rendered_value
+
+
+def render_templated_tree(
+    templated_tree: Any,
+    dbt_vars: Dict[str, Any],
+    templated_paths: Optional[Dict[str, float]] = None,
+) -> Any:
+    """
+    Render Jinja templates found anywhere in a YAML-like tree of dictionaries,
+    lists and scalars, in a single pass.
+
+    Dictionaries and lists are updated **in place**; the rendered tree (or
+    the rendered scalar, if *templated_tree* is not a container) is returned.
+
+    :param templated_tree: Dictionary, list or scalar with Jinja-templated strings
+    :type templated_tree: Any
+    :param dbt_vars: Variables to replace
+    :type dbt_vars: Dict[str, Any]
+    :param templated_paths: If passed, gets filled with paths of rendered \
+        values (e.g. ``source.config.tables[0]``) and time spent rendering \
+        each of them, in seconds
+    :type templated_paths: Optional[Dict[str, float]]
+    :return: Tree with rendered values
+    :rtype: Any
+    :raises JinjaVarKeyError: Variable referenced in Jinja template does not exist
+    """
+    jinja_env = _prepare_jinja_replace_environment(dbt_vars)
+    return _render_value(templated_tree, "", jinja_env, templated_paths)
+
+
+def render_build_time_values(templated_tree: Any, dbt_vars: Dict[str, Any]) -> Any:
+    """
+    Render Jinja templates depending on *dbt_vars* only, found anywhere in a
+    YAML-like tree of dictionaries, lists and scalars.
+
+    Other values are left as they are, including templates referencing
+    environment variables (``env_var``), missing variables or anything
+    rendered only where the DAG runs, e.g. Airflow macros like ``{{ ds }}``
+    or ``{{ var.value.x }}``. Dictionaries and lists are updated **in place**.
+
+    :param templated_tree: Dictionary, list or scalar with Jinja-templated strings
+    :type templated_tree: Any
+    :param dbt_vars: Variables to replace
+    :type dbt_vars: Dict[str, Any]
+    :return: Tree with rendered values
+    :rtype: Any
+    """
+    jinja_env = _prepare_build_time_environment(dbt_vars)
+    return _render_value(templated_tree, "", jinja_env, None, keep_unrendered=True)
+
+
 def replace_vars_with_values(
-    templated_dictionary: Dict[str, Any], dbt_vars: Dict[str, Any]
+    templated_dictionary: Dict[str, Any],
+    dbt_vars: Dict[str, Any],
+    templated_paths: Optional[Dict[str, float]] = None,
 ) -> Dict[str, Any]:
     """
     Replace variables in given dictionary using Jinja template in its values.
 
+    Nested dictionaries and lists get rendered as well. *templated_dictionary*
+    itself is left untouched.
+
     :param templated_dictionary: Dictionary with Jinja-templated values
     :type templated_dictionary: Dict[str, Any]
     :param dbt_vars: Variables to replace
     :type dbt_vars: Dict[str, Any]
+    :param templated_paths: If passed, gets filled with paths of rendered \
+        values and time spent rendering each of them, in seconds
+    :type templated_paths: Optional[Dict[str, float]]
     :return: Dictionary with replaced variables
     :rtype: Dict[str, Any]
     :raises JinjaVarKeyError: Variable referenced in Jinja template does not exist
     """
-    jinja_loader = DictLoader(templated_dictionary)
-    jinja_env = _prepare_jinja_replace_environment(jinja_loader, dbt_vars)
-
-    rendered_settings = {}
-    for setting_key, setting_old_value in templated_dictionary.items():
-        if isinstance(setting_old_value, dict):
-            rendered_settings[setting_key] = replace_vars_with_values(setting_old_value, dbt_vars)
-        else:
-            try:
-                rendered_settings[setting_key] = jinja_env.get_template(setting_key).render()
-            except TypeError:
-                # Jinja is accepting only str or Template and fails on int, etc.
-                rendered_settings[setting_key] = setting_old_value
-            except KeyError as key_error:
-                # Variable does not exist and _jinja_vars or _jinja_env_vars thrown
-                raise JinjaVarKeyError(key_error.args[0])
-    return rendered_settings
+    return render_templated_tree(copy.deepcopy(templated_dictionary), dbt_vars, templated_paths)
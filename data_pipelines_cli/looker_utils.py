@@ -1,45 +1,589 @@
+import concurrent.futures
+import filecmp
+import functools
 import glob
+import hashlib
+import importlib.metadata
+import json
 import os
 import pathlib
-from shutil import copy, rmtree
-from typing import Any, Dict, Tuple
+from shutil import copy
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import requests
 import yaml
 from git import Repo
 
 from .cli_constants import BUILD_DIR
-from .cli_utils import echo_info, subprocess_run
+from .cli_utils import echo_info, echo_subinfo, echo_warning
+from .command_context import CommandContext
 from .config_generation import (
     generate_profiles_yml,
     read_dictionary_from_config_directory,
 )
 from .dbt_utils import run_dbt_command
+from .errors import DataPipelinesError
+from .git_workspace import GitWorkspace, stage_all_changes
+from .io_utils import write_if_changed
+from .manifest_utils import iter_manifest_nodes, read_manifest_metadata
 
 LOOKML_DEST_PATH: pathlib.Path = BUILD_DIR.joinpath("lookml")
 LOOKML_VIEWS_SUBDIR: str = "views"
+LOOKML_CACHE_FILE_NAME: str = ".dp_lookml_cache.json"
+#: Version of the generated LookML, to be increased whenever the output of
+#: the generation changes, so files generated before get regenerated
+LOOKML_CACHE_VERSION: int = 1
 
 
-def read_looker_config(env: str) -> Dict[str, Any]:
+def read_looker_config(env: str, context: Optional[CommandContext] = None) -> Dict[str, Any]:
     """
     Read Looker configuration.
 
     :param env: Name of the environment
     :type env: str
+    :param context: Context of the running command, if any
+    :type context: Optional[CommandContext]
     :return: Compiled dictionary
     :rtype: Dict[str, Any]
     """
+    if context is not None:
+        return context.read_config("looker.yml")
     return read_dictionary_from_config_directory(BUILD_DIR.joinpath("dag"), env, "looker.yml")
 
 
-def generate_lookML_model() -> None:
+LOOKER_DTYPE_MAP: Dict[str, Dict[str, str]] = {
+    "bigquery": {
+        "INT64": "number",
+        "INTEGER": "number",
+        "FLOAT": "number",
+        "FLOAT64": "number",
+        "NUMERIC": "number",
+        "BIGNUMERIC": "number",
+        "BOOLEAN": "yesno",
+        "STRING": "string",
+        "TIMESTAMP": "timestamp",
+        "DATETIME": "datetime",
+        "DATE": "date",
+        "TIME": "string",
+        "BOOL": "yesno",
+        "ARRAY": "string",
+        "GEOGRAPHY": "string",
+    },
+    "snowflake": {
+        "NUMBER": "number",
+        "DECIMAL": "number",
+        "NUMERIC": "number",
+        "INT": "number",
+        "INTEGER": "number",
+        "BIGINT": "number",
+        "SMALLINT": "number",
+        "FLOAT": "number",
+        "FLOAT4": "number",
+        "FLOAT8": "number",
+        "DOUBLE": "number",
+        "DOUBLE PRECISION": "number",
+        "REAL": "number",
+        "VARCHAR": "string",
+        "CHAR": "string",
+        "CHARACTER": "string",
+        "STRING": "string",
+        "TEXT": "string",
+        "BINARY": "string",
+        "VARBINARY": "string",
+        "BOOLEAN": "yesno",
+        "DATE": "date",
+        "DATETIME": "datetime",
+        "TIME": "string",
+        "TIMESTAMP": "timestamp",
+        "TIMESTAMP_NTZ": "timestamp",
+        "VARIANT": "string",
+        "OBJECT": "string",
+        "ARRAY": "string",
+        "GEOGRAPHY": "string",
+    },
+    "redshift": {
+        "SMALLINT": "number",
+        "INT2": "number",
+        "INTEGER": "number",
+        "INT": "number",
+        "INT4": "number",
+        "BIGINT": "number",
+        "INT8": "number",
+        "DECIMAL": "number",
+        "NUMERIC": "number",
+        "REAL": "number",
+        "FLOAT4": "number",
+        "DOUBLE PRECISION": "number",
+        "FLOAT8": "number",
+        "FLOAT": "number",
+        "BOOLEAN": "yesno",
+        "BOOL": "yesno",
+        "CHAR": "string",
+        "CHARACTER": "string",
+        "NCHAR": "string",
+        "BPCHAR": "string",
+        "VARCHAR": "string",
+        "CHARACTER VARYING": "string",
+        "NVARCHAR": "string",
+        "TEXT": "string",
+        "DATE": "date",
+        "TIMESTAMP": "timestamp",
+        "TIMESTAMP WITHOUT TIME ZONE": "timestamp",
+        "GEOMETRY": "string",
+        "HLLSKETCH": "string",
+        "TIME": "string",
+        "TIME WITHOUT TIME ZONE": "string",
+    },
+    "postgres": {
+        "XML": "string",
+        "UUID": "string",
+        "PG_LSN": "string",
+        "MACADDR": "string",
+        "JSON": "string",
+        "JSONB": "string",
+        "CIDR": "string",
+        "INET": "string",
+        "MONEY": "number",
+        "SMALLINT": "number",
+        "INT2": "number",
+        "SMALLSERIAL": "number",
+        "SERIAL2": "number",
+        "INTEGER": "number",
+        "INT": "number",
+        "INT4": "number",
+        "SERIAL": "number",
+        "SERIAL4": "number",
+        "BIGINT": "number",
+        "INT8": "number",
+        "BIGSERIAL": "number",
+        "SERIAL8": "number",
+        "DECIMAL": "number",
+        "NUMERIC": "number",
+        "REAL": "number",
+        "FLOAT4": "number",
+        "DOUBLE PRECISION": "number",
+        "FLOAT8": "number",
+        "FLOAT": "number",
+        "BOOLEAN": "yesno",
+        "BOOL": "yesno",
+        "CHARACTER": "string",
+        "CHAR": "string",
+        "BPCHAR": "string",
+        "CHARACTER VARYING": "string",
+        "VARCHAR": "string",
+        "TEXT": "string",
+        "DATE": "date",
+        "TIMESTAMP": "timestamp",
+        "TIMESTAMP WITHOUT TIME ZONE": "timestamp",
+        "TIME": "string",
+        "TIME WITHOUT TIME ZONE": "string",
+    },
+    "spark": {
+        "BYTE": "number",
+        "SHORT": "number",
+        "INTEGER": "number",
+        "LONG": "number",
+        "FLOAT": "number",
+        "DOUBLE": "number",
+        "DECIMAL": "number",
+        "STRING": "string",
+        "VARCHAR": "string",
+        "CHAR": "string",
+        "BOOLEAN": "yesno",
+        "TIMESTAMP": "timestamp",
+        "DATE": "datetime",
+    },
+}
+"""Looker types of columns, by dbt adapter and database column type"""
+
+_LOOKER_DATE_TIME_TYPES = ("datetime", "timestamp")
+_LOOKER_DATE_TYPES = ("date",)
+_LOOKER_SCALAR_TYPES = ("number", "yesno", "string")
+#: Keys of manifest nodes the LookML and the model fingerprints are built from
+_LOOKML_MODEL_FIELDS = (
+    "unique_id",
+    "name",
+    "checksum",
+    "columns",
+    "config",
+    "description",
+    "meta",
+    "relation_name",
+)
+_LOOKML_QUOTED_KEYS = ("connection", "description", "group_label", "include", "label")
+
+
+def generate_lookML_model(max_workers: Optional[int] = None) -> None:
     """
     Generate lookML codes based on compiled dbt project.
+
+    A view and a model with an explore are generated for every dbt model
+    found in both manifest and catalog. Models are compared with the ones
+    used by the previous generation, and only files of changed models get
+    rewritten, while files of removed models get deleted.
+
+    :param max_workers: Maximal number of models to generate in parallel. \
+        Chosen by :class:`concurrent.futures.ThreadPoolExecutor`, if ``None``
+    :type max_workers: Optional[int]
     """
-    subprocess_run(["dbt2looker", "--output-dir", str(LOOKML_DEST_PATH)])
+    dest_path = pathlib.Path(LOOKML_DEST_PATH)
+    target_path = pathlib.Path.cwd().joinpath("target")
+    manifest_path = target_path.joinpath("manifest.json")
+    models = {
+        node["name"]: node
+        for _, node in iter_manifest_nodes(manifest_path, fields=_LOOKML_MODEL_FIELDS)
+    }
+    catalog_nodes = _read_catalog_nodes(target_path)
+    adapter_type = read_manifest_metadata(manifest_path).get("adapter_type", "")
+    connection_name = _get_project_name()
+    fingerprints = {
+        model_name: _get_model_fingerprint(model, catalog_nodes, adapter_type, connection_name)
+        for model_name, model in models.items()
+    }
+    cache = _read_lookml_cache(dest_path)
+
+    changed_models = _get_changed_models(fingerprints, cache, dest_path)
+    removed_models = sorted(set(cache) - set(fingerprints))
+    if not changed_models and not removed_models:
+        echo_subinfo("LookML is up to date")
+        return
+
+    for model_name in removed_models:
+        for file in cache.pop(model_name).get("files") or {}:
+            if dest_path.joinpath(file).exists():
+                os.remove(dest_path.joinpath(file))
+
+    dest_path.joinpath(LOOKML_VIEWS_SUBDIR).mkdir(parents=True, exist_ok=True)
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        generated_files = executor.map(
+            lambda model_name: _write_model_lookml(
+                models[model_name],
+                catalog_nodes.get(models[model_name]["unique_id"]),
+                adapter_type,
+                connection_name,
+                dest_path,
+            ),
+            changed_models,
+        )
+        for model_name, files in zip(changed_models, generated_files):
+            cache[model_name] = {"fingerprint": fingerprints[model_name], "files": files}
+
+    echo_subinfo(
+        f"Generated LookML of {len(changed_models)} changed models, "
+        f"removed LookML of {len(removed_models)} models"
+    )
+    write_if_changed(
+        dest_path.joinpath(LOOKML_CACHE_FILE_NAME), json.dumps(cache, indent=2, sort_keys=True)
+    )
 
 
-def deploy_lookML_model(key_path: str, env: str) -> None:
+def _read_catalog_nodes(target_path: pathlib.Path) -> Dict[str, Any]:
+    if not target_path.joinpath("catalog.json").exists():
+        return {}
+    with open(target_path.joinpath("catalog.json"), "r") as catalog_json:
+        return json.load(catalog_json).get("nodes", {})
+
+
+def _get_project_name() -> str:
+    with open(pathlib.Path.cwd().joinpath("dbt_project.yml"), "r") as f:
+        return yaml.safe_load(f)["name"]
+
+
+@functools.lru_cache(maxsize=None)
+def _get_dp_version() -> str:
+    try:
+        return importlib.metadata.version("data-pipelines-cli")
+    except importlib.metadata.PackageNotFoundError:
+        return ""
+
+
+def _get_model_fingerprint(
+    model: Dict[str, Any], catalog_nodes: Dict[str, Any], adapter_type: str, connection_name: str
+) -> str:
+    definition = {
+        # Anything else the generated files depend on
+        "cache_version": LOOKML_CACHE_VERSION,
+        "dp_version": _get_dp_version(),
+        "adapter_type": adapter_type,
+        "connection_name": connection_name,
+        "node": {
+            key: model.get(key)
+            for key in ("checksum", "columns", "config", "description", "meta", "relation_name")
+        },
+        "catalog_columns": catalog_nodes.get(model["unique_id"], {}).get("columns"),
+    }
+    return hashlib.sha256(
+        json.dumps(definition, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _read_lookml_cache(dest_path: pathlib.Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(dest_path.joinpath(LOOKML_CACHE_FILE_NAME), "r") as cache_file:
+            return json.load(cache_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _hash_content(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _get_changed_models(
+    fingerprints: Dict[str, str],
+    cache: Dict[str, Dict[str, Any]],
+    dest_path: pathlib.Path,
+) -> List[str]:
+    changed_models = []
+    for model_name, fingerprint in sorted(fingerprints.items()):
+        cached = cache.get(model_name)
+        if cached is None or cached.get("fingerprint") != fingerprint or "files" not in cached:
+            changed_models.append(model_name)
+            continue
+        for file, file_hash in cached["files"].items():
+            file_path = dest_path.joinpath(file)
+            if not file_path.exists() or _hash_content(file_path.read_bytes()) != file_hash:
+                # The file has been removed or modified since its generation
+                changed_models.append(model_name)
+                break
+    return changed_models
+
+
+def _write_model_lookml(
+    model: Dict[str, Any],
+    catalog_node: Optional[Dict[str, Any]],
+    adapter_type: str,
+    connection_name: str,
+    dest_path: pathlib.Path,
+) -> Dict[str, str]:
+    if catalog_node is None:
+        echo_warning(
+            f"Model {model['unique_id']} not found in catalog. No Looker view will be "
+            f"generated. Check if model has materialized in {adapter_type} at "
+            f"{model.get('relation_name')}"
+        )
+        return {}
+
+    columns = _get_typed_columns(model, catalog_node, adapter_type)
+    files = {
+        f"{LOOKML_VIEWS_SUBDIR}/{model['name']}.view.lkml": _dump_lookml(
+            {"view": _lookml_view(model, columns)}
+        ),
+        f"{model['name']}.model.lkml": _dump_lookml(_lookml_model(model, connection_name)),
+    }
+    for file, content in files.items():
+        write_if_changed(dest_path.joinpath(file), content)
+    return {file: _hash_content(content.encode("utf-8")) for file, content in files.items()}
+
+
+def _map_adapter_type_to_looker(adapter_type: str, column_type: Optional[str]) -> Optional[str]:
+    if column_type is None:
+        return None
+    if adapter_type == "spark":
+        column_type = column_type.split("(", 1)[0]
+    looker_type = LOOKER_DTYPE_MAP.get(adapter_type, {}).get(column_type.upper())
+    if looker_type is None:
+        echo_warning(
+            f"Column type {column_type} not supported for conversion from {adapter_type} "
+            "to Looker. No dimension will be created."
+        )
+    return looker_type
+
+
+def _get_typed_columns(
+    model: Dict[str, Any], catalog_node: Dict[str, Any], adapter_type: str
+) -> List[Dict[str, Any]]:
+    catalog_columns = {
+        name.lower(): column for name, column in catalog_node.get("columns", {}).items()
+    }
+    columns = []
+    for column in model.get("columns", {}).values():
+        name = column["name"].lower()
+        data_type = catalog_columns.get(name, {}).get("type")
+        columns.append(
+            {
+                **column,
+                "name": name,
+                "looker_type": _map_adapter_type_to_looker(adapter_type, data_type),
+            }
+        )
+    return columns
+
+
+def _lookml_dimension(column: Dict[str, Any], looker_type: str) -> Dict[str, Any]:
+    dimension_meta = column.get("meta", {}).get("dimension", {})
+    return {
+        "name": dimension_meta.get("name") or column["name"],
+        "type": looker_type,
+        "sql": dimension_meta.get("sql") or f"${{TABLE}}.{column['name']}",
+        "description": dimension_meta.get("description") or column.get("description", ""),
+    }
+
+
+def _lookml_dimension_group(column: Dict[str, Any]) -> Dict[str, Any]:
+    dimension_group = _lookml_dimension(column, "time")
+    dimension_group["datatype"] = column["looker_type"]
+    if column["looker_type"] in _LOOKER_DATE_TIME_TYPES:
+        dimension_group["timeframes"] = [
+            "raw",
+            "time",
+            "hour",
+            "date",
+            "week",
+            "month",
+            "quarter",
+            "year",
+        ]
+    else:
+        dimension_group["timeframes"] = ["raw", "date", "week", "month", "quarter", "year"]
+    return dimension_group
+
+
+def _lookml_scalar_dimension(column: Dict[str, Any]) -> Dict[str, Any]:
+    dimension = _lookml_dimension(column, column["looker_type"])
+    value_format_name = column.get("meta", {}).get("dimension", {}).get("value_format_name")
+    if value_format_name and column["looker_type"] == "number":
+        dimension["value_format_name"] = value_format_name
+    return dimension
+
+
+def _lookml_measure(
+    measure_name: str,
+    measure: Dict[str, Any],
+    column: Dict[str, Any],
+    columns: Dict[str, Dict[str, Any]],
+) -> Dict[str, Any]:
+    lookml_measure = {
+        "name": measure_name,
+        "type": measure["type"],
+        "sql": measure.get("sql") or f"${{TABLE}}.{column['name']}",
+        "description": measure.get("description")
+        or column.get("description")
+        or f"{measure['type'].capitalize()} of {column['name']}",
+    }
+    if measure.get("filters"):
+        lookml_measure["filters"] = []
+        for measure_filter in measure["filters"]:
+            for filtered_name, value in measure_filter.items():
+                if filtered_name not in columns:
+                    raise DataPipelinesError(
+                        f"Column {filtered_name} used in a filter of {measure_name} measure "
+                        "does not exist in the model"
+                    )
+                lookml_measure["filters"].append(
+                    (_lookml_dimension(columns[filtered_name], "")["name"], value)
+                )
+    for key in ("value_format_name", "group_label", "label"):
+        if measure.get(key):
+            lookml_measure[key] = measure[key]
+    return lookml_measure
+
+
+def _lookml_view(model: Dict[str, Any], columns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    columns_by_name = {column["name"]: column for column in columns}
+    measures = []
+    for column in columns:
+        column_meta = column.get("meta", {})
+        for measures_key in ("measures", "measure", "metrics", "metric"):
+            for measure_name, measure in (column_meta.get(measures_key) or {}).items():
+                measures.append(_lookml_measure(measure_name, measure, column, columns_by_name))
+
+    return {
+        "name": model["name"],
+        "sql_table_name": model.get("relation_name"),
+        "dimension_groups": [
+            _lookml_dimension_group(column)
+            for column in columns
+            if column["looker_type"] in _LOOKER_DATE_TIME_TYPES
+        ]
+        + [
+            _lookml_dimension_group(column)
+            for column in columns
+            if column["looker_type"] in _LOOKER_DATE_TYPES
+        ],
+        "dimensions": [
+            _lookml_scalar_dimension(column)
+            for column in columns
+            if column["looker_type"] in _LOOKER_SCALAR_TYPES
+        ],
+        "measures": measures,
+    }
+
+
+def _lookml_model(model: Dict[str, Any], connection_name: str) -> Dict[str, Any]:
+    return {
+        "connection": connection_name,
+        "include": "/views/*",
+        "explore": {
+            "name": model["name"],
+            "description": model.get("description", ""),
+            "joins": [
+                {
+                    "name": join["join"],
+                    "type": join.get("type", "left_outer"),
+                    "relationship": join.get("relationship", "many_to_one"),
+                    "sql_on": join["sql_on"],
+                }
+                for join in model.get("meta", {}).get("joins", [])
+            ],
+        },
+    }
+
+
+def _dump_lookml(lookml: Dict[str, Any], indent: str = "") -> str:
+    """Serialize *lookml* the way `lkml` does, separating blocks with empty lines."""
+    chunks: List[Tuple[bool, str]] = []
+    for key, value in lookml.items():
+        if key == "name" and indent:
+            continue
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            # Plural keys, e.g. `dimensions`, hold repeated blocks
+            block_key = key[:-1] if key.endswith("s") else key
+            chunks += [(True, _dump_lookml_block(block_key, item, indent)) for item in value]
+        elif isinstance(value, dict):
+            chunks.append((True, _dump_lookml_block(key, value, indent)))
+        elif isinstance(value, list):
+            if value:
+                chunks.append((False, _dump_lookml_list(key, value, indent)))
+        elif value is not None:
+            chunks.append((False, f"{indent}{key}: {_dump_lookml_value(key, value)}"))
+
+    lines: List[str] = []
+    for i, (is_block, chunk) in enumerate(chunks):
+        if i > 0 and (is_block or chunks[i - 1][0]):
+            lines.append("")
+        lines.append(chunk)
+    return "\n".join(lines)
+
+
+def _dump_lookml_block(key: str, value: Dict[str, Any], indent: str) -> str:
+    name = f" {value['name']}" if value.get("name") is not None else ""
+    body = _dump_lookml(value, indent + "  ")
+    return f"{indent}{key}:{name} {{\n{body}\n{indent}}}" if body else f"{indent}{key}:{name} {{}}"
+
+
+def _dump_lookml_list(key: str, values: List[Any], indent: str) -> str:
+    if isinstance(values[0], tuple):
+        items = [f'{field}: "{field_value}"' for field, field_value in values]
+    else:
+        items = [str(value) for value in values]
+    # Pairs and lists of 5 or more values go one per line, with trailing commas
+    if isinstance(values[0], tuple) or len(values) >= 5:
+        lines = "".join(f"{indent}  {item},\n" for item in items)
+        return f"{indent}{key}: [\n{lines}{indent}]"
+    return f"{indent}{key}: [{', '.join(items)}]"
+
+
+def _dump_lookml_value(key: str, value: Any) -> str:
+    if key.startswith("sql") or key.endswith("sql") or key == "html":
+        return f"{value} ;;"
+    if key in _LOOKML_QUOTED_KEYS:
+        escaped_value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{escaped_value}"'
+    return str(value)
+
+
+def deploy_lookML_model(key_path: str, env: str, context: Optional[CommandContext] = None) -> None:
     """
     Write compiled lookML to Looker's repository and deploy project to production
 
@@ -47,30 +591,31 @@ def deploy_lookML_model(key_path: str, env: str) -> None:
     :type key_path: str
     :param env: Name of the environment
     :type env: str
+    :param context: Context of the running command, if any
+    :type context: Optional[CommandContext]
     """
     profiles_path = generate_profiles_yml(env, False)
     run_dbt_command(("docs", "generate"), env, profiles_path)
 
-    looker_config = read_looker_config(env)
+    looker_config = read_looker_config(env, context)
     local_repo_path = BUILD_DIR.joinpath("looker_project_repo")
 
-    if local_repo_path.exists():
-        echo_info(f"Removing {local_repo_path}")
-        rmtree(local_repo_path)
-
-    ssh_command_with_key = f"ssh -i {key_path}"
-    repo = Repo.clone_from(
-        looker_config["looker_repository"],
+    workspace = GitWorkspace(
         local_repo_path,
-        branch=looker_config["looker_repository_branch"],
-        env={"GIT_SSH_COMMAND": ssh_command_with_key},
+        looker_config["looker_repository"],
+        looker_config["looker_repository_branch"],
+        key_path,
+        sparse_paths=[LOOKML_VIEWS_SUBDIR],
     )
+    repo = workspace.sync()
 
     project_name, project_version = _get_project_name_and_version()
-    with repo.git.custom_environment(GIT_SSH_COMMAND=ssh_command_with_key):
+    with repo.git.custom_environment(**workspace.git_env):
         _prepare_repo_changes(LOOKML_DEST_PATH, local_repo_path)
         _configure_git_env(repo, looker_config)
-        _commit_and_push_changes(repo, project_name, project_version)
+        if not _commit_and_push_changes(repo, project_name, project_version):
+            echo_info("Skipping Looker deployment, as the project has not changed")
+            return
         _deploy_looker_project_to_production(
             looker_config["looker_instance_url"],
             looker_config["looker_project_id"],
@@ -80,33 +625,38 @@ def deploy_lookML_model(key_path: str, env: str) -> None:
 
 
 def _prepare_repo_changes(src: pathlib.Path, local_repo_gen_path: pathlib.Path) -> None:
-    _clear_repo_before_writing_lookml(local_repo_gen_path)
-    _copy_all_files_by_extention(src, local_repo_gen_path, "model.lkml")
-    _copy_all_files_by_extention(
+    copied_files = _copy_all_files_by_extention(src, local_repo_gen_path, "model.lkml")
+    copied_files += _copy_all_files_by_extention(
         src, local_repo_gen_path.joinpath(LOOKML_VIEWS_SUBDIR), "view.lkml"
     )
+    _clear_repo_before_writing_lookml(local_repo_gen_path, keep=copied_files)
 
-    with open(f"{local_repo_gen_path}/readme.txt", "w") as readme:
-        readme.write(
-            """models and views with extention '.dp.[view|model].lkml' are generated by data-pipelines-cli.
+    write_if_changed(
+        local_repo_gen_path.joinpath("readme.txt"),
+        """models and views with extention '.dp.[view|model].lkml' are generated by data-pipelines-cli.
             Do not edit manually! Your changes could be overwrite!
-        """
-        )
+        """,
+    )
 
 
-def _clear_repo_before_writing_lookml(local_repo_gen_path: pathlib.Path) -> None:
+def _clear_repo_before_writing_lookml(
+    local_repo_gen_path: pathlib.Path, keep: Iterable[str] = ()
+) -> None:
+    keep = set(keep)
     if local_repo_gen_path.exists():
-        _remove_dp_files_from_repo(local_repo_gen_path, ".dp.model.lkml")
+        _remove_dp_files_from_repo(local_repo_gen_path, ".dp.model.lkml", keep)
 
         if local_repo_gen_path.joinpath(LOOKML_VIEWS_SUBDIR).exists():
             _remove_dp_files_from_repo(
-                local_repo_gen_path.joinpath(LOOKML_VIEWS_SUBDIR), ".dp.view.lkml"
+                local_repo_gen_path.joinpath(LOOKML_VIEWS_SUBDIR), ".dp.view.lkml", keep
             )
 
 
-def _remove_dp_files_from_repo(dir_path: pathlib.Path, files_extention: str) -> None:
+def _remove_dp_files_from_repo(
+    dir_path: pathlib.Path, files_extention: str, keep: Iterable[str] = ()
+) -> None:
     for file in os.listdir(dir_path):
-        if file.endswith(files_extention):
+        if file.endswith(files_extention) and file not in keep:
             os.remove(dir_path.joinpath(file))
 
 
@@ -117,12 +667,17 @@ def _configure_git_env(repo: Repo, config: Dict[str, Any]) -> None:
 
 def _copy_all_files_by_extention(
     src: pathlib.Path, dest: pathlib.Path, files_extention: str
-) -> None:
+) -> List[str]:
     os.makedirs(dest, exist_ok=True)
+    copied_files = []
     for file_path in glob.glob(os.path.join(src, "**", "*." + files_extention), recursive=True):
         file_path_with_dp_ext = "{0}.dp.{1}.{2}".format(*file_path.rsplit(".", 2))
         new_path = os.path.join(dest, os.path.basename(file_path_with_dp_ext))
-        copy(file_path, new_path)
+        copied_files.append(os.path.basename(new_path))
+        # Files left intact do not show up as changed in the repository
+        if not os.path.exists(new_path) or not filecmp.cmp(file_path, new_path, shallow=False):
+            copy(file_path, new_path)
+    return copied_files
 
 
 def _get_project_name_and_version() -> Tuple[str, str]:
@@ -131,12 +686,20 @@ def _get_project_name_and_version() -> Tuple[str, str]:
         return dbt_project_config["name"], dbt_project_config["version"]
 
 
-def _commit_and_push_changes(repo: Repo, project_name: str, project_version: str) -> None:
+def _commit_and_push_changes(repo: Repo, project_name: str, project_version: str) -> bool:
+    changed_files = stage_all_changes(repo)
+    if not changed_files:
+        echo_info("LookML in Looker repository is up to date, nothing to publish")
+        return False
+
     echo_info("Publishing BI codes to Looker repository")
-    repo.git.add(all=True)
-    repo.index.commit(f"Publication from project {project_name}, version: {project_version}")
+    for status, path in changed_files:
+        echo_subinfo(f"{status} {path}")
+    # Sparse checkouts use an index format GitPython cannot write to
+    repo.git.commit("-m", f"Publication from project {project_name}, version: {project_version}")
     origin = repo.remote(name="origin")
     origin.push()
+    return True
 
 
 def _deploy_looker_project_to_production(
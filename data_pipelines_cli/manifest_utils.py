@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import pathlib
+import re
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .errors import DataPipelinesError, DependencyNotInstalledError
+
+_STRUCTURAL_CHAR_REGEX = re.compile(r'["{}\[\]]')
+_STRING_END_REGEX = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+_WHITESPACE_REGEX = re.compile(r"\s*")
+#: Characters a JSON number may continue with
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+
+class _JsonStream:
+    """
+    Minimal pull parser walking a JSON document without loading all of it.
+
+    Values are either decoded one at a time with :mod:`json`, or skipped
+    over without building any Python object.
+    """
+
+    def __init__(self, file: IO[str], chunk_size: int) -> None:
+        self._file = file
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _read_more(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        # Drop the already consumed part to keep the buffer small
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            whitespace = _WHITESPACE_REGEX.match(self._buffer, self._pos)
+            self._pos = whitespace.end() if whitespace else self._pos
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read_more():
+                raise DataPipelinesError("Unexpected end of JSON document")
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise DataPipelinesError(
+                f"Expected '{char}' in JSON document, got '{self._buffer[self._pos]}'"
+            )
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number may continue in the next chunk, e.g. ``12.`` is
+                # decoded as ``12`` until ``5`` gets read
+                number_may_continue = (
+                    isinstance(value, (int, float)) and not isinstance(value, bool)
+                ) and (end == len(self._buffer) or self._buffer[end] in _NUMBER_CHARS)
+                if not number_may_continue or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._read_more()
+
+    def skip_value(self) -> None:
+        if self._peek() not in "{[":
+            self.read_value()
+            return
+        depth = 0
+        while True:
+            match = _STRUCTURAL_CHAR_REGEX.search(self._buffer, self._pos)
+            if match is None:
+                self._pos = len(self._buffer)
+                if not self._read_more():
+                    raise DataPipelinesError("Unexpected end of JSON document")
+                continue
+            self._pos = match.end()
+            char = match.group()
+            if char == '"':
+                string_end = _STRING_END_REGEX.match(self._buffer, self._pos)
+                while string_end is None:
+                    if not self._read_more():
+                        raise DataPipelinesError("Unexpected end of JSON document")
+                    string_end = _STRING_END_REGEX.match(self._buffer, self._pos)
+                self._pos = string_end.end()
+            elif char in "{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def iter_object_keys(self) -> Iterator[str]:
+        """Yield keys of the object at the current position. Each value has
+        to be consumed with :meth:`read_value` or :meth:`skip_value`."""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self._expect(":")
+            yield key
+            if self._peek() == ",":
+                self._pos += 1
+                continue
+            self._expect("}")
+            return
+
+
+def _iter_manifest_sections(
+    manifest_path: Union[str, os.PathLike[str]],
+    sections: Sequence[str],
+    chunk_size: int,
+) -> Iterator[Tuple[str, str, Any]]:
+    remaining_sections = set(sections)
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        stream = _JsonStream(manifest_file, chunk_size)
+        for section in stream.iter_object_keys():
+            if section not in remaining_sections:
+                stream.skip_value()
+                continue
+            for key in stream.iter_object_keys():
+                yield section, key, stream.read_value()
+            remaining_sections.remove(section)
+            if not remaining_sections:
+                # Nothing else is needed, the rest of the file can be left unread
+                return
+
+
+def iter_manifest_nodes(
+    manifest_path: Union[str, os.PathLike[str]],
+    resource_type: Optional[str] = "model",
+    fields: Optional[Sequence[str]] = None,
+    chunk_size: int = 1 << 20,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream nodes out of dbt `manifest.json`, one at a time.
+
+    Only a single node is kept in memory at once, and sections of the
+    manifest other than `nodes` are skipped without being decoded, so memory
+    usage does not depend on the size of the manifest.
+
+    :param manifest_path: Path to `manifest.json`
+    :type manifest_path: Union[str, os.PathLike[str]]
+    :param resource_type: Type of nodes to return, e.g. `model`. All nodes, \
+        if ``None``
+    :type resource_type: Optional[str]
+    :param fields: Keys of node dictionaries to keep. All of them, if ``None``
+    :type fields: Optional[Sequence[str]]
+    :param chunk_size: Number of characters to read from the file at once
+    :type chunk_size: int
+    :return: Iterator over unique IDs of the nodes with their dictionaries
+    :rtype: Iterator[Tuple[str, Dict[str, Any]]]
+    :raises DataPipelinesError: `manifest.json` is not a valid JSON object
+    """
+    for _, unique_id, node in _iter_manifest_sections(manifest_path, ["nodes"], chunk_size):
+        if resource_type is not None and node.get("resource_type") != resource_type:
+            continue
+        if fields is not None:
+            node = {field: node[field] for field in fields if field in node}
+        yield unique_id, node
+
+
+def read_manifest_metadata(
+    manifest_path: Union[str, os.PathLike[str]], chunk_size: int = 1 << 20
+) -> Dict[str, Any]:
+    """
+    Read `metadata` section of dbt `manifest.json`, e.g. its `adapter_type`.
+
+    The manifest is streamed, see :func:`iter_manifest_nodes`.
+
+    :param manifest_path: Path to `manifest.json`
+    :type manifest_path: Union[str, os.PathLike[str]]
+    :param chunk_size: Number of characters to read from the file at once
+    :type chunk_size: int
+    :return: Metadata of the manifest
+    :rtype: Dict[str, Any]
+    :raises DataPipelinesError: `manifest.json` is not a valid JSON object
+    """
+    return {
+        key: value
+        for _, key, value in _iter_manifest_sections(manifest_path, ["metadata"], chunk_size)
+    }
+
+
+SLIM_MANIFEST_FILE_NAMES = {
+    "json": "manifest.slim.json",
+    "gzip": "manifest.slim.json.gz",
+    "msgpack": "manifest.slim.msgpack",
+}
+"""Names of the slim manifest files, by their encoding"""
+
+_SLIM_METADATA_FIELDS = ("dbt_version", "generated_at", "project_id", "adapter_type")
+_SLIM_NODE_FIELDS = ("unique_id", "name", "resource_type", "package_name", "tags")
+_SLIM_SOURCE_FIELDS = ("unique_id", "name", "source_name", "resource_type", "package_name", "tags")
+
+
+def build_slim_manifest(
+    manifest_path: Union[str, os.PathLike[str]], chunk_size: int = 1 << 20
+) -> Dict[str, Any]:
+    """
+    Prune dbt `manifest.json` to what is needed to build an Airflow DAG.
+
+    Nodes and sources keep only their names, types, tags, dependencies and
+    materializations. `parent_map` and `child_map` are rebuilt from the kept
+    dependencies, so the DAG builder does not have to index the nodes itself.
+    The manifest is streamed, see :func:`iter_manifest_nodes`.
+
+    :param manifest_path: Path to `manifest.json`
+    :type manifest_path: Union[str, os.PathLike[str]]
+    :param chunk_size: Number of characters to read from the file at once
+    :type chunk_size: int
+    :return: Slim manifest, with the same layout as `manifest.json`
+    :rtype: Dict[str, Any]
+    :raises DataPipelinesError: `manifest.json` is not a valid JSON object
+    """
+    slim_manifest: Dict[str, Any] = {"metadata": {}, "nodes": {}, "sources": {}}
+    parent_map: Dict[str, List[str]] = {}
+    for section, key, value in _iter_manifest_sections(
+        manifest_path, ["metadata", "nodes", "sources"], chunk_size
+    ):
+        if section == "metadata":
+            if key in _SLIM_METADATA_FIELDS:
+                slim_manifest["metadata"][key] = value
+        elif section == "nodes":
+            node = {field: value[field] for field in _SLIM_NODE_FIELDS if field in value}
+            node["depends_on"] = {"nodes": value.get("depends_on", {}).get("nodes", [])}
+            node["config"] = {"materialized": value.get("config", {}).get("materialized")}
+            slim_manifest["nodes"][key] = node
+            parent_map[key] = node["depends_on"]["nodes"]
+        else:
+            source = {field: value[field] for field in _SLIM_SOURCE_FIELDS if field in value}
+            slim_manifest["sources"][key] = source
+            parent_map[key] = []
+
+    child_map: Dict[str, List[str]] = {unique_id: [] for unique_id in parent_map}
+    for unique_id, parents in parent_map.items():
+        for parent in parents:
+            child_map.setdefault(parent, []).append(unique_id)
+    slim_manifest["parent_map"] = parent_map
+    slim_manifest["child_map"] = child_map
+    return slim_manifest
+
+
+def _import_msgpack() -> Any:
+    try:
+        import msgpack
+    except ModuleNotFoundError:
+        raise DependencyNotInstalledError("msgpack")
+    return msgpack
+
+
+def write_slim_manifest(
+    slim_manifest: Dict[str, Any], directory: pathlib.Path, encoding: str = "json"
+) -> pathlib.Path:
+    """
+    Write slim manifest to `directory`.
+
+    :param slim_manifest: Manifest returned by :func:`build_slim_manifest`
+    :type slim_manifest: Dict[str, Any]
+    :param directory: Directory to write the manifest to
+    :type directory: pathlib.Path
+    :param encoding: One of the keys of :data:`SLIM_MANIFEST_FILE_NAMES`
+    :type encoding: str
+    :return: Path to the written file
+    :rtype: pathlib.Path
+    :raises DependencyNotInstalledError: `msgpack` encoding requested, but \
+        `msgpack` is not installed
+    """
+    path = directory.joinpath(SLIM_MANIFEST_FILE_NAMES[encoding])
+    if encoding == "msgpack":
+        content = _import_msgpack().packb(slim_manifest)
+    else:
+        content = json.dumps(slim_manifest, separators=(",", ":")).encode("utf-8")
+        if encoding == "gzip":
+            # Fixed mtime keeps the file identical for an unchanged manifest
+            content = gzip.compress(content, mtime=0)
+    path.write_bytes(content)
+    return path
+
+
+def read_slim_manifest(path: Union[str, os.PathLike[str]]) -> Dict[str, Any]:
+    """
+    Read slim manifest written by :func:`write_slim_manifest`.
+
+    :param path: Path to the manifest; its encoding is inferred from the name
+    :type path: Union[str, os.PathLike[str]]
+    :return: Slim manifest
+    :rtype: Dict[str, Any]
+    :raises DependencyNotInstalledError: `msgpack` encoded manifest, but \
+        `msgpack` is not installed
+    """
+    content = pathlib.Path(path).read_bytes()
+    name = pathlib.Path(path).name
+    if name == SLIM_MANIFEST_FILE_NAMES["msgpack"]:
+        return _import_msgpack().unpackb(content)
+    if name == SLIM_MANIFEST_FILE_NAMES["gzip"]:
+        content = gzip.decompress(content)
+    return json.loads(content)
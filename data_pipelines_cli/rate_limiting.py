@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Any, BinaryIO, Callable, Optional, TypeVar
+
+from .cli_utils import echo_info, echo_warning
+
+T = TypeVar("T")
+
+#: Error codes providers respond with when requests come too fast
+THROTTLING_ERROR_CODES = {
+    429,
+    503,
+    "429",
+    "503",
+    "SlowDown",
+    "Throttling",
+    "ThrottlingException",
+    "TooManyRequests",
+    "RequestLimitExceeded",
+    "rateLimitExceeded",
+}
+_THROTTLING_MESSAGES = ("SlowDown", "Too Many Requests", "Rate exceeded", "rateLimitExceeded")
+#: Lowest fraction of the configured rates the limiter slows down to
+_MIN_RATE_FACTOR = 1 / 16
+#: Part of the configured rates recovered after every successful call
+_RATE_RECOVERY_STEP = 1 / 32
+
+
+def is_throttling_error(err: BaseException) -> bool:
+    """
+    Check whether *err*, or any error it was raised from, means the
+    provider throttles requests (e.g. GCS 429, S3 SlowDown).
+
+    :param err: Error raised by a filesystem
+    :type err: BaseException
+    :return: Whether the request may succeed once repeated later
+    :rtype: bool
+    """
+    current: Optional[BaseException] = err
+    while current is not None:
+        codes = [getattr(current, "code", None), getattr(current, "status", None)]
+        response = getattr(current, "response", None)
+        if isinstance(response, dict):
+            codes.append(response.get("Error", {}).get("Code"))
+        if any(code in THROTTLING_ERROR_CODES for code in codes if code is not None):
+            return True
+        if any(message in str(current) for message in _THROTTLING_MESSAGES):
+            return True
+        current = current.__cause__ or current.__context__
+    return False
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket, refilled at :attr:`rate` tokens per second up
+    to :attr:`capacity` tokens.
+
+    A request for more tokens than available takes them in advance (the
+    bucket goes into debt) and waits until the debt gets refilled, so
+    amounts larger than the capacity, like big files, are allowed.
+    """
+
+    rate: float
+    """Tokens added per second"""
+    capacity: float
+    """Maximum number of tokens, i.e. the allowed burst"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> float:
+        """
+        Take *amount* tokens, waiting until the bucket allows it.
+
+        :param amount: Number of tokens to take
+        :type amount: float
+        :return: Seconds spent waiting
+        :rtype: float
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= amount
+            wait_time = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait_time:
+            time.sleep(wait_time)
+        return wait_time
+
+
+class RateLimiter:
+    """
+    Limits bytes and requests sent per second, and retries throttled calls.
+
+    Requests are charged by :meth:`call`, and bytes by :meth:`acquire_bytes`
+    as they get sent, e.g. through :class:`ThrottledReader`.
+
+    Every throttling response halves the current rates (down to 1/16 of the
+    configured ones) and makes the call wait with an exponential backoff
+    before being repeated; every successful call recovers a bit of the
+    configured rates.
+    """
+
+    max_bytes_per_second: Optional[float]
+    """Configured limit of bytes sent per second, or ``None`` for no limit"""
+    max_requests_per_second: Optional[float]
+    """Configured limit of requests per second, or ``None`` for no limit"""
+    max_retries: int
+    """Number of times a throttled call gets repeated before failing"""
+    backoff: float
+    """Seconds to wait before the first repetition, doubled with every next one"""
+
+    def __init__(
+        self,
+        max_bytes_per_second: Optional[float] = None,
+        max_requests_per_second: Optional[float] = None,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+    ) -> None:
+        self.max_bytes_per_second = max_bytes_per_second
+        self.max_requests_per_second = max_requests_per_second
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._bytes_bucket = TokenBucket(max_bytes_per_second) if max_bytes_per_second else None
+        self._requests_bucket = (
+            TokenBucket(max_requests_per_second) if max_requests_per_second else None
+        )
+        self._rate_factor = 1.0
+        self._lock = threading.Lock()
+        self.throttled_count = 0
+        self.wait_time = 0.0
+
+    def _set_rate_factor(self, rate_factor: float) -> None:
+        with self._lock:
+            self._rate_factor = min(max(rate_factor, _MIN_RATE_FACTOR), 1.0)
+            if self._bytes_bucket and self.max_bytes_per_second:
+                self._bytes_bucket.rate = self.max_bytes_per_second * self._rate_factor
+            if self._requests_bucket and self.max_requests_per_second:
+                self._requests_bucket.rate = self.max_requests_per_second * self._rate_factor
+
+    def acquire_bytes(self, amount: int) -> None:
+        """
+        Wait until the limit allows sending *amount* more bytes.
+
+        :param amount: Number of bytes about to be sent
+        :type amount: int
+        """
+        if self._bytes_bucket and amount:
+            wait_time = self._bytes_bucket.acquire(amount)
+            with self._lock:
+                self.wait_time += wait_time
+
+    def call(self, func: Callable[..., T], *args: Any, requests: int = 1, **kwargs: Any) -> T:
+        """
+        Call *func* once the limits allow sending *requests* requests,
+        repeating it while the provider throttles.
+
+        :param func: Filesystem method to call
+        :type func: Callable[..., T]
+        :param requests: Number of requests *func* makes
+        :type requests: int
+        :return: Result of *func*
+        :rtype: T
+        """
+        attempt = 0
+        while True:
+            wait_time = 0.0
+            if self._requests_bucket:
+                wait_time += self._requests_bucket.acquire(requests)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as err:
+                if not is_throttling_error(err) or attempt >= self.max_retries:
+                    raise
+                self._set_rate_factor(self._rate_factor / 2)
+                backoff_time = self.backoff * 2**attempt * random.uniform(0.5, 1.0)
+                with self._lock:
+                    self.throttled_count += 1
+                    self.wait_time += wait_time + backoff_time
+                echo_warning(f"Throttled by the provider ({err}), retrying in {backoff_time:.1f} s")
+                time.sleep(backoff_time)
+                attempt += 1
+                continue
+            with self._lock:
+                self.wait_time += wait_time
+            if self._rate_factor < 1.0:
+                self._set_rate_factor(self._rate_factor + _RATE_RECOVERY_STEP)
+            return result
+
+    def report(self) -> None:
+        """Print how much the limits and throttling slowed the calls down."""
+        if self.throttled_count or self.wait_time >= 0.01:
+            echo_info(
+                f"Waited {self.wait_time:.2f} s for rate limits, "
+                f"throttled {self.throttled_count} times by the provider"
+            )
+
+
+class ThrottledReader:
+    """
+    Binary file wrapper waiting for :meth:`RateLimiter.acquire_bytes` on
+    every read, so data copied out of it in chunks gets sent no faster than
+    the bytes limit allows.
+
+    Every byte read is charged, including bytes read again after seeking
+    back to repeat a throttled upload, as they get sent again.
+    """
+
+    def __init__(self, file: BinaryIO, rate_limiter: RateLimiter) -> None:
+        self._file = file
+        self._rate_limiter = rate_limiter
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self._rate_limiter.acquire_bytes(len(data))
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
@@ -44,7 +44,9 @@ EXTRA_REQUIRE = {
     "docker": ["docker==6.0.1"],
     "datahub": ["acryl-datahub[dbt]==0.12.0.5"],
     "git": ["GitPython==3.1.29"],
-    "looker": ["dbt2looker==0.11.0"],
+    "looker": ["GitPython==3.1.29"],
+    "msgpack": ["msgpack>=1.0.0,<2.0.0"],
+    "zstd": ["zstandard>=0.21.0,<1.0.0"],
     "tests": [
         "pytest==7.2.0",
         "pytest-cov==4.0.0",
@@ -11,7 +11,7 @@ import yaml
 from click.testing import CliRunner
 
 from data_pipelines_cli.cli import _cli
-from data_pipelines_cli.cli_commands.compile import compile_project
+from data_pipelines_cli.cli_commands.compile import _copy_dbt_manifest, compile_project
 from data_pipelines_cli.errors import DataPipelinesError, DockerNotInstalledError
 
 goldens_dir_path = pathlib.Path(__file__).parent.parent.joinpath("goldens")
@@ -55,8 +55,9 @@ class CompileCommandTestCase(unittest.TestCase):
             result = runner.invoke(_cli, ["compile"])
             self.assertEqual(0, result.exit_code, msg=result.exception)
 
-            # 4 = 2 from goldens/dag, manifest.json, 'config' directory
-            self.assertEqual(4, len(os.listdir(pathlib.Path(tmp_dir).joinpath("dag"))))
+            # 6 = 2 from goldens/dag, manifest.json, manifest.slim.json,
+            # config.resolved.json, 'config' directory
+            self.assertEqual(6, len(os.listdir(pathlib.Path(tmp_dir).joinpath("dag"))))
 
             args_str = " ".join(self.all_subprocess_run_args)
             self.assertIn("dbt deps", args_str)
@@ -68,6 +69,14 @@ class CompileCommandTestCase(unittest.TestCase):
                 goldens_dir_path.joinpath("target", "manifest.json"), "r"
             ) as golden_manifest:
                 self.assertDictEqual(json.load(golden_manifest), json.load(tmp_manifest))
+            self.assertTrue(tmp_dir_path.joinpath("dag", "manifest.slim.json").is_file())
+            with open(tmp_dir_path.joinpath("dag", "config.resolved.json"), "r") as tmp_snapshot:
+                snapshot = json.load(tmp_snapshot)
+            self.assertEqual("local", snapshot["env"])
+            self.assertEqual(
+                "my_docker_repository_uri",
+                snapshot["configs"]["execution_env.yml"]["image"]["repository"],
+            )
             with open(
                 tmp_dir_path.joinpath("dag", "config", "base", "datahub.yml"), "r"
             ) as tmp_datahub, open(
@@ -82,6 +91,54 @@ class CompileCommandTestCase(unittest.TestCase):
                     yaml.safe_load(tmp_k8s),
                 )
 
+    @patch("data_pipelines_cli.data_structures.git_revision_hash")
+    def test_build_cache(self, mock_git_revision_hash):
+        mock_git_revision_hash.return_value = "aaa9876aaa"
+
+        runner = CliRunner()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_path = pathlib.Path(tmp_dir)
+            project_path = tmp_path.joinpath("project")
+            shutil.copytree(goldens_dir_path, project_path)
+            build_path = tmp_path.joinpath("build")
+            cache_uri = tmp_path.joinpath("cache").as_uri()
+            with patch("pathlib.Path.cwd", lambda: project_path), patch(
+                "data_pipelines_cli.cli_commands.compile.BUILD_DIR", build_path
+            ), patch("data_pipelines_cli.config_generation.BUILD_DIR", build_path), patch(
+                "data_pipelines_cli.cli_constants.BUILD_DIR", build_path
+            ), patch(
+                "data_pipelines_cli.dbt_utils.BUILD_DIR", build_path
+            ), patch(
+                "data_pipelines_cli.dbt_utils.subprocess_run", self._mock_run
+            ), patch(
+                "data_pipelines_cli.cli_commands.compile.bi"
+            ):
+                result = runner.invoke(_cli, ["compile", "--build-cache", cache_uri])
+                self.assertEqual(0, result.exit_code, msg=result.exception)
+                self.assertIn("Build cache miss", result.output)
+                self.assertIn("dbt", self.all_subprocess_run_args)
+
+                self.all_subprocess_run_args = []
+                shutil.rmtree(project_path.joinpath("target"))
+                result = runner.invoke(_cli, ["compile", "--build-cache", cache_uri])
+                self.assertEqual(0, result.exit_code, msg=result.exception)
+                self.assertIn("Build cache hit", result.output)
+                self.assertListEqual([], self.all_subprocess_run_args)
+                self.assertTrue(build_path.joinpath("dag", "manifest.json").is_file())
+                self.assertTrue(build_path.joinpath("profiles", "local", "profiles.yml").is_file())
+
+    def test_slim_manifest_of_previous_encoding_removed(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, patch(
+            "data_pipelines_cli.cli_commands.compile.BUILD_DIR", pathlib.Path(tmp_dir)
+        ), patch("pathlib.Path.cwd", lambda: goldens_dir_path):
+            dag_path = pathlib.Path(tmp_dir).joinpath("dag")
+            dag_path.mkdir()
+            _copy_dbt_manifest("json")
+            _copy_dbt_manifest("gzip")
+            self.assertListEqual(
+                ["manifest.json", "manifest.slim.json.gz"], sorted(os.listdir(dag_path))
+            )
+
     @patch("pathlib.Path.cwd", lambda: goldens_dir_path)
     @patch("data_pipelines_cli.data_structures.git_revision_hash")
     def test_docker_not_installed(self, mock_git_revision_hash):
@@ -149,6 +206,81 @@ class CompileCommandTestCase(unittest.TestCase):
             self.assertEqual(0, result.exit_code, msg=result.exception)
             self.assertEqual("my_docker_repository_uri:aaa9876aaa", docker_tag)
 
+    @patch("pathlib.Path.cwd", lambda: goldens_dir_path)
+    @patch("data_pipelines_cli.cli_commands.compile.git_revision_hash", lambda: "aaa9876aaa")
+    @patch("data_pipelines_cli.data_structures.git_revision_hash")
+    def test_docker_build_with_cache(self, mock_git_revision_hash):
+        mock_git_revision_hash.return_value = "aaa9876aaa"
+
+        class MockException(Exception):
+            pass
+
+        def _mock_pull(image):
+            if image != "my_docker_repository_uri:bbb5432bbb":
+                raise MockException()
+
+        docker_errors_mock = MagicMock(APIError=MockException)
+        docker_images_mock = MagicMock(
+            build=MagicMock(return_value=(None, [])), pull=MagicMock(side_effect=_mock_pull)
+        )
+        docker_mock = MagicMock(
+            from_env=lambda: MagicMock(images=docker_images_mock), errors=docker_errors_mock
+        )
+
+        runner = CliRunner()
+        with patch.dict(
+            "sys.modules", **{"docker": docker_mock, "docker.errors": docker_errors_mock}
+        ), tempfile.TemporaryDirectory() as tmp_dir, patch(
+            "data_pipelines_cli.cli_commands.compile.BUILD_DIR", pathlib.Path(tmp_dir)
+        ), patch(
+            "data_pipelines_cli.cli_constants.BUILD_DIR", pathlib.Path(tmp_dir)
+        ), patch(
+            "data_pipelines_cli.config_generation.BUILD_DIR", pathlib.Path(tmp_dir)
+        ), patch(
+            "data_pipelines_cli.dbt_utils.BUILD_DIR", pathlib.Path(tmp_dir)
+        ), patch(
+            "data_pipelines_cli.dbt_utils.subprocess_run", self._mock_run
+        ), patch(
+            "data_pipelines_cli.cli_commands.compile.bi"
+        ), patch(
+            "data_pipelines_cli.cli_commands.compile.git_ancestor_revision_hashes",
+            return_value=["ccc0000ccc", "bbb5432bbb", "ddd1111ddd"],
+        ):
+            result = runner.invoke(
+                _cli,
+                [
+                    "compile",
+                    "--docker-build",
+                    "--docker-cache-from",
+                    "some/image:latest",
+                    "--docker-cache-from-ancestors",
+                    "3",
+                    "--docker-target",
+                    "runtime",
+                    "--docker-label",
+                    "team=data",
+                ],
+            )
+            self.assertEqual(0, result.exit_code, msg=result.exception)
+
+        build_kwargs = docker_images_mock.build.call_args.kwargs
+        self.assertListEqual(
+            ["some/image:latest", "my_docker_repository_uri:bbb5432bbb"],
+            build_kwargs["cache_from"],
+        )
+        self.assertEqual("runtime", build_kwargs["target"])
+        self.assertDictEqual(
+            {"org.opencontainers.image.revision": "aaa9876aaa", "team": "data"},
+            build_kwargs["labels"],
+        )
+        # Looking for ancestor images stops at the first one found
+        self.assertEqual(3, docker_images_mock.pull.call_count)
+
+    def test_invalid_docker_label(self):
+        result = CliRunner().invoke(_cli, ["compile", "--docker-label", "no_value"])
+        self.assertEqual(2, result.exit_code)
+        self.assertIn("KEY=VALUE", result.output)
+
     @patch("pathlib.Path.cwd", lambda: goldens_dir_path)
     @patch("data_pipelines_cli.data_structures.git_revision_hash")
     def test_docker_throw_build_error(self, mock_git_revision_hash):
@@ -7,6 +7,7 @@ import unittest
 from typing import List
 from unittest.mock import MagicMock, patch
 
+import requests
 import yaml
 from click.testing import CliRunner
 
@@ -17,6 +18,10 @@ from data_pipelines_cli.errors import (
     DataPipelinesError,
     DependencyNotInstalledError,
 )
+from data_pipelines_cli.filesystem_utils import (
+    SYNC_JOURNAL_FILE_NAME,
+    THROUGHPUT_HISTORY_FILE_NAME,
+)
 
 
 def _noop():
@@ -69,6 +74,9 @@ class DeployCommandTestCase(unittest.TestCase):
         # shutil.rmtree(self.build_temp_dir)
         shutil.rmtree(self.dbt_project_config_dir)
         os.remove(self.blob_json_filename)
+        # Tests deploying `goldens/dag` leave the sync journal and throughput next to it
+        self.goldens_dir_path.joinpath(SYNC_JOURNAL_FILE_NAME).unlink(missing_ok=True)
+        self.goldens_dir_path.joinpath(THROUGHPUT_HISTORY_FILE_NAME).unlink(missing_ok=True)
 
     def test_blob_args_types(self):
         for dump, format_name in [(json.dump, "json"), (yaml.dump, "yaml")]:
@@ -90,6 +98,7 @@ class DeployCommandTestCase(unittest.TestCase):
                     _bi_git_key_path,
                     _auth_token,
                     _disable_bucket_sync,
+                    **_kwargs,
                 ):
                     nonlocal result_provider_kwargs
                     result_provider_kwargs = provider_kwargs_dict
@@ -153,6 +162,166 @@ class DeployCommandTestCase(unittest.TestCase):
             len(os.listdir(self.storage_uri)),
         )
 
+    @patch("data_pipelines_cli.cli_commands.deploy.BUILD_DIR", goldens_dir_path)
+    def test_bundle_sync(self):
+        runner = CliRunner()
+        with patch("pathlib.Path.cwd", lambda: self.dbt_project_config_dir), patch(
+            "data_pipelines_cli.cli_commands.deploy.bi"
+        ):
+            result = runner.invoke(
+                _cli,
+                [
+                    "deploy",
+                    "--dags-path",
+                    self.storage_uri,
+                    "--blob-args",
+                    self.blob_json_filename,
+                    "--bundle",
+                    "gzip",
+                ],
+            )
+        self.assertEqual(0, result.exit_code, msg=result.exception)
+        self.assertListEqual(
+            ["dag_bundle.index.json", "dag_bundle.tar.gz"], sorted(os.listdir(self.storage_uri))
+        )
+
+    @patch("data_pipelines_cli.cli_commands.deploy.BUILD_DIR", goldens_dir_path)
+    def test_bundle_versioned_rejected(self):
+        runner = CliRunner()
+        with patch("pathlib.Path.cwd", lambda: self.dbt_project_config_dir), patch(
+            "data_pipelines_cli.cli_commands.deploy.bi"
+        ):
+            result = runner.invoke(
+                _cli,
+                [
+                    "deploy",
+                    "--dags-path",
+                    self.storage_uri,
+                    "--blob-args",
+                    self.blob_json_filename,
+                    "--bundle",
+                    "gzip",
+                    "--versioned",
+                ],
+            )
+        self.assertEqual(1, result.exit_code)
+        self.assertIsInstance(result.exception, DataPipelinesError)
+        self.assertEqual(0, len(os.listdir(self.storage_uri)))
+
+    @patch("data_pipelines_cli.cli_commands.deploy.BUILD_DIR", goldens_dir_path)
+    def test_versioned_sync_and_rollback(self):
+        runner = CliRunner()
+        deploy_args = ["deploy", "--dags-path", self.storage_uri, "--blob-args"]
+        with patch("pathlib.Path.cwd", lambda: self.dbt_project_config_dir), patch(
+            "data_pipelines_cli.cli_commands.deploy.bi"
+        ):
+            result = runner.invoke(_cli, [*deploy_args, self.blob_json_filename, "--versioned"])
+            self.assertEqual(0, result.exit_code, msg=result.exception)
+            with open(os.path.join(self.storage_uri, "CURRENT.json")) as pointer_file:
+                version = json.load(pointer_file)["version"]
+            self.assertListEqual([version], os.listdir(os.path.join(self.storage_uri, "versions")))
+
+            result = runner.invoke(
+                _cli, [*deploy_args, self.blob_json_filename, "--rollback", version]
+            )
+            self.assertEqual(0, result.exit_code, msg=result.exception)
+            result = runner.invoke(
+                _cli, [*deploy_args, self.blob_json_filename, "--rollback", "missing"]
+            )
+            self.assertEqual(1, result.exit_code)
+
+    @patch("data_pipelines_cli.cli_commands.deploy.BUILD_DIR", goldens_dir_path)
+    def test_plan(self):
+        runner = CliRunner()
+        deploy_args = ["deploy", "--dags-path", self.storage_uri, "--blob-args"]
+        pathlib.Path(self.storage_uri).joinpath("stale.txt").write_text("stale")
+        with patch("pathlib.Path.cwd", lambda: self.dbt_project_config_dir), patch(
+            "data_pipelines_cli.cli_commands.deploy.bi"
+        ) as bi_mock:
+            result = runner.invoke(_cli, [*deploy_args, self.blob_json_filename, "--plan"])
+            self.assertEqual(0, result.exit_code, msg=result.exception)
+            bi_mock.assert_not_called()
+            self.assertListEqual(["stale.txt"], os.listdir(self.storage_uri))
+            self.assertIn("Delete stale.txt (5 bytes)", result.output)
+            self.assertIn("Upload 2 files", result.output)
+            self.assertIn("No upload throughput measured", result.output)
+
+            result = runner.invoke(_cli, [*deploy_args, self.blob_json_filename])
+            self.assertEqual(0, result.exit_code, msg=result.exception)
+            pathlib.Path(self.storage_uri).joinpath("a.txt").write_text("changed")
+            result = runner.invoke(_cli, [*deploy_args, self.blob_json_filename, "--plan"])
+            self.assertEqual(0, result.exit_code, msg=result.exception)
+            self.assertIn("Upload 1 files", result.output)
+            self.assertIn("Estimated upload duration", result.output)
+
+    def _plan_docker_push(self, registry, ancestor_revision_hashes):
+        local_image = MagicMock(
+            id="sha256:local",
+            attrs={
+                "RootFS": {"Layers": ["sha256:l1", "sha256:l2", "sha256:l3"]},
+                "RepoDigests": [],
+                "Size": 100,
+            },
+        )
+        registry_images = MagicMock(get=lambda _name: local_image)
+        docker_mock = MagicMock(
+            from_env=lambda: MagicMock(images=registry_images),
+            errors=MagicMock(APIError=self._FakeRegistryImages.NotFound),
+        )
+        with patch.dict("sys.modules", docker=docker_mock), patch(
+            "data_pipelines_cli.cli_commands.deploy.DockerRegistry",
+            self._fake_docker_registry(registry),
+        ), patch("pathlib.Path.cwd", lambda: self.dbt_project_config_dir), patch(
+            "data_pipelines_cli.data_structures.git_revision_hash", lambda: "sha1234"
+        ), patch(
+            "data_pipelines_cli.cli_commands.deploy.git_ancestor_revision_hashes",
+            lambda _max_count: ancestor_revision_hashes,
+        ), patch(
+            "data_pipelines_cli.cli_commands.deploy.BUILD_DIR", self.build_temp_dir
+        ), patch(
+            "data_pipelines_cli.cli_commands.deploy.echo_subinfo"
+        ) as echo_subinfo_mock, patch(
+            "data_pipelines_cli.cli_commands.deploy.echo_warning"
+        ):
+            DeployCommand(
+                "base",
+                True,
+                self.storage_uri,
+                self.provider_args,
+                False,
+                None,
+                None,
+                True,
+                plan=True,
+            ).deploy()
+
+        registry_images.push.assert_not_called()
+        echo_subinfo_mock.assert_called_once()
+        return echo_subinfo_mock.call_args.args[0]
+
+    def test_plan_docker_push(self):
+        registry = {
+            # Image of the parent revision, found in the registry
+            "my_docker_repository_uri:sha1233": {"layers": ["sha256:l1", "sha256:l2"]},
+        }
+        self.assertEqual(
+            "Push Docker image my_docker_repository_uri:sha1234 (100 bytes): "
+            "1 of 3 layers not in my_docker_repository_uri:sha1233 in the registry",
+            self._plan_docker_push(registry, ["sha1233", "sha1232"]),
+        )
+
+    def test_plan_docker_push_nothing_to_compare(self):
+        self.assertEqual(
+            "Push Docker image my_docker_repository_uri:sha1234 (100 bytes): "
+            "3 layers, no earlier image in the registry to compare with",
+            self._plan_docker_push({}, ["sha1233"]),
+        )
+        self.assertEqual(
+            "Push Docker image my_docker_repository_uri:sha1234 (100 bytes): "
+            "3 layers, unknown how many are in the registry",
+            self._plan_docker_push(requests.ConnectionError("registry down"), ["sha1233"]),
+        )
+
     def test_no_module_cli(self):
         for module_name, cli_args in [
             ("datahub", ["--datahub-ingest"]),
@@ -162,7 +331,7 @@ class DeployCommandTestCase(unittest.TestCase):
                 runner = CliRunner()
                 with patch.dict("sys.modules", **{module_name: None}), patch(
                     "pathlib.Path.cwd", lambda: self.dbt_project_config_dir
-                ), patch("data_pipelines_cli.cli_constants.BUILD_DIR", self.build_temp_dir):
+                ), patch("data_pipelines_cli.cli_commands.deploy.BUILD_DIR", self.build_temp_dir):
                     result = runner.invoke(
                         _cli,
                         [
@@ -210,7 +379,7 @@ class DeployCommandTestCase(unittest.TestCase):
     def test_no_docker_method(self):
         with patch.dict("sys.modules", docker=None), patch(
             "pathlib.Path.cwd", lambda: self.dbt_project_config_dir
-        ), patch("data_pipelines_cli.cli_constants.BUILD_DIR", self.build_temp_dir):
+        ), patch("data_pipelines_cli.cli_commands.deploy.BUILD_DIR", self.build_temp_dir):
             with self.assertRaises(DependencyNotInstalledError):
                 DeployCommand(
                     "base", True, self.storage_uri, self.provider_args, False, None, None, True
@@ -286,7 +455,9 @@ class DeployCommandTestCase(unittest.TestCase):
         ), patch("docker.from_env", lambda: docker_client_mock), patch(
             "data_pipelines_cli.data_structures.git_revision_hash", lambda: "sha1234"
         ), patch(
-            "data_pipelines_cli.cli_constants.BUILD_DIR", self.build_temp_dir
+            "data_pipelines_cli.cli_commands.deploy.DockerRegistry", self._fake_docker_registry({})
+        ), patch(
+            "data_pipelines_cli.cli_commands.deploy.BUILD_DIR", self.build_temp_dir
         ), patch(
             "data_pipelines_cli.cli_commands.deploy.bi"
         ):
@@ -317,13 +488,94 @@ class DeployCommandTestCase(unittest.TestCase):
         with patch("pathlib.Path.cwd", lambda: self.dbt_project_config_dir), patch.dict(
             "sys.modules", docker=docker_mock
         ), patch("data_pipelines_cli.data_structures.git_revision_hash", lambda: "sha1234"), patch(
-            "data_pipelines_cli.cli_constants.BUILD_DIR", self.build_temp_dir
+            "data_pipelines_cli.cli_commands.deploy.DockerRegistry", self._fake_docker_registry({})
+        ), patch(
+            "data_pipelines_cli.cli_commands.deploy.BUILD_DIR", self.build_temp_dir
         ):
             with self.assertRaises(DataPipelinesError):
                 DeployCommand(
                     "base", True, self.storage_uri, self.provider_args, False, None, None, True
                 ).deploy()
 
+    class _FakeRegistryImages:
+        """Stand-in for `docker_client.images` with a freshly built local image."""
+
+        class NotFound(Exception):
+            pass
+
+        def __init__(self, registry, local_image_id):
+            self.registry = registry
+            self.local_image_id = local_image_id
+            self.pushed = []
+
+        def get(self, name):
+            # Built on a fresh runner: never pushed nor pulled, so no RepoDigests
+            return MagicMock(
+                id=self.local_image_id,
+                attrs={"Id": self.local_image_id, "RepoDigests": [], "Architecture": "amd64"},
+            )
+
+        def push(self, repository, tag, **_kwargs):
+            self.pushed.append(f"{repository}:{tag}")
+            self.registry[f"{repository}:{tag}"] = {"config_digest": self.local_image_id}
+            return []
+
+    @staticmethod
+    def _fake_docker_registry(registry):
+        """Stand-in for :class:`DockerRegistry` reading images from *registry* dict."""
+
+        def _docker_registry(repository):
+            def _image(tag):
+                if isinstance(registry, Exception):
+                    raise registry
+                return registry.get(f"{repository}:{tag}", {})
+
+            return MagicMock(
+                get_image_config_digest=lambda tag, _platform: _image(tag).get("config_digest"),
+                get_image_layers=lambda tag, _platform: _image(tag).get("layers"),
+            )
+
+        return _docker_registry
+
+    def _deploy_with_registry(self, registry_images):
+        docker_mock = MagicMock(
+            from_env=lambda: MagicMock(images=registry_images),
+            errors=MagicMock(APIError=self._FakeRegistryImages.NotFound),
+        )
+        with patch.dict("sys.modules", docker=docker_mock), patch(
+            "data_pipelines_cli.cli_commands.deploy.DockerRegistry",
+            self._fake_docker_registry(registry_images.registry),
+        ), patch("data_pipelines_cli.data_structures.git_revision_hash", lambda: "sha1234"), patch(
+            "data_pipelines_cli.cli_commands.deploy.BUILD_DIR", self.build_temp_dir
+        ), patch(
+            "data_pipelines_cli.cli_commands.deploy.bi"
+        ):
+            DeployCommand(
+                "base", True, self.storage_uri, self.provider_args, False, None, None, True
+            ).deploy()
+
+    def test_docker_push_skipped_when_image_in_registry(self):
+        registry_images = self._FakeRegistryImages(
+            {"my_docker_repository_uri:sha1234": {"config_digest": "sha256:abc"}}, "sha256:abc"
+        )
+        with patch("data_pipelines_cli.cli_commands.deploy.echo_info") as echo_info_mock:
+            self._deploy_with_registry(registry_images)
+
+        self.assertListEqual([], registry_images.pushed)
+        self.assertIn("already present", echo_info_mock.call_args_list[0].args[0])
+
+    def test_docker_pushed_when_registry_differs(self):
+        for registry in [
+            {},
+            {"my_docker_repository_uri:sha1234": {"config_digest": "sha256:old"}},
+            requests.ConnectionError("Registry unreachable"),
+        ]:
+            with self.subTest(registry=registry):
+                registry_images = self._FakeRegistryImages(registry, "sha256:new")
+                registry_images.push = MagicMock(return_value=[])
+                self._deploy_with_registry(registry_images)
+                registry_images.push.assert_called_once()
+
     def test_ingestion_is_false_by_default(self):
         with patch("data_pipelines_cli.cli_constants.BUILD_DIR", self.build_temp_dir), patch(
             "data_pipelines_cli.cli_commands.deploy.BUILD_DIR", self.build_temp_dir
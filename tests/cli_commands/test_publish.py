@@ -71,6 +71,7 @@ class PublishCommandTestCase(unittest.TestCase):
 
     def setUp(self) -> None:
         self.maxDiff = None
+        self.staged_changes = "M\tmy_test_project_1337/models/sources.yml"
 
         self.build_temp_dir = pathlib.Path(tempfile.mkdtemp())
         dags_path = pathlib.Path(self.build_temp_dir).joinpath("dag")
@@ -94,18 +95,18 @@ class PublishCommandTestCase(unittest.TestCase):
         self.origin.push = MagicMock()
         return self.origin
 
-    def mock_clone_from(self, url: PathLike, to_path: PathLike, **kwargs: Any):
+    def mock_workspace(self, path: PathLike, url: str, branch: str, key_path: str, **kwargs: Any):
         self.assertEqual("https://gitlab.com/getindata/dataops/some_repo.git", url)
-        self.assertEqual("main", kwargs["branch"])
+        self.assertEqual("main", branch)
+        self.assertListEqual(["my_test_project_1337"], kwargs["sparse_paths"])
 
         def noop():
             pass
 
         repo_mock = MagicMock()
         self.git = MagicMock()
-        self.index = MagicMock()
-        self.index.commit = MagicMock()
         self.git.add = MagicMock()
+        self.git.diff = MagicMock(return_value=self.staged_changes)
         config_writer_mock = MagicMock()
         set_value_mock = MagicMock()
         set_value_mock.configure_mock(**{"release": noop})
@@ -114,23 +115,17 @@ class PublishCommandTestCase(unittest.TestCase):
             **{
                 "config_writer": config_writer_mock,
                 "git": self.git,
-                "index": self.index,
                 "remote": self.mock_origin,
             }
         )
-        return repo_mock
-
-    def repo_class_mock(self):
-        self.repo_mock_class = MagicMock()
-        self.repo_mock_class.configure_mock(**{"clone_from": self.mock_clone_from})
-        return self.repo_mock_class
+        return MagicMock(sync=lambda: repo_mock, git_env={})
 
     @patch("pathlib.Path.cwd", lambda: goldens_dir_path)
     def test_generate_correct_project(self):
         runner = CliRunner()
         with patch("data_pipelines_cli.cli_commands.publish.BUILD_DIR", self.build_temp_dir), patch(
             "data_pipelines_cli.config_generation.BUILD_DIR", self.build_temp_dir
-        ), patch("data_pipelines_cli.cli_commands.publish.Repo", self.repo_class_mock()):
+        ), patch("data_pipelines_cli.cli_commands.publish.GitWorkspace", self.mock_workspace):
             runner.invoke(_cli, ["publish", "--key-path", "SOME_KEY.txt"])
             result = runner.invoke(_cli, ["publish", "--key-path", "SOME_KEY.txt"])
 
@@ -138,13 +133,28 @@ class PublishCommandTestCase(unittest.TestCase):
             self.verify_publications()
             self.verify_generated_files()
 
+    @patch("pathlib.Path.cwd", lambda: goldens_dir_path)
+    def test_nothing_to_publish(self):
+        self.staged_changes = ""
+        runner = CliRunner()
+        with patch("data_pipelines_cli.cli_commands.publish.BUILD_DIR", self.build_temp_dir), patch(
+            "data_pipelines_cli.config_generation.BUILD_DIR", self.build_temp_dir
+        ), patch("data_pipelines_cli.cli_commands.publish.GitWorkspace", self.mock_workspace):
+            result = runner.invoke(_cli, ["publish", "--key-path", "SOME_KEY.txt"])
+
+        self.verify_status_code(result)
+        self.assertIn("nothing to publish", result.output)
+        self.git.add.assert_called_with(all=True)
+        self.git.commit.assert_not_called()
+        self.assertFalse(hasattr(self, "origin"))
+
     def verify_status_code(self, result):
         self.assertEqual(0, result.exit_code, msg=result.output)
 
     def verify_publications(self):
         self.git.add.assert_called_with(all=True)
-        self.index.commit.assert_called_with(
-            "Publication from project my_test_project_1337, version: 1.2.3"
+        self.git.commit.assert_called_with(
+            "-m", "Publication from project my_test_project_1337, version: 1.2.3"
         )
         self.origin.push.assert_called_with()
 
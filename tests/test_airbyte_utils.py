@@ -217,6 +217,25 @@ class AirbyteUtilsTest(unittest.TestCase):
 
         self.assertEqual(os.environ["POSTGRES_BQ_CONNECTION"], matching_connection_id)
 
+    @patch("data_pipelines_cli.airbyte_utils.AirbyteFactory.request_handler")
+    def test_plan_connections(self, mock_handler):
+        connection_config = self.airbyte_config["connections"]["POSTGRES_BQ_CONNECTION"]
+        mock_handler.return_value = {"connections": []}
+        self.assertDictEqual(
+            {"create": ["POSTGRES_BQ_CONNECTION"], "update": []},
+            self.test_airbyte_factory.plan_connections(),
+        )
+
+        mock_handler.return_value = {
+            "connections": [{"connectionId": "7aa68945", **copy.deepcopy(connection_config)}]
+        }
+        self.assertDictEqual(
+            {"create": [], "update": ["POSTGRES_BQ_CONNECTION"]},
+            self.test_airbyte_factory.plan_connections(),
+        )
+        for endpoint_call in mock_handler.call_args_list:
+            self.assertEqual("connections/list", endpoint_call[0][0])
+
     @patch("data_pipelines_cli.airbyte_utils.AirbyteFactory.request_handler")
     def test_get_default_workspace_id(self, mock_handler):
         mock_handler.side_effect = (
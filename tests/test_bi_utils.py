@@ -20,7 +20,7 @@ class BiUtilsTestCase(unittest.TestCase):
             "data_pipelines_cli.bi_utils._bi_looker", _bi_looker_mock
         ):
             bi("env", BiAction.COMPILE)
-            _bi_looker_mock.assert_called_with("env", True, False, None)
+            _bi_looker_mock.assert_called_with("env", True, False, None, None)
 
     def test_bi_deploy_looker(self):
         bi_config = {
@@ -36,7 +36,7 @@ class BiUtilsTestCase(unittest.TestCase):
             "data_pipelines_cli.bi_utils._bi_looker", _bi_looker_mock
         ):
             bi("env", BiAction.DEPLOY)
-            _bi_looker_mock.assert_called_with("env", False, True, None)
+            _bi_looker_mock.assert_called_with("env", False, True, None, None)
 
     def test_bi_disabled(self):
         bi_config = {
@@ -118,4 +118,4 @@ class BiUtilsTestCase(unittest.TestCase):
             "data_pipelines_cli.bi_utils._bi_looker", _bi_looker_mock
         ):
             bi("env", 2)
-            _bi_looker_mock.assert_called_with("env", False, False, None)
+            _bi_looker_mock.assert_called_with("env", False, False, None, None)
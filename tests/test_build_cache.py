@@ -0,0 +1,98 @@
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from data_pipelines_cli.build_cache import BuildCache, compute_build_cache_key
+
+goldens_dir_path = pathlib.Path(__file__).parent.joinpath("goldens")
+
+
+class BuildCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        tmp_path = pathlib.Path(self.tmp_dir.name)
+        self.cache_uri = tmp_path.joinpath("cache").as_uri()
+        self.target_path = tmp_path.joinpath("target")
+        shutil.copytree(goldens_dir_path.joinpath("target"), self.target_path)
+        self.restored_path = tmp_path.joinpath("restored")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _files(self, path: pathlib.Path):
+        return {
+            str(file.relative_to(path)): file.read_bytes()
+            for file in path.glob("**/*")
+            if file.is_file()
+        }
+
+    def test_miss(self):
+        self.assertFalse(BuildCache(self.cache_uri).restore("abc", self.restored_path))
+        self.assertFalse(self.restored_path.exists())
+
+    def test_save_and_restore(self):
+        BuildCache(self.cache_uri).save("abc", self.target_path)
+        self.restored_path.mkdir()
+        self.restored_path.joinpath("stale.json").write_text("{}")
+
+        self.assertTrue(BuildCache(self.cache_uri).restore("abc", self.restored_path))
+        self.assertDictEqual(self._files(self.target_path), self._files(self.restored_path))
+
+    def test_corrupted_entry(self):
+        BuildCache(self.cache_uri).save("abc", self.target_path)
+        cache_path = pathlib.Path(self.tmp_dir.name).joinpath("cache", "abc.tar.gz")
+        cache_path.write_bytes(cache_path.read_bytes()[:100])
+
+        self.assertFalse(BuildCache(self.cache_uri).restore("abc", self.restored_path))
+        self.assertFalse(self.restored_path.exists())
+
+
+class ComputeBuildCacheKeyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.project_path = pathlib.Path(self.tmp_dir.name)
+        self.project_path.joinpath("models").mkdir()
+        self.project_path.joinpath("models", "model.sql").write_text("select 1")
+        self.project_path.joinpath("dbt_project.yml").write_text("name: project")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _key(self, env="dev", dbt_vars=None, adapter_type="bigquery"):
+        return compute_build_cache_key(self.project_path, env, dbt_vars or {"a": 1}, adapter_type)
+
+    def test_key_ignores_build_outputs(self):
+        key = self._key()
+        for output_dir in ("build", "target", "dbt_packages", "logs"):
+            self.project_path.joinpath(output_dir).mkdir()
+            self.project_path.joinpath(output_dir, "file.txt").write_text(output_dir)
+        self.assertEqual(key, self._key())
+
+    def test_key_depends_on_inputs(self):
+        key = self._key()
+        self.assertNotEqual(key, self._key(env="prod"))
+        self.assertNotEqual(key, self._key(dbt_vars={"a": 2}))
+        self.assertNotEqual(key, self._key(adapter_type="snowflake"))
+
+        self.project_path.joinpath("models", "model.sql").write_text("select 2")
+        self.assertNotEqual(key, self._key())
+
+    def test_key_depends_on_used_env_vars(self):
+        self.project_path.joinpath("config", "dev").mkdir(parents=True)
+        self.project_path.joinpath("config", "dev", "bigquery.yml").write_text(
+            "project: \"{{ env_var('GCP_PROJECT') }}\"\n"
+        )
+        self.project_path.joinpath("models", "model.sql").write_text(
+            "select * from {{ env_var( \"SOURCE_SCHEMA\", 'raw') }}.orders"
+        )
+        with patch.dict(os.environ, {"GCP_PROJECT": "project-a", "UNUSED": "a"}):
+            key = self._key()
+        with patch.dict(os.environ, {"GCP_PROJECT": "project-a", "UNUSED": "b"}):
+            self.assertEqual(key, self._key())
+        with patch.dict(os.environ, {"GCP_PROJECT": "project-b"}):
+            self.assertNotEqual(key, self._key())
+        with patch.dict(os.environ, {"GCP_PROJECT": "project-a", "SOURCE_SCHEMA": "raw"}):
+            self.assertNotEqual(key, self._key())
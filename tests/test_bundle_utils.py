@@ -0,0 +1,129 @@
+import io
+import json
+import pathlib
+import shutil
+import tempfile
+import time
+import unittest
+import uuid
+from unittest.mock import patch
+
+import fsspec
+from fsspec.implementations.memory import MemoryFileSystem
+
+from data_pipelines_cli.bundle_utils import (
+    BUNDLE_FILE_NAMES,
+    BUNDLE_INDEX_FILE_NAME,
+    LocalRemoteBundleSync,
+    create_bundle,
+    unpack_bundle,
+)
+from data_pipelines_cli.errors import DataPipelinesError, DependencyNotInstalledError
+from data_pipelines_cli.filesystem_utils import LocalRemoteSync
+
+goldens_dir_path = pathlib.Path(__file__).parent.joinpath("goldens")
+
+
+class _CountingMemoryFileSystem(MemoryFileSystem):
+    """Memory filesystem counting files opened and written, i.e. requests to a bucket."""
+
+    protocol = ("countingmemory",)
+    requests = 0
+
+    @classmethod
+    def _strip_protocol(cls, path):
+        return super()._strip_protocol(path.replace("countingmemory://", "memory://", 1))
+
+    def _open(self, *args, **kwargs):
+        type(self).requests += 1
+        return super()._open(*args, **kwargs)
+
+    def pipe_file(self, *args, **kwargs):
+        type(self).requests += 1
+        return super().pipe_file(*args, **kwargs)
+
+
+fsspec.register_implementation("countingmemory", _CountingMemoryFileSystem, clobber=True)
+
+
+class BundleTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.remote_path = f"memory://bundle-tests/{uuid.uuid4().hex}"
+        self.memory_fs, self.remote_path_str = fsspec.core.url_to_fs(self.remote_path)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.local_path = pathlib.Path(self.tmp_dir.name).joinpath("dag")
+        shutil.copytree(goldens_dir_path.joinpath("config"), self.local_path.joinpath("config"))
+        self.destination_path = pathlib.Path(self.tmp_dir.name).joinpath("unpacked")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+        if self.memory_fs.exists(self.remote_path_str):
+            self.memory_fs.rm(self.remote_path_str, recursive=True)
+
+    def _files(self, path: pathlib.Path):
+        return {
+            file.relative_to(path).as_posix(): file.read_bytes()
+            for file in path.rglob("*")
+            if file.is_file()
+        }
+
+    def test_bundle_deterministic(self):
+        first, second = io.BytesIO(), io.BytesIO()
+        first_index = create_bundle(self.local_path, first)
+        time.sleep(1.1)
+        self.local_path.joinpath("config", "base", "dbt.yml").touch()
+        second_index = create_bundle(self.local_path, second)
+
+        self.assertEqual(first.getvalue(), second.getvalue())
+        self.assertDictEqual(first_index, second_index)
+        self.assertSetEqual(set(self._files(self.local_path)), set(first_index["files"]))
+
+    def test_sync_and_unpack(self):
+        self.memory_fs.pipe_file(f"{self.remote_path_str}/stale.txt", b"stale")
+        LocalRemoteBundleSync(self.local_path, self.remote_path, {}).sync(delete=True)
+
+        self.assertListEqual(
+            [
+                f"{self.remote_path_str}/{BUNDLE_INDEX_FILE_NAME}",
+                f"{self.remote_path_str}/{BUNDLE_FILE_NAMES['gzip']}",
+            ],
+            self.memory_fs.find(self.remote_path_str),
+        )
+
+        self.destination_path.mkdir()
+        self.destination_path.joinpath("removed_dag.py").write_text("")
+        unpack_bundle(self.remote_path, str(self.destination_path))
+        self.assertDictEqual(self._files(self.local_path), self._files(self.destination_path))
+
+    def test_tampered_bundle(self):
+        LocalRemoteBundleSync(self.local_path, self.remote_path, {}).sync()
+        index_path = f"{self.remote_path_str}/{BUNDLE_INDEX_FILE_NAME}"
+        index = json.loads(self.memory_fs.cat_file(index_path))
+        index["files"]["config/base/dbt.yml"]["sha256"] = "0" * 64
+        self.memory_fs.pipe_file(index_path, json.dumps(index).encode())
+
+        with self.assertRaises(DataPipelinesError):
+            unpack_bundle(self.remote_path, str(self.destination_path))
+
+    @patch.dict("sys.modules", {"zstandard": None})
+    def test_zstandard_not_installed(self):
+        with self.assertRaises(DependencyNotInstalledError):
+            LocalRemoteBundleSync(self.local_path, self.remote_path, {}, "zstd").sync()
+
+    def test_sync_requests(self):
+        for i in range(100):
+            self.local_path.joinpath("models", f"model_{i}.sql").parent.mkdir(exist_ok=True)
+            self.local_path.joinpath("models", f"model_{i}.sql").write_text(f"select {i}")
+        files_count = len(self._files(self.local_path))
+
+        def _sync_requests(sync_class):
+            remote_path = f"countingmemory://bundle-tests/{uuid.uuid4().hex}"
+            _CountingMemoryFileSystem.requests = 0
+            sync_class(self.local_path, remote_path, {}).sync(delete=False)
+            self.memory_fs.rm(fsspec.core.url_to_fs(remote_path)[1], recursive=True)
+            return _CountingMemoryFileSystem.requests
+
+        file_by_file_requests = _sync_requests(LocalRemoteSync)
+        bundle_requests = _sync_requests(LocalRemoteBundleSync)
+        self.assertGreaterEqual(file_by_file_requests, files_count)
+        self.assertLess(bundle_requests * 20, file_by_file_requests)
@@ -0,0 +1,79 @@
+import pathlib
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from data_pipelines_cli import config_generation
+from data_pipelines_cli.command_context import CommandContext
+
+goldens_dir_path = pathlib.Path(__file__).parent.joinpath("goldens")
+
+
+class CommandContextTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.build_temp_dir = pathlib.Path(tempfile.mkdtemp())
+        shutil.copytree(
+            goldens_dir_path.joinpath("config"), self.build_temp_dir.joinpath("dag", "config")
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.build_temp_dir)
+
+    def test_read_config_once(self):
+        context = CommandContext("staging", self.build_temp_dir)
+        with patch(
+            "data_pipelines_cli.command_context.read_dictionary_from_config_directory",
+            wraps=lambda *args: {"dags_path": "gcs://bucket/path"},
+        ) as read_mock:
+            self.assertEqual("gcs://bucket/path", context.read_config("airflow.yml")["dags_path"])
+            self.assertEqual("gcs://bucket/path", context.read_config("airflow.yml")["dags_path"])
+            read_mock.assert_called_once_with(
+                self.build_temp_dir.joinpath("dag"), "staging", "airflow.yml"
+            )
+
+            context.invalidate_config("airflow.yml")
+            context.read_config("airflow.yml")
+            self.assertEqual(2, read_mock.call_count)
+
+    def test_merged_config(self):
+        context = CommandContext("staging", self.build_temp_dir)
+        self.assertEqual(
+            "gcs://test/jinja/path/com/my/project/name",
+            context.read_config("airflow.yml")["dags_path"],
+        )
+
+    @patch("data_pipelines_cli.data_structures.git_revision_hash")
+    def test_docker_args_created_once(self, mock_git_revision_hash):
+        mock_git_revision_hash.return_value = "sha1234"
+        context = CommandContext("base", self.build_temp_dir)
+
+        docker_args = context.docker_args(None, {"arg": "value"})
+        self.assertIs(docker_args, context.docker_args())
+
+        self.assertEqual("my_docker_repository_uri:sha1234", docker_args.docker_build_tag())
+        self.assertDictEqual({"arg": "value"}, docker_args.build_args)
+        mock_git_revision_hash.assert_called_once()
+
+    @patch("data_pipelines_cli.data_structures.git_revision_hash")
+    def test_docker_args_use_context_config(self, mock_git_revision_hash):
+        mock_git_revision_hash.return_value = "sha1234"
+        context = CommandContext("base", self.build_temp_dir)
+        read_config = config_generation.read_dictionary_from_config_directory
+
+        with patch(
+            "data_pipelines_cli.command_context.read_dictionary_from_config_directory",
+            wraps=read_config,
+        ) as context_read_mock, patch(
+            "data_pipelines_cli.config_generation.read_dictionary_from_config_directory",
+            wraps=read_config,
+        ) as read_mock:
+            context.read_config("execution_env.yml")
+            docker_args = context.docker_args()
+            context.docker_args()
+
+        self.assertEqual("my_docker_repository_uri:sha1234", docker_args.docker_build_tag())
+        context_read_mock.assert_called_once_with(
+            self.build_temp_dir.joinpath("dag"), "base", "execution_env.yml"
+        )
+        read_mock.assert_not_called()
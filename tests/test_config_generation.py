@@ -95,6 +95,131 @@ class TestConfigGeneration(unittest.TestCase):
                     ),
                 )
 
+    def _copy_config_dir(self, tmp_dir: str) -> pathlib.Path:
+        dag_path = pathlib.Path(tmp_dir).joinpath("dag")
+        with patch("data_pipelines_cli.config_generation.BUILD_DIR", pathlib.Path(tmp_dir)), patch(
+            "pathlib.Path.cwd", lambda: self.goldens_dir_path
+        ):
+            cgen.copy_config_dir_to_build_dir()
+        return dag_path
+
+    def test_resolved_config_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dag_path = self._copy_config_dir(tmp_dir)
+            for env, _ in self.envs_to_test:
+                with self.subTest(env=env):
+                    config_hash = cgen.write_resolved_config(
+                        dag_path, env, self.configs_to_test[env]["vars"]
+                    )
+                    resolved_configs = cgen.read_resolved_config(dag_path, env)
+
+                    self.assertEqual(64, len(config_hash))
+                    self.assertDictEqual(self.configs_to_test[env], resolved_configs["dbt.yml"])
+                    self.assertIn("execution_env.yml", resolved_configs)
+                    self.assertIsNone(cgen.read_resolved_config(dag_path, "other_env"))
+
+    def test_snapshot_rendered(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dag_path = self._copy_config_dir(tmp_dir)
+            with patch.dict(os.environ, {"BIGQUERY_KEYFILE": "/tmp/keyfile.json"}):
+                cgen.write_resolved_config(
+                    dag_path, "staging", {"variable_1": 3, "variable_2": "x"}
+                )
+            bigquery_config = cgen.read_dictionary_from_config_directory(
+                dag_path, "staging", "bigquery.yml"
+            )
+            self.assertEqual("x-dataset", bigquery_config["dataset"])
+            self.assertEqual(3, bigquery_config["threads"])
+            # Values of environment variables are not saved in the synced snapshot
+            self.assertEqual("{{ env_var('BIGQUERY_KEYFILE') }}", bigquery_config["keyfile"])
+            self.assertNotIn(
+                "/tmp/keyfile.json",
+                dag_path.joinpath(cgen.RESOLVED_CONFIG_FILE_NAME).read_text(),
+            )
+
+    def test_snapshot_without_missing_variables(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dag_path = self._copy_config_dir(tmp_dir)
+            cgen.write_resolved_config(dag_path, "staging", {"variable_1": 3})
+
+            bigquery_config = cgen.read_resolved_config(dag_path, "staging")["bigquery.yml"]
+            self.assertEqual("{{ var('variable_2') }}-dataset", bigquery_config["dataset"])
+            self.assertEqual(3, bigquery_config["threads"])
+
+    def test_snapshot_with_airflow_macros(self):
+        airflow_macros = {
+            "schedule": "{{ var.value.sched }}",
+            "start": "{{ ds }}",
+            "command": "run {{ ds_nodash }} {{ var('variable_2') }}",
+            "params": ["{{ macros.ds_add(ds, 1) }}", "{{ params.x | default(1) }}"],
+            "plain": "123",
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dag_path = self._copy_config_dir(tmp_dir)
+            airflow_config_path = dag_path.joinpath("config", "base", "airflow.yml")
+            airflow_config = yaml.safe_load(airflow_config_path.read_text())
+            airflow_config_path.write_text(
+                yaml.dump(
+                    {**airflow_config, "macros": airflow_macros, "rendered": "{{ var('v') }}"}
+                )
+            )
+            cgen.write_resolved_config(dag_path, "dev", {"v": 7, "variable_2": "x"})
+
+            resolved_airflow_config = cgen.read_dictionary_from_config_directory(
+                dag_path, "dev", "airflow.yml"
+            )
+            self.assertDictEqual(airflow_macros, resolved_airflow_config["macros"])
+            self.assertEqual(7, resolved_airflow_config["rendered"])
+
+    def test_read_from_config_dir_uses_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dag_path = self._copy_config_dir(tmp_dir)
+            cgen.write_resolved_config(dag_path, "dev", {})
+            with patch.object(cgen, "_read_yaml_file") as read_yaml_mock:
+                for _ in range(2):
+                    self.assertDictEqual(
+                        self.configs_to_test["dev"],
+                        cgen.read_dictionary_from_config_directory(dag_path, "dev", "dbt.yml"),
+                    )
+            read_yaml_mock.assert_not_called()
+
+    def test_snapshot_ignored_after_config_edit(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dag_path = self._copy_config_dir(tmp_dir)
+            cgen.write_resolved_config(dag_path, "dev", {})
+            cgen.read_resolved_config(dag_path, "dev")
+            dbt_config_path = dag_path.joinpath("config", "base", "dbt.yml")
+            dbt_config = yaml.safe_load(dbt_config_path.read_text())
+            dbt_config["target"] = "edited"
+            dbt_config_path.write_text(yaml.dump(dbt_config))
+
+            self.assertIsNone(cgen.read_resolved_config(dag_path, "dev"))
+            self.assertEqual(
+                "edited",
+                cgen.read_dictionary_from_config_directory(dag_path, "dev", "dbt.yml")["target"],
+            )
+
+    def test_tampered_snapshot_ignored(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dag_path = self._copy_config_dir(tmp_dir)
+            cgen.write_resolved_config(dag_path, "dev", {})
+            snapshot_path = dag_path.joinpath(cgen.RESOLVED_CONFIG_FILE_NAME)
+            snapshot_path.write_text(snapshot_path.read_text().replace("env_execution", "other"))
+
+            self.assertIsNone(cgen.read_resolved_config(dag_path, "dev"))
+            self.assertDictEqual(
+                self.configs_to_test["dev"],
+                cgen.read_dictionary_from_config_directory(dag_path, "dev", "dbt.yml"),
+            )
+
+    def test_copy_config_dir_removes_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dag_path = self._copy_config_dir(tmp_dir)
+            cgen.write_resolved_config(dag_path, "dev", {})
+            self._copy_config_dir(tmp_dir)
+
+            self.assertFalse(dag_path.joinpath(cgen.RESOLVED_CONFIG_FILE_NAME).exists())
+
     def test_generation(self):
         for env, profile_type in self.envs_to_test:
             with self.subTest(
@@ -85,6 +85,12 @@ class DockerArgsTest(unittest.TestCase):
         self.assertEqual(repository, docker_args.repository)
         self.assertEqual(image_tag, docker_args.image_tag)
 
+    def test_given_build_dir(self):
+        docker_args = DockerArgs("image_tag", None, {}, build_dir=self.build_temp_dir)
+        self.assertEqual(
+            "my_docker_repository_uri:some_test_tag_a1s2d3f", docker_args.docker_build_tag()
+        )
+
     def test_set_tag(self):
         repository = "my_docker_repository_uri"
         image_tag = "some_test_tag_a1s2d3f"
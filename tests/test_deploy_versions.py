@@ -0,0 +1,106 @@
+import json
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+from data_pipelines_cli.deploy_versions import (
+    AIRFLOW_IGNORE_FILE_NAME,
+    AIRFLOW_IGNORE_PATTERN,
+    POINTER_FILE_NAME,
+    VERSION_INDEX_FILE_NAME,
+    VERSIONS_DIR_NAME,
+    VersionedRemoteSync,
+    compute_version,
+    read_current_version,
+)
+from data_pipelines_cli.errors import DataPipelinesError
+
+goldens_dir_path = pathlib.Path(__file__).parent.joinpath("goldens")
+
+
+class VersionedRemoteSyncTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        tmp_path = pathlib.Path(self.tmp_dir.name)
+        self.local_path = tmp_path.joinpath("dag")
+        shutil.copytree(goldens_dir_path.joinpath("dag"), self.local_path)
+        self.remote_path = tmp_path.joinpath("remote")
+        self.remote_kwargs = {"auto_mkdir": True}
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _sync(self, keep_versions=5):
+        return VersionedRemoteSync(str(self.remote_path), self.remote_kwargs, keep_versions)
+
+    def _deploy_new_version(self, content: str, keep_versions=5) -> str:
+        self.local_path.joinpath("a.txt").write_text(content)
+        return self._sync(keep_versions).sync(self.local_path, max_workers=2)
+
+    def _pointer(self):
+        return json.loads(self.remote_path.joinpath(POINTER_FILE_NAME).read_text())
+
+    def test_version_is_content_hash(self):
+        version = compute_version(self.local_path)
+        self.assertEqual(version, compute_version(self.local_path))
+        self.local_path.joinpath("b.txt").write_text("changed")
+        self.assertNotEqual(version, compute_version(self.local_path))
+
+    def test_sync(self):
+        version = self._sync().sync(self.local_path)
+
+        version_path = self.remote_path.joinpath(VERSIONS_DIR_NAME, version)
+        self.assertEqual("abcdef", version_path.joinpath("a.txt").read_text())
+        self.assertTrue(version_path.joinpath(VERSION_INDEX_FILE_NAME).is_file())
+        self.assertEqual(version, self._pointer()["version"])
+        self.assertEqual(
+            f"{self.remote_path}/{VERSIONS_DIR_NAME}/{version}",
+            read_current_version(str(self.remote_path)),
+        )
+
+    def test_versions_ignored_by_airflow(self):
+        self.remote_path.mkdir()
+        ignore_file_path = self.remote_path.joinpath(AIRFLOW_IGNORE_FILE_NAME)
+        ignore_file_path.write_text("^tmp/\n")
+
+        self._sync().sync(self.local_path)
+        self._deploy_new_version("second")
+        self.assertEqual(f"^tmp/\n{AIRFLOW_IGNORE_PATTERN}\n", ignore_file_path.read_text())
+        self.assertRegex(
+            f"{VERSIONS_DIR_NAME}/{compute_version(self.local_path)}", AIRFLOW_IGNORE_PATTERN
+        )
+        self.assertRegex(VERSIONS_DIR_NAME, AIRFLOW_IGNORE_PATTERN)
+        self.assertNotRegex(f"my_{VERSIONS_DIR_NAME}.py", AIRFLOW_IGNORE_PATTERN)
+
+    def test_existing_version_not_uploaded_again(self):
+        version = self._sync().sync(self.local_path)
+        version_path = self.remote_path.joinpath(VERSIONS_DIR_NAME, version)
+        version_path.joinpath("a.txt").write_text("not overwritten")
+
+        self._sync().sync(self.local_path)
+        self.assertEqual("not overwritten", version_path.joinpath("a.txt").read_text())
+
+    def test_rollback(self):
+        first_version = self._deploy_new_version("first")
+        second_version = self._deploy_new_version("second")
+        self.assertEqual(second_version, self._sync().current_version())
+
+        self._sync().rollback(first_version)
+        self.assertEqual(first_version, self._sync().current_version())
+        self.assertListEqual([first_version, second_version], self._pointer()["history"])
+
+        with self.assertRaises(DataPipelinesError):
+            self._sync().rollback("0123456789abcdef")
+
+    def test_garbage_collection(self):
+        versions = [self._deploy_new_version(str(i), keep_versions=2) for i in range(4)]
+        incomplete_version_path = self.remote_path.joinpath(VERSIONS_DIR_NAME, "incomplete")
+        incomplete_version_path.mkdir()
+
+        self.assertListEqual(sorted(versions[2:]), self._sync().list_versions())
+        self.assertTrue(incomplete_version_path.exists())
+
+    def test_nothing_deployed(self):
+        self.assertIsNone(read_current_version(str(self.remote_path)))
+        self.assertListEqual([], self._sync().list_versions())
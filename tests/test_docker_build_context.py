@@ -0,0 +1,93 @@
+import pathlib
+import tarfile
+import tempfile
+import unittest
+
+from data_pipelines_cli.docker_build_context import (
+    create_build_context,
+    list_build_context_files,
+)
+
+
+class DockerBuildContextTestCase(unittest.TestCase):
+    layout = [
+        "Dockerfile",
+        "dbt_project.yml",
+        "models/model.sql",
+        "models/docs.md",
+        "build/profiles/env_execution/profiles.yml",
+        "build/dag/manifest.json",
+        "target/manifest.json",
+        "dbt_packages/pkg/dbt_project.yml",
+        "logs/dbt.log",
+        "notes/a.md",
+        "notes/b.txt",
+    ]
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.context_path = pathlib.Path(self.tmp_dir.name)
+        for file in self.layout:
+            file_path = self.context_path.joinpath(file)
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_text(file)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _files_only(self, files):
+        return [file for file in files if self.context_path.joinpath(file).is_file()]
+
+    def test_default_excludes(self):
+        self.assertListEqual(
+            [
+                "Dockerfile",
+                "build/profiles/env_execution/profiles.yml",
+                "dbt_project.yml",
+                "models/docs.md",
+                "models/model.sql",
+                "notes/a.md",
+                "notes/b.txt",
+            ],
+            self._files_only(list_build_context_files(self.context_path)),
+        )
+
+    def test_dockerignore(self):
+        self.context_path.joinpath(".dockerignore").write_text(
+            "# comment\nnotes\n!notes/*.md\n**/*.sql\n!target\n"
+        )
+        self.assertListEqual(
+            [
+                ".dockerignore",
+                "Dockerfile",
+                "build/profiles/env_execution/profiles.yml",
+                "dbt_project.yml",
+                "models/docs.md",
+                "notes/a.md",
+                "target/manifest.json",
+            ],
+            self._files_only(list_build_context_files(self.context_path)),
+        )
+
+    def test_include(self):
+        self.assertListEqual(
+            ["Dockerfile", "models/docs.md", "models/model.sql"],
+            self._files_only(
+                list_build_context_files(self.context_path, include=["Dockerfile", "models"])
+            ),
+        )
+
+    def test_deterministic_tarball(self):
+        first_context = create_build_context(self.context_path)
+        self.context_path.joinpath("models", "model.sql").touch()
+        second_context = create_build_context(self.context_path)
+        with first_context.fileobj, second_context.fileobj:
+            first_bytes = first_context.fileobj.read()
+            self.assertEqual(first_bytes, second_context.fileobj.read())
+            self.assertEqual(len(first_bytes), first_context.size)
+
+            first_context.fileobj.seek(0)
+            with tarfile.open(fileobj=first_context.fileobj) as tar:
+                self.assertIn("models/model.sql", tar.getnames())
+                self.assertNotIn("target/manifest.json", tar.getnames())
+                self.assertEqual(first_context.files_count, len(tar.getnames()))
@@ -0,0 +1,120 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from data_pipelines_cli.docker_registry import (
+    DOCKER_HUB_REGISTRY,
+    DockerRegistry,
+    image_platform,
+)
+from data_pipelines_cli.errors import DockerNotInstalledError
+
+
+def _response(status_code, body=None, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body or {}).encode("utf-8")
+    response.headers.update(headers or {})
+    response.url = "https://registry.example.com"
+    return response
+
+
+class DockerRegistryTestCase(unittest.TestCase):
+    manifest_list = {
+        "mediaType": "application/vnd.docker.distribution.manifest.list.v2+json",
+        "manifests": [
+            {"digest": "sha256:amd", "platform": {"os": "linux", "architecture": "amd64"}},
+            {"digest": "sha256:arm", "platform": {"os": "linux", "architecture": "arm64"}},
+        ],
+    }
+
+    def setUp(self) -> None:
+        self.docker_mock = MagicMock()
+        self.docker_mock.auth.INDEX_NAME = "docker.io"
+        self.docker_mock.auth.resolve_repository_name.return_value = (
+            "registry.example.com",
+            "team/app",
+        )
+        self.docker_mock.auth.resolve_authconfig.return_value = {
+            "Username": "user",
+            "Password": "secret",
+        }
+        self.blobs = {
+            "manifests/sha1234": self.manifest_list,
+            "manifests/sha256:amd": {"config": {"digest": "sha256:config-amd"}},
+            "manifests/sha256:arm": {"config": {"digest": "sha256:config-arm"}},
+            "blobs/sha256:config-arm": {"rootfs": {"diff_ids": ["sha256:l1", "sha256:l2"]}},
+        }
+        self.session = MagicMock(headers={}, get=self._registry_get)
+
+    def _registry_get(self, url, headers, timeout):
+        if self.session.headers.get("Authorization") != "Bearer t0k":
+            return _response(
+                401,
+                headers={
+                    "WWW-Authenticate": 'Bearer realm="https://auth.example.com/token",'
+                    'service="registry.example.com",scope="repository:team/app:pull"'
+                },
+            )
+        prefix = "https://registry.example.com/v2/team/app/"
+        path = url[len(prefix) :]
+        if not url.startswith(prefix) or path not in self.blobs:
+            return _response(404)
+        return _response(200, self.blobs[path])
+
+    def _registry(self):
+        with patch.dict("sys.modules", docker=self.docker_mock), patch(
+            "data_pipelines_cli.docker_registry.requests.Session", lambda: self.session
+        ):
+            return DockerRegistry("registry.example.com/team/app")
+
+    def test_image_of_platform(self):
+        with patch(
+            "data_pipelines_cli.docker_registry.requests.get",
+            return_value=_response(200, {"token": "t0k"}),
+        ) as token_get_mock:
+            registry = self._registry()
+            self.assertEqual(
+                "sha256:config-arm",
+                registry.get_image_config_digest(
+                    "sha1234", image_platform({"Os": "linux", "Architecture": "arm64"})
+                ),
+            )
+            self.assertListEqual(
+                ["sha256:l1", "sha256:l2"],
+                registry.get_image_layers("sha1234", {"architecture": "arm64"}),
+            )
+
+        token_get_mock.assert_called_once_with(
+            "https://auth.example.com/token",
+            params={"service": "registry.example.com", "scope": "repository:team/app:pull"},
+            auth=("user", "secret"),
+            timeout=30,
+        )
+
+    def test_missing_image(self):
+        with patch(
+            "data_pipelines_cli.docker_registry.requests.get",
+            return_value=_response(200, {"token": "t0k"}),
+        ):
+            registry = self._registry()
+            self.assertIsNone(registry.get_image_config_digest("other", {}))
+            self.assertIsNone(registry.get_image_layers("other", {}))
+            self.assertIsNone(registry.get_image_config_digest("sha1234", {"os": "windows"}))
+
+    def test_denied(self):
+        with patch(
+            "data_pipelines_cli.docker_registry.requests.get",
+            return_value=_response(401, {"details": "incorrect username or password"}),
+        ), self.assertRaises(requests.HTTPError):
+            self._registry().get_image_config_digest("sha1234", {})
+
+    def test_docker_hub(self):
+        self.docker_mock.auth.resolve_repository_name.return_value = ("docker.io", "user/app")
+        self.assertEqual(DOCKER_HUB_REGISTRY, self._registry().registry)
+
+    def test_docker_not_installed(self):
+        with patch.dict("sys.modules", docker=None), self.assertRaises(DockerNotInstalledError):
+            DockerRegistry("registry.example.com/team/app")
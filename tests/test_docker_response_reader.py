@@ -1,6 +1,11 @@
+import io
 import unittest
 
-from data_pipelines_cli.docker_response_reader import DockerResponseReader
+from data_pipelines_cli.docker_response_reader import (
+    DockerBuildStageTimer,
+    DockerProgressAggregator,
+    DockerResponseReader,
+)
 from data_pipelines_cli.errors import DockerErrorResponseError
 
 
@@ -82,3 +87,112 @@ class DockerResponseReaderTestCase(unittest.TestCase):
         with self.assertRaises(DockerErrorResponseError):
             reader = DockerResponseReader(docker_response)
             reader.click_echo_ok_responses()
+
+    def test_responses_are_streamed(self):
+        consumed = []
+
+        def docker_response():
+            for i in range(3):
+                consumed.append(i)
+                yield f'{{"status":"line {i}"}}'
+
+        reader = DockerResponseReader(docker_response())
+        responses = reader.iter_ok_responses()
+        self.assertEqual("line 0", str(next(responses)))
+        self.assertListEqual([0], consumed)
+        self.assertListEqual(["line 1", "line 2"], list(map(str, responses)))
+        self.assertIsNone(reader.cached_read_response)
+
+    def test_error_raised_on_first_error_with_last_lines(self):
+        def docker_response():
+            for i in range(5):
+                yield f'{{"status":"line {i}"}}'
+            yield '{"error":"Something went wrong"}'
+            self.fail("Response should not be read after an error")
+
+        reader = DockerResponseReader(docker_response(), error_context_lines=2)
+        with self.assertRaises(DockerErrorResponseError) as err:
+            reader.click_echo_ok_responses()
+        self.assertIn("ERROR: Something went wrong", err.exception.message)
+        self.assertEqual("Last lines of Docker response:\nline 3\nline 4", err.exception.submessage)
+
+    def test_cache_response(self):
+        reader = DockerResponseReader(
+            iter(['{"status":"abc"}', '{"status":"def"}']), cache_response=True
+        )
+        self.assertListEqual(["abc", "def"], list(map(str, reader.iter_ok_responses())))
+        self.assertListEqual(["abc", "def"], list(map(str, reader.read_response())))
+
+
+class DockerProgressAggregatorTestCase(unittest.TestCase):
+    push_response = [
+        {"status": "The push refers to repository [docker.io/library/rep]"},
+        {"status": "Preparing", "progressDetail": {}, "id": "layer1"},
+        {"status": "Preparing", "progressDetail": {}, "id": "layer2"},
+        {"status": "Layer already exists", "progressDetail": {}, "id": "layer2"},
+        *[
+            {
+                "status": "Pushing",
+                "progressDetail": {"current": current, "total": 3000},
+                "id": "layer1",
+            }
+            for current in range(0, 3000, 100)
+        ],
+        {"status": "Pushed", "progressDetail": {}, "id": "layer1"},
+        {"status": "latest: digest: sha256:abcdef size: 1234"},
+    ]
+
+    def test_layers_collapsed(self):
+        output = io.StringIO()
+        progress = DockerProgressAggregator(output, is_tty=False)
+        reader = DockerResponseReader(self.push_response, progress=progress)
+
+        self.assertListEqual(
+            [
+                "The push refers to repository [docker.io/library/rep]",
+                "latest: digest: sha256:abcdef size: 1234",
+            ],
+            list(map(str, reader.iter_ok_responses())),
+        )
+        self.assertEqual("Pushed", progress.layers["layer1"].status)
+        self.assertEqual("Layer already exists", progress.layers["layer2"].status)
+        self.assertEqual(3000, progress.bytes_transferred())
+        self.assertEqual(1, len(output.getvalue().splitlines()))
+        self.assertIn("Layers: 2/2 done, 3.0 kB transferred in", output.getvalue())
+
+    def test_periodic_summary_when_not_tty(self):
+        output = io.StringIO()
+        progress = DockerProgressAggregator(output, is_tty=False, summary_interval=0)
+        list(DockerResponseReader(self.push_response, progress=progress).iter_ok_responses())
+
+        lines = output.getvalue().splitlines()
+        self.assertGreater(len(lines), 1)
+        self.assertTrue(all(line.startswith("Layers: ") for line in lines))
+
+    def test_lines_redrawn_on_tty(self):
+        output = io.StringIO()
+        progress = DockerProgressAggregator(output, is_tty=True, redraw_interval=0)
+        list(DockerResponseReader(self.push_response, progress=progress).iter_ok_responses())
+
+        self.assertIn("\x1b[2Klayer1: Pushed 3.0 kB / 3.0 kB\n", output.getvalue())
+        self.assertIn("\x1b[2F", output.getvalue())
+
+
+class DockerBuildStageTimerTestCase(unittest.TestCase):
+    def test_stages_timed(self):
+        clock_values = iter([1.0, 4.0, 4.0, 10.5])
+        timer = DockerBuildStageTimer(clock=lambda: next(clock_values))
+        for line in [
+            "Step 1/5 : FROM python:3.9 AS builder",
+            " ---> 1234abcd",
+            "Step 2/5 : RUN pip install dbt-core",
+            "Step 3/5 : FROM python:3.9-slim",
+            "Step 4/5 : COPY --from=builder /usr/local /usr/local",
+            "Successfully built 5678efgh",
+        ]:
+            timer.update(line)
+
+        self.assertListEqual(
+            [("builder", 3.0), ("1 (python:3.9-slim)", 6.5)],
+            timer.finish(),
+        )
@@ -1,7 +1,14 @@
+import hashlib
+import json
+import os
 import pathlib
 import random
+import shutil
 import string
+import tempfile
 import unittest
+import uuid
+from unittest.mock import patch
 
 import aiobotocore
 import aiobotocore.endpoint
@@ -9,9 +16,15 @@ import boto3
 import botocore
 import fsspec
 from botocore.awsrequest import AWSResponse
+from fsspec.implementations.memory import MemoryFileSystem
 from moto import mock_s3
 
 from data_pipelines_cli.errors import DataPipelinesError
+from data_pipelines_cli.filesystem_utils import (
+    SYNC_JOURNAL_FILE_NAME,
+    UPLOAD_KWARGS_KEY,
+    UploadSettings,
+)
 
 MY_BUCKET = "my_bucket"
 
@@ -171,3 +184,272 @@ class TestGoogleStorageSynchronize(TestSynchronize):
 
     def test_synchronize_with_delete(self):
         self._test_synchronize_with_delete("gs", endpoint_url="http://localhost:9023", token="anon")
+
+
+class TestSyncJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        tmp_path = pathlib.Path(self.tmp_dir.name)
+        self.local_path = tmp_path.joinpath("dag")
+        shutil.copytree(
+            pathlib.Path(__file__).parent.joinpath("goldens", "test_sync_directory"),
+            self.local_path,
+        )
+        self.remote_path = tmp_path.joinpath("remote")
+        self.journal_path = tmp_path.joinpath("build", SYNC_JOURNAL_FILE_NAME)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _sync(self, delete: bool = True):
+        from data_pipelines_cli.filesystem_utils import LocalRemoteSync
+
+        pushed_files = []
+        with patch(
+            "fsspec.implementations.local.LocalFileSystem.put_file",
+            autospec=True,
+            side_effect=lambda fs, lpath, rpath, **kw: (
+                pushed_files.append(rpath[len(str(self.remote_path)) + 1 :]),
+                fs.cp_file(lpath, rpath),
+            ),
+        ):
+            LocalRemoteSync(
+                self.local_path,
+                str(self.remote_path),
+                {"auto_mkdir": True},
+                journal_path=self.journal_path,
+            ).sync(delete=delete)
+        return sorted(pushed_files)
+
+    def test_resume_skips_sent_files(self):
+        all_files = sorted(
+            str(path.relative_to(self.local_path).as_posix())
+            for path in self.local_path.rglob("*")
+            if path.is_file()
+        )
+        self.assertListEqual(all_files, self._sync())
+        self.assertListEqual([], self._sync())
+
+        # Remote file changed by someone else gets sent again
+        self.remote_path.joinpath("test1.txt").write_text("changed remotely")
+        # So does a changed local file
+        self.local_path.joinpath("test2.txt").write_text("changed locally")
+        self.assertListEqual(["test1.txt", "test2.txt"], self._sync())
+
+    def test_cut_off_journal_line(self):
+        self._sync()
+        with open(self.journal_path, "a") as journal_file:
+            journal_file.write('{"remote": "file://')
+        self.assertListEqual([], self._sync())
+        for line in self.journal_path.read_text().splitlines():
+            json.loads(line)
+
+    def test_remote_listed_once_per_phase(self):
+        from data_pipelines_cli.filesystem_utils import LocalRemoteSync
+
+        self.remote_path.mkdir()
+        self.remote_path.joinpath("stale.txt").write_text("stale")
+        self._sync(delete=False)
+
+        sync = LocalRemoteSync(
+            self.local_path,
+            str(self.remote_path),
+            {"auto_mkdir": True},
+            journal_path=self.journal_path,
+        )
+        self.local_path.joinpath("test1.txt").write_text("changed content")
+        with patch.object(
+            sync.remote_fs, "find", wraps=sync.remote_fs.find
+        ) as find_mock, patch.object(
+            sync.remote_fs, "info", wraps=sync.remote_fs.info
+        ) as info_mock, patch.object(
+            sync.remote_fs, "put_file", side_effect=sync.remote_fs.cp_file
+        ):
+            sync.sync(delete=False)
+        # The listing made up front gets updated with details of the sent file only
+        self.assertEqual(1, find_mock.call_count)
+        self.assertListEqual(
+            [f"{self.remote_path}/test1.txt"],
+            [
+                call.args[0]
+                for call in info_mock.call_args_list
+                if str(call.args[0]).startswith(str(self.remote_path))
+            ],
+        )
+        self.assertSetEqual(sync._local_directory_suffixes | {"/stale.txt"}, set(sync.inventory))
+        self.assertEqual(15, sync.inventory["/test1.txt"]["size"])
+
+    def test_resume_before_listing(self):
+        self._sync()
+        # Recorded by earlier versions, before fingerprints got known
+        entries = [json.loads(line) for line in self.journal_path.read_text().splitlines()]
+        self.journal_path.write_text(
+            "".join(json.dumps({**entry, "etag": None}) + "\n" for entry in entries)
+        )
+        self.assertListEqual([], self._sync())
+
+    def test_no_delete_if_not_verified(self):
+        from data_pipelines_cli.filesystem_utils import LocalRemoteSync
+
+        self.remote_path.mkdir()
+        self.remote_path.joinpath("stale.txt").write_text("stale")
+        with patch.object(LocalRemoteSync, "_push_file", lambda *_args: True):
+            with self.assertRaises(DataPipelinesError):
+                self._sync()
+        self.assertTrue(self.remote_path.joinpath("stale.txt").exists())
+
+
+class _MultipartMemoryFileSystem(MemoryFileSystem):
+    """Memory filesystem recording parameters of uploads and reporting S3-like ETags."""
+
+    protocol = ("multipartmemory",)
+    put_file_kwargs = {}
+
+    @classmethod
+    def _strip_protocol(cls, path):
+        return super()._strip_protocol(path.replace("multipartmemory://", "memory://", 1))
+
+    def put_file(self, lpath, rpath, callback=None, chunksize=50 * 2**20, max_concurrency=None):
+        self.put_file_kwargs[rpath] = {"chunksize": chunksize, "max_concurrency": max_concurrency}
+        super().put_file(lpath, rpath)
+        data = self.cat_file(rpath)
+        parts = [data[i : i + chunksize] for i in range(0, len(data), chunksize)]
+        self.store[rpath].etag = (
+            hashlib.md5(b"".join(hashlib.md5(part).digest() for part in parts)).hexdigest()
+            + f"-{len(parts)}"
+        )
+
+    def _with_etag(self, entry):
+        if hasattr(self.store.get(entry["name"]), "etag"):
+            return {**entry, "ETag": f'"{self.store[entry["name"]].etag}"'}
+        return entry
+
+    def ls(self, path, detail=True, **kwargs):
+        entries = super().ls(path, detail=detail, **kwargs)
+        if not detail:
+            return entries
+        return [self._with_etag(entry) for entry in entries]
+
+    def info(self, path, **kwargs):
+        return self._with_etag(super().info(path, **kwargs))
+
+
+fsspec.register_implementation("multipartmemory", _MultipartMemoryFileSystem, clobber=True)
+
+
+class TestLargeFileUpload(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.local_path = pathlib.Path(self.tmp_dir.name)
+        self.local_path.joinpath("small.txt").write_bytes(b"small")
+        self.local_path.joinpath("manifest.json").write_bytes(os.urandom(300_000))
+        self.remote_path = f"multipartmemory://upload-tests/{uuid.uuid4().hex}"
+        self.remote_fs, self.remote_path_str = fsspec.core.url_to_fs(self.remote_path)
+        self.upload_kwargs = {
+            "multipart_threshold": 100_000,
+            "part_size": 64_000,
+            "max_concurrency": 4,
+            "part_checksums": True,
+        }
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+        if self.remote_fs.exists(self.remote_path_str):
+            self.remote_fs.rm(self.remote_path_str, recursive=True)
+
+    def _sync(self):
+        from data_pipelines_cli.filesystem_utils import LocalRemoteSync
+
+        sync = LocalRemoteSync(
+            self.local_path, self.remote_path, {UPLOAD_KWARGS_KEY: self.upload_kwargs}
+        )
+        sync.sync(delete=True)
+        return sync
+
+    def test_part_size(self):
+        self.assertEqual(8 * 2**20, UploadSettings().part_size_for(10 * 2**20))
+        self.assertEqual(32 * 2**20, UploadSettings().part_size_for(1024 * 2**20))
+        self.assertEqual(512 * 2**20, UploadSettings().part_size_for(50 * 2**30))
+        self.assertEqual(2**20, UploadSettings(part_size=2**20).part_size_for(2**30))
+        # No more than 10000 parts, whatever the part size
+        self.assertEqual(2**20, UploadSettings(part_size=1024).part_size_for(10_000 * 2**20))
+
+    def test_large_file_uploaded_in_parts(self):
+        self._sync()
+
+        put_file_kwargs = _MultipartMemoryFileSystem.put_file_kwargs
+        self.assertDictEqual(
+            {"chunksize": 64_000, "max_concurrency": 4},
+            put_file_kwargs[f"{self.remote_path_str}/manifest.json"],
+        )
+        self.assertDictEqual(
+            {"chunksize": 50 * 2**20, "max_concurrency": None},
+            put_file_kwargs[f"{self.remote_path_str}/small.txt"],
+        )
+
+    def test_unchanged_files_skipped_by_checksum(self):
+        self._sync()
+        self.local_path.joinpath("small.txt").write_bytes(b"large")
+
+        with patch.object(
+            _MultipartMemoryFileSystem, "put_file", autospec=True
+        ) as put_file_mock, patch(
+            "data_pipelines_cli.filesystem_utils.echo_info"
+        ) as echo_info_mock:
+            put_file_mock.side_effect = lambda fs, lpath, rpath, **kwargs: fs.pipe_file(
+                rpath, pathlib.Path(lpath).read_bytes()
+            )
+            sync = self._sync()
+        # Same size, different checksum
+        self.assertListEqual(
+            [f"{self.remote_path_str}/small.txt"],
+            [call.args[2] for call in put_file_mock.call_args_list],
+        )
+        echo_info_mock.assert_any_call("Skipped 1 files already present in the remote directory")
+        self.assertIsNone(sync.inventory["/small.txt"]["checksum"])
+
+    def test_part_checksum_mismatch(self):
+        put_file = _MultipartMemoryFileSystem.put_file
+
+        def _put_corrupted_file(fs, lpath, rpath, **kwargs):
+            put_file(fs, lpath, rpath, **kwargs)
+            fs.store[rpath].etag = "0123-5"
+
+        self.remote_fs.pipe_file(f"{self.remote_path_str}/stale.txt", b"stale")
+        with patch.object(_MultipartMemoryFileSystem, "put_file", _put_corrupted_file):
+            with self.assertRaises(DataPipelinesError):
+                self._sync()
+        self.assertTrue(self.remote_fs.exists(f"{self.remote_path_str}/stale.txt"))
+
+    def test_wrong_upload_settings(self):
+        self.upload_kwargs["part_count"] = 5
+        with self.assertRaises(DataPipelinesError):
+            self._sync()
+
+
+class TestEstimateUploadDuration(unittest.TestCase):
+    def test_estimate(self):
+        from data_pipelines_cli.filesystem_utils import estimate_upload_duration
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            history_path = pathlib.Path(tmp_dir).joinpath("throughput.json")
+            self.assertIsNone(estimate_upload_duration(history_path, 10, 1000, 0))
+
+            history_path.write_text(
+                json.dumps(
+                    [
+                        {
+                            "files": {"files": 100, "bytes": 10_000, "seconds": 5},
+                            "large_files": {"files": 0, "bytes": 0, "seconds": 0},
+                        },
+                        {
+                            "files": {"files": 100, "bytes": 10_000, "seconds": 5},
+                            "large_files": {"files": 1, "bytes": 100_000_000, "seconds": 10},
+                        },
+                    ]
+                )
+            )
+            # 20 files per second, 10 MB per second for large files
+            self.assertAlmostEqual(
+                2 + 5, estimate_upload_duration(history_path, 40, 4000, 50_000_000)
+            )
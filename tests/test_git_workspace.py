@@ -0,0 +1,92 @@
+import pathlib
+import subprocess
+import tempfile
+import unittest
+
+from data_pipelines_cli.git_workspace import GitWorkspace, stage_all_changes
+
+
+class GitWorkspaceTestCase(unittest.TestCase):
+    def _git(self, *args: str, cwd: pathlib.Path) -> str:
+        return subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=cwd,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+
+    def _commit_file(self, file: str, content: str) -> None:
+        file_path = self.source_path.joinpath(file)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+        self._git("add", "-A", cwd=self.source_path)
+        self._git("commit", "-qm", f"Update {file}", cwd=self.source_path)
+        self._git("push", "-q", str(self.remote_path), "main", cwd=self.source_path)
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        tmp_path = pathlib.Path(self.tmp_dir.name)
+        self.source_path = tmp_path.joinpath("source")
+        self.remote_path = tmp_path.joinpath("remote.git")
+        self.workspace_path = tmp_path.joinpath("workspace")
+
+        self._git("init", "-q", "--bare", str(self.remote_path), cwd=tmp_path)
+        self._git("init", "-q", "-b", "main", str(self.source_path), cwd=tmp_path)
+        self._commit_file("readme.txt", "readme")
+        self._commit_file("project/sources.yml", "v1")
+        self._commit_file("other_project/sources.yml", "other")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _workspace(self) -> GitWorkspace:
+        return GitWorkspace(
+            self.workspace_path, self.remote_path.as_uri(), "main", sparse_paths=["project"]
+        )
+
+    def test_shallow_sparse_checkout(self):
+        repo = self._workspace().sync()
+
+        self.assertEqual("1", repo.git.rev_list("--count", "HEAD"))
+        self.assertEqual("v1", self.workspace_path.joinpath("project", "sources.yml").read_text())
+        self.assertTrue(self.workspace_path.joinpath("readme.txt").exists())
+        self.assertFalse(self.workspace_path.joinpath("other_project").exists())
+        self.assertEqual("origin/main", str(repo.active_branch.tracking_branch()))
+
+    def test_sync_resets_existing_workspace(self):
+        self._workspace().sync()
+        git_dir_inode = self.workspace_path.joinpath(".git").stat().st_ino
+        self.workspace_path.joinpath("project", "sources.yml").write_text("local change")
+        self.workspace_path.joinpath("project", "leftover.yml").write_text("leftover")
+        self._commit_file("project/sources.yml", "v2")
+
+        self._workspace().sync()
+
+        self.assertEqual(git_dir_inode, self.workspace_path.joinpath(".git").stat().st_ino)
+        self.assertEqual("v2", self.workspace_path.joinpath("project", "sources.yml").read_text())
+        self.assertFalse(self.workspace_path.joinpath("project", "leftover.yml").exists())
+
+    def test_non_repository_directory_replaced(self):
+        self.workspace_path.mkdir()
+        self.workspace_path.joinpath("stale.txt").write_text("stale")
+
+        self._workspace().sync()
+
+        self.assertFalse(self.workspace_path.joinpath("stale.txt").exists())
+        self.assertTrue(self.workspace_path.joinpath("project", "sources.yml").exists())
+
+    def test_stage_all_changes(self):
+        repo = self._workspace().sync()
+        self.assertListEqual([], stage_all_changes(repo))
+
+        self.workspace_path.joinpath("project", "sources.yml").write_text("v1")
+        self.assertListEqual([], stage_all_changes(repo))
+
+        self.workspace_path.joinpath("project", "sources.yml").write_text("v2")
+        self.workspace_path.joinpath("project", "new.yml").write_text("new")
+        self.workspace_path.joinpath("readme.txt").unlink()
+        self.assertListEqual(
+            [("A", "project/new.yml"), ("M", "project/sources.yml"), ("D", "readme.txt")],
+            stage_all_changes(repo),
+        )
@@ -1,11 +1,20 @@
+import os
 import pathlib
+import re
 import subprocess
 import tempfile
 import unittest
 from io import StringIO
 from unittest.mock import MagicMock, patch
 
-from data_pipelines_cli.io_utils import git_revision_hash, replace
+from data_pipelines_cli.io_utils import (
+    _git_revision_hash,
+    git_ancestor_revision_hashes,
+    git_revision_hash,
+    replace,
+    replace_many,
+    write_if_changed,
+)
 
 
 class TestReplace(unittest.TestCase):
@@ -27,18 +36,180 @@ class TestReplace(unittest.TestCase):
                 output = tmp_file.readlines()
                 self.assertEqual(self.expected_result, "".join(output))
 
+    def test_replace_literal(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = pathlib.Path(tmp_dir).joinpath("test")
+            with open(filename, "w") as tmp_file:
+                tmp_file.write(self.text_to_replace)
+            self.assertTrue(replace(filename, self.pattern_to_replace, self.replacement, True))
+            with open(filename, "r") as tmp_file:
+                self.assertEqual(self.expected_result, tmp_file.read())
+            self.assertListEqual(["test"], os.listdir(tmp_dir))
+
+    def test_no_match_does_not_rewrite(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = pathlib.Path(tmp_dir).joinpath("test")
+            with open(filename, "w") as tmp_file:
+                tmp_file.write(self.text_to_replace)
+            os.utime(filename, ns=(0, 0))
+
+            self.assertFalse(replace(filename, "<NOT_THERE>", self.replacement, True))
+            self.assertFalse(replace(filename, r"<NOT_\w+>", self.replacement))
+            self.assertEqual(0, os.stat(filename).st_mtime_ns)
+
+    def test_replace_many(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filenames = [pathlib.Path(tmp_dir).joinpath(name) for name in ("a", "b", "c")]
+            for filename, content in zip(filenames, ["<A> and <B>\n", "<B>\n<B>", "nothing"]):
+                with open(filename, "w") as tmp_file:
+                    tmp_file.write(content)
+
+            modified = replace_many(filenames, {"<A>": "1", "<B>": "2"}, literal=True)
+
+            self.assertListEqual(filenames[:2], modified)
+            self.assertListEqual(
+                ["1 and 2\n", "2\n2", "nothing"],
+                [filename.read_text() for filename in filenames],
+            )
+
+    def test_replacements_not_chained(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = pathlib.Path(tmp_dir).joinpath("a")
+            filename.write_text("<A> <B> <AB>\n")
+
+            replace_many([filename], {"<A>": "<B>", "<B>": "x", "<AB>": "y"}, literal=True)
+            self.assertEqual("<B> x y\n", filename.read_text())
+
+            filename.write_text("a1 b2\n")
+            replace_many([filename], {r"a(\d)": r"b\1", r"b(\d)": r"<\1>"})
+            self.assertEqual("b1 <2>\n", filename.read_text())
+
+    def test_replace_non_ascii(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = pathlib.Path(tmp_dir).joinpath("a")
+            filename.write_text("name: zażółć\n", encoding="utf-8")
+
+            with patch("locale.getpreferredencoding", lambda _do_setlocale=True: "utf-8"):
+                self.assertTrue(replace(filename, r"^name: \w+$", "name: x"))
+                self.assertTrue(replace(filename, "x", "ł", literal=True))
+            self.assertEqual("name: ł\n", filename.read_text(encoding="utf-8"))
+
+    def test_temporary_file_removed_on_error(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = pathlib.Path(tmp_dir).joinpath("a")
+            filename.write_text("<A>\n")
+
+            with patch(
+                "data_pipelines_cli.io_utils.shutil.copystat", side_effect=OSError("denied")
+            ), self.assertRaises(OSError):
+                replace(filename, "<A>", "1", literal=True)
+            with self.assertRaises(re.error):
+                replace(filename, "<A>", r"\9")
+            self.assertListEqual(["a"], os.listdir(tmp_dir))
+            self.assertEqual("<A>\n", filename.read_text())
+
+
+class TestWriteIfChanged(unittest.TestCase):
+    def test_write_if_changed(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = pathlib.Path(tmp_dir).joinpath("test.yml")
+
+            self.assertTrue(write_if_changed(filename, "a: 1\n"))
+            os.utime(filename, ns=(0, 0))
+            self.assertFalse(write_if_changed(filename, "a: 1\n"))
+            self.assertEqual(0, os.stat(filename).st_mtime_ns)
+
+            self.assertTrue(write_if_changed(filename, "a: 2\n"))
+            self.assertEqual("a: 2\n", filename.read_text())
+            self.assertListEqual(["test.yml"], os.listdir(tmp_dir))
+
 
 class TestGitRevisionHash(unittest.TestCase):
+    git_sha = "0123456789abcdef0123456789abcdef01234567"
+
+    def setUp(self) -> None:
+        _git_revision_hash.cache_clear()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.repo_path = pathlib.Path(self.tmp_dir.name)
+        self.old_cwd = os.getcwd()
+        os.chdir(self.repo_path)
+
+    def tearDown(self) -> None:
+        os.chdir(self.old_cwd)
+        self.tmp_dir.cleanup()
+        _git_revision_hash.cache_clear()
+
+    def _write(self, path: pathlib.Path, content: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
     @patch("data_pipelines_cli.io_utils.subprocess.run")
-    def test_git_revision_hash(self, mock_run):
+    def test_read_loose_ref(self, mock_run):
+        self._write(self.repo_path.joinpath(".git", "HEAD"), "ref: refs/heads/main\n")
+        self._write(self.repo_path.joinpath(".git", "refs", "heads", "main"), self.git_sha + "\n")
+        os.chdir(self.repo_path.joinpath(".git", "refs"))
+
+        self.assertEqual(self.git_sha, git_revision_hash())
+        mock_run.assert_not_called()
+
+    @patch("data_pipelines_cli.io_utils.subprocess.run")
+    def test_read_packed_ref(self, mock_run):
+        self._write(self.repo_path.joinpath(".git", "HEAD"), "ref: refs/heads/main\n")
+        self._write(
+            self.repo_path.joinpath(".git", "packed-refs"),
+            "# pack-refs with: peeled fully-peeled sorted\n"
+            f"{'f' * 40} refs/heads/other\n"
+            f"{self.git_sha} refs/heads/main\n"
+            f"^{'e' * 40}\n",
+        )
+
+        self.assertEqual(self.git_sha, git_revision_hash())
+        mock_run.assert_not_called()
+
+    @patch("data_pipelines_cli.io_utils.subprocess.run")
+    def test_read_detached_head_in_worktree(self, mock_run):
+        main_git_dir = self.repo_path.joinpath("main", ".git")
+        worktree_git_dir = main_git_dir.joinpath("worktrees", "wt")
+        self._write(worktree_git_dir.joinpath("HEAD"), self.git_sha + "\n")
+        self._write(worktree_git_dir.joinpath("commondir"), "../..\n")
+        self._write(self.repo_path.joinpath("wt", ".git"), f"gitdir: {worktree_git_dir}\n")
+        os.chdir(self.repo_path.joinpath("wt"))
+
+        self.assertEqual(self.git_sha, git_revision_hash())
+        mock_run.assert_not_called()
+
+    @patch("data_pipelines_cli.io_utils.subprocess.run")
+    def test_read_branch_in_worktree(self, mock_run):
+        main_git_dir = self.repo_path.joinpath("main", ".git")
+        worktree_git_dir = main_git_dir.joinpath("worktrees", "wt")
+        self._write(worktree_git_dir.joinpath("HEAD"), "ref: refs/heads/feature\n")
+        self._write(worktree_git_dir.joinpath("commondir"), "../..\n")
+        self._write(main_git_dir.joinpath("refs", "heads", "feature"), self.git_sha + "\n")
+        self._write(self.repo_path.joinpath("wt", ".git"), f"gitdir: {worktree_git_dir}\n")
+        os.chdir(self.repo_path.joinpath("wt"))
+
+        self.assertEqual(self.git_sha, git_revision_hash())
+        mock_run.assert_not_called()
+
+    @patch("data_pipelines_cli.io_utils.subprocess.run")
+    def test_git_revision_hash_memoized(self, mock_run):
+        self._write(self.repo_path.joinpath(".git", "HEAD"), self.git_sha + "\n")
+        self.assertEqual(self.git_sha, git_revision_hash())
+        self._write(self.repo_path.joinpath(".git", "HEAD"), "f" * 40 + "\n")
+        self.assertEqual(self.git_sha, git_revision_hash())
+
+    @patch("data_pipelines_cli.io_utils.subprocess.run")
+    def test_git_revision_hash_fallback(self, mock_run):
         git_sha = "abcdef1337"
 
         mock_stdout = MagicMock()
         mock_stdout.configure_mock(**{"stdout.decode.return_value": git_sha})
         mock_run.return_value = mock_stdout
 
+        self._write(self.repo_path.joinpath(".git", "HEAD"), "ref: refs/heads/unborn\n")
         result = git_revision_hash()
         self.assertEqual(git_sha, result)
+        mock_run.assert_called_once()
 
     @patch("data_pipelines_cli.io_utils.subprocess.run")
     def test_git_does_not_exist(self, mock_run):
@@ -55,3 +226,19 @@ class TestGitRevisionHash(unittest.TestCase):
             result = git_revision_hash()
             self.assertEqual(None, result)
             self.assertIn(test_error, fake_out.getvalue())
+
+
+class TestGitAncestorRevisionHashes(unittest.TestCase):
+    @patch("data_pipelines_cli.io_utils.subprocess.run")
+    def test_ancestor_hashes(self, mock_run):
+        mock_run.return_value = MagicMock(stdout=b"bbb\nccc\n")
+        self.assertListEqual(["bbb", "ccc"], git_ancestor_revision_hashes(2))
+        self.assertIn("--max-count=2", mock_run.call_args.args[0])
+
+    @patch("data_pipelines_cli.io_utils.subprocess.run")
+    def test_no_ancestors(self, mock_run):
+        self.assertListEqual([], git_ancestor_revision_hashes(0))
+        mock_run.assert_not_called()
+
+        mock_run.side_effect = subprocess.CalledProcessError(128, cmd="")
+        self.assertListEqual([], git_ancestor_revision_hashes(3))
@@ -0,0 +1,109 @@
+import unittest
+from unittest.mock import patch
+
+from jinja2.nativetypes import NativeEnvironment
+
+from data_pipelines_cli.errors import JinjaVarKeyError
+from data_pipelines_cli.jinja import (
+    render_build_time_values,
+    render_templated_tree,
+    replace_vars_with_values,
+)
+
+
+class ReplaceVarsWithValuesTestCase(unittest.TestCase):
+    dbt_vars = {"var1": "value1", "var2": 42}
+
+    def test_nested_dicts_and_lists(self):
+        templated = {
+            "source": {
+                "type": "dbt",
+                "config": {
+                    "tables": ["{{ var('var1') }}_a", "plain", {"id": "{{ var('var2') }}"}],
+                    "port": 8080,
+                    "enabled": True,
+                },
+            },
+            "sink": [["{{ env_var('SOME_ENV') }}"]],
+        }
+        with patch.dict("os.environ", SOME_ENV="some_env_value"):
+            result = replace_vars_with_values(templated, self.dbt_vars)
+
+        self.assertDictEqual(
+            {
+                "source": {
+                    "type": "dbt",
+                    "config": {
+                        "tables": ["value1_a", "plain", {"id": 42}],
+                        "port": 8080,
+                        "enabled": True,
+                    },
+                },
+                "sink": [["some_env_value"]],
+            },
+            result,
+        )
+        self.assertEqual("{{ var('var1') }}_a", templated["source"]["config"]["tables"][0])
+
+    def test_plain_strings_converted_to_native_types(self):
+        plain_values = {
+            "a": "123",
+            "b": "True",
+            "c": "[1, 'x']",
+            "d": "some text",
+            "e": "",
+            "f": "line\n",
+            "g": "  4",
+        }
+        result = replace_vars_with_values(plain_values, self.dbt_vars)
+        # The same values as if the strings got rendered as templates
+        jinja_env = NativeEnvironment()
+        self.assertDictEqual(
+            {key: jinja_env.from_string(value).render() for key, value in plain_values.items()},
+            result,
+        )
+        self.assertDictEqual(
+            {
+                "a": 123,
+                "b": True,
+                "c": [1, "x"],
+                "d": "some text",
+                "e": None,
+                "f": "line",
+                "g": "  4",
+            },
+            result,
+        )
+
+    def test_templated_paths(self):
+        templated_paths = {}
+        tree = {"a": {"b": ["x", "{{ var('var1') }}"]}, "c": "{{ var('var2') }}", "d": 1}
+        rendered = render_templated_tree(tree, self.dbt_vars, templated_paths)
+
+        self.assertIs(tree, rendered)
+        self.assertDictEqual({"a": {"b": ["x", "value1"]}, "c": 42, "d": 1}, rendered)
+        self.assertSetEqual({"a.b[1]", "c"}, set(templated_paths.keys()))
+
+    def test_scalar_root(self):
+        self.assertEqual("value1", render_templated_tree("{{ var('var1') }}", self.dbt_vars))
+
+    def test_missing_var(self):
+        with self.assertRaises(JinjaVarKeyError):
+            replace_vars_with_values({"a": ["{{ var('missing') }}"]}, self.dbt_vars)
+
+    def test_build_time_values(self):
+        tree = {
+            "a": "{{ var('var2') }}",
+            "b": ["{{ ds }}", "{{ var.value.x }}", "{{ var('missing') }}"],
+            "c": "{{ env_var('HOME') }}",
+            "d": "123",
+        }
+        self.assertDictEqual(
+            {
+                "a": 42,
+                "b": ["{{ ds }}", "{{ var.value.x }}", "{{ var('missing') }}"],
+                "c": "{{ env_var('HOME') }}",
+                "d": "123",
+            },
+            render_build_time_values(tree, self.dbt_vars),
+        )
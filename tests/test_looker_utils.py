@@ -1,3 +1,4 @@
+import json
 import os
 import pathlib
 import shutil
@@ -7,7 +8,10 @@ from os import PathLike
 from typing import Any
 from unittest.mock import MagicMock, patch
 
+from data_pipelines_cli.io_utils import write_if_changed
 from data_pipelines_cli.looker_utils import (
+    LOOKML_CACHE_FILE_NAME,
+    LOOKML_CACHE_VERSION,
     _clear_repo_before_writing_lookml,
     _deploy_looker_project_to_production,
     deploy_lookML_model,
@@ -18,7 +22,6 @@ goldens_dir_path = pathlib.Path(__file__).parent.joinpath("goldens")
 
 
 class LookerUtilsTestCase(unittest.TestCase):
-
     dbt_project = {
         "config-version": 2,
         "name": "my_test_project_1338_sources",
@@ -27,6 +30,7 @@ class LookerUtilsTestCase(unittest.TestCase):
     }
 
     def setUp(self) -> None:
+        self.staged_changes = "A\tmodel1.dp.model.lkml"
         self.build_temp_dir = pathlib.Path(tempfile.mkdtemp())
         dags_path = pathlib.Path(self.build_temp_dir).joinpath("dag")
         dags_path.mkdir(parents=True)
@@ -41,18 +45,18 @@ class LookerUtilsTestCase(unittest.TestCase):
         self.origin.push = MagicMock()
         return self.origin
 
-    def mock_clone_from(self, url: PathLike, to_path: PathLike, **kwargs: Any):
+    def mock_workspace(self, path: PathLike, url: str, branch: str, key_path: str, **kwargs: Any):
         self.assertEqual("https://gitlab.com/getindata/dataops/some_looker_repo.git", url)
-        self.assertEqual("master", kwargs["branch"])
+        self.assertEqual("master", branch)
+        self.assertListEqual(["views"], kwargs["sparse_paths"])
 
         def noop():
             pass
 
         repo_mock = MagicMock()
         self.git = MagicMock()
-        self.index = MagicMock()
-        self.index.commit = MagicMock()
         self.git.add = MagicMock()
+        self.git.diff = MagicMock(return_value=self.staged_changes)
         config_writer_mock = MagicMock()
         set_value_mock = MagicMock()
         set_value_mock.configure_mock(**{"release": noop})
@@ -61,22 +65,16 @@ class LookerUtilsTestCase(unittest.TestCase):
             **{
                 "config_writer": config_writer_mock,
                 "git": self.git,
-                "index": self.index,
                 "remote": self.mock_origin,
             }
         )
-        return repo_mock
-
-    def repo_class_mock(self):
-        self.repo_mock_class = MagicMock()
-        self.repo_mock_class.configure_mock(**{"clone_from": self.mock_clone_from})
-        return self.repo_mock_class
+        return MagicMock(sync=lambda: repo_mock, git_env={})
 
     @patch("pathlib.Path.cwd", lambda: goldens_dir_path)
     def test_bi_deploy_looker(self):
         os.mkdir(self.build_temp_dir.joinpath("looker_project_repo"))
         with patch("data_pipelines_cli.looker_utils.BUILD_DIR", self.build_temp_dir), patch(
-            "data_pipelines_cli.looker_utils.Repo", self.repo_class_mock()
+            "data_pipelines_cli.looker_utils.GitWorkspace", self.mock_workspace
         ), patch("data_pipelines_cli.looker_utils._deploy_looker_project_to_production"), patch(
             "data_pipelines_cli.looker_utils.LOOKML_DEST_PATH",
             self.build_temp_dir.joinpath("lookml"),
@@ -101,16 +99,27 @@ class LookerUtilsTestCase(unittest.TestCase):
             os.path.exists(self.build_temp_dir.joinpath("looker_project_repo", "readme.txt"))
         )
 
-    def test_bi_compile_looker(self):
-        subprocess_run_mock = MagicMock()
-        with patch("data_pipelines_cli.looker_utils.subprocess_run", subprocess_run_mock), patch(
-            "data_pipelines_cli.looker_utils.LOOKML_DEST_PATH", "/path/for/lookml"
+    @patch("pathlib.Path.cwd", lambda: goldens_dir_path)
+    def test_bi_deploy_looker_unchanged(self):
+        self.staged_changes = ""
+        os.mkdir(self.build_temp_dir.joinpath("looker_project_repo"))
+        deploy_mock = MagicMock()
+        with patch("data_pipelines_cli.looker_utils.BUILD_DIR", self.build_temp_dir), patch(
+            "data_pipelines_cli.looker_utils.GitWorkspace", self.mock_workspace
+        ), patch(
+            "data_pipelines_cli.looker_utils._deploy_looker_project_to_production", deploy_mock
+        ), patch(
+            "data_pipelines_cli.looker_utils.LOOKML_DEST_PATH",
+            self.build_temp_dir.joinpath("lookml"),
+        ), patch(
+            "data_pipelines_cli.looker_utils.generate_profiles_yml"
+        ), patch(
+            "data_pipelines_cli.looker_utils.run_dbt_command"
         ):
-            generate_lookML_model()
+            deploy_lookML_model("/path/to/key", "env")
 
-        subprocess_run_mock.assert_called_once_with(
-            ["dbt2looker", "--output-dir", "/path/for/lookml"]
-        )
+        self.git.commit.assert_not_called()
+        deploy_mock.assert_not_called()
 
     def test_bi_deploy_looker_project_to_production(self):
         looker_instance_url = "getindata.looker.com"
@@ -139,3 +148,113 @@ class LookerUtilsTestCase(unittest.TestCase):
 
         _clear_repo_before_writing_lookml(local_repo_dir)
         self.assertFalse(os.path.isfile(f"{local_repo_dir}/test.dp.model.lkml"))
+
+
+class GenerateLookMLTestCase(unittest.TestCase):
+    generation_goldens_path = goldens_dir_path.joinpath("lookml_generation")
+
+    def setUp(self) -> None:
+        self.project_dir = pathlib.Path(tempfile.mkdtemp())
+        shutil.copytree(
+            self.generation_goldens_path.joinpath("target"), self.project_dir.joinpath("target")
+        )
+        shutil.copy(
+            self.generation_goldens_path.joinpath("dbt_project.yml"),
+            self.project_dir.joinpath("dbt_project.yml"),
+        )
+        self.lookml_dir = self.project_dir.joinpath("build", "lookml")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.project_dir)
+
+    def _generate(self, max_workers=None):
+        with patch("pathlib.Path.cwd", lambda: self.project_dir), patch(
+            "data_pipelines_cli.looker_utils.LOOKML_DEST_PATH", self.lookml_dir
+        ), patch("data_pipelines_cli.looker_utils.write_if_changed", wraps=write_if_changed) as (
+            write_mock
+        ):
+            generate_lookML_model(max_workers)
+        return sorted(
+            str(pathlib.Path(call.args[0]).relative_to(self.lookml_dir))
+            for call in write_mock.call_args_list
+        )
+
+    def _update_manifest(self, update):
+        manifest_path = self.project_dir.joinpath("target", "manifest.json")
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        update(manifest["nodes"])
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+
+    def _lookml_files(self):
+        return sorted(
+            str(path.relative_to(self.lookml_dir)) for path in self.lookml_dir.glob("**/*.lkml")
+        )
+
+    def test_generated_lookml_matches_goldens(self):
+        for max_workers in (1, 4):
+            with self.subTest(max_workers=max_workers):
+                shutil.rmtree(self.lookml_dir, ignore_errors=True)
+                self._generate(max_workers)
+
+                expected_path = self.generation_goldens_path.joinpath("expected")
+                expected_files = sorted(
+                    str(path.relative_to(expected_path)) for path in expected_path.glob("**/*.lkml")
+                )
+                self.assertListEqual(expected_files, self._lookml_files())
+                for file in expected_files:
+                    self.assertEqual(
+                        expected_path.joinpath(file).read_text(),
+                        self.lookml_dir.joinpath(file).read_text(),
+                        msg=file,
+                    )
+
+    def test_only_changed_models_regenerated(self):
+        self._generate()
+        self.assertListEqual([], self._generate())
+
+        def _change_orders(nodes):
+            nodes["model.shop.orders"]["description"] = "Changed description"
+
+        self._update_manifest(_change_orders)
+        self.assertListEqual(
+            [LOOKML_CACHE_FILE_NAME, "orders.model.lkml", "views/orders.view.lkml"],
+            self._generate(),
+        )
+        self.assertIn(
+            "Changed description", self.lookml_dir.joinpath("orders.model.lkml").read_text()
+        )
+
+    def test_generation_settings_change_regenerates_all(self):
+        self._generate()
+        all_files = [LOOKML_CACHE_FILE_NAME] + self._lookml_files()
+
+        dbt_project_path = self.project_dir.joinpath("dbt_project.yml")
+        dbt_project_path.write_text(dbt_project_path.read_text().replace("shop", "renamed_shop"))
+        self.assertListEqual(all_files, self._generate())
+        self.assertIn(
+            'connection: "renamed_shop"',
+            self.lookml_dir.joinpath("orders.model.lkml").read_text(),
+        )
+
+        with patch(
+            "data_pipelines_cli.looker_utils.LOOKML_CACHE_VERSION", LOOKML_CACHE_VERSION + 1
+        ):
+            self.assertListEqual(all_files, self._generate())
+
+    def test_removed_model_files_deleted(self):
+        self._generate()
+        self._update_manifest(lambda nodes: nodes.pop("model.shop.customers"))
+        self._generate()
+
+        self.assertListEqual(["orders.model.lkml", "views/orders.view.lkml"], self._lookml_files())
+
+    def test_modified_file_regenerated(self):
+        self._generate()
+        view_path = self.lookml_dir.joinpath("views", "customers.view.lkml")
+        expected_view = view_path.read_text()
+        view_path.write_text("modified")
+
+        self._generate()
+        self.assertEqual(expected_view, view_path.read_text())
@@ -0,0 +1,354 @@
+import json
+import pathlib
+import tempfile
+import time
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+from data_pipelines_cli.errors import DataPipelinesError, DependencyNotInstalledError
+from data_pipelines_cli.manifest_utils import (
+    SLIM_MANIFEST_FILE_NAMES,
+    build_slim_manifest,
+    iter_manifest_nodes,
+    read_manifest_metadata,
+    read_slim_manifest,
+    write_slim_manifest,
+)
+
+goldens_dir_path = pathlib.Path(__file__).parent.joinpath("goldens")
+
+
+class IterManifestNodesTestCase(unittest.TestCase):
+    manifest = {
+        "metadata": {"dbt_version": "1.7.3", "env": {"KEY": 'tricky "}] value'}},
+        "nodes": {
+            "model.project.first": {
+                "resource_type": "model",
+                "name": "first",
+                "raw_code": "select '{[\\\"' as x",
+                "rows": 12345678901234567890,
+            },
+            "test.project.some_test": {"resource_type": "test", "name": "some_test"},
+            "model.project.second": {"resource_type": "model", "name": "second", "tags": []},
+        },
+        "sources": {"source.project.s": {"name": "s"}},
+    }
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.manifest_path = pathlib.Path(self.tmp_dir.name).joinpath("manifest.json")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_models_streamed(self):
+        for indent in (None, 2):
+            with open(self.manifest_path, "w") as f:
+                json.dump(self.manifest, f, indent=indent)
+            for chunk_size in (1, 3, 16, 1 << 20):
+                with self.subTest(indent=indent, chunk_size=chunk_size):
+                    self.assertListEqual(
+                        [
+                            ("model.project.first", self.manifest["nodes"]["model.project.first"]),
+                            (
+                                "model.project.second",
+                                self.manifest["nodes"]["model.project.second"],
+                            ),
+                        ],
+                        list(iter_manifest_nodes(self.manifest_path, chunk_size=chunk_size)),
+                    )
+
+    def test_all_nodes_with_selected_fields(self):
+        with open(self.manifest_path, "w") as f:
+            json.dump(self.manifest, f)
+        self.assertListEqual(
+            [
+                ("model.project.first", {"name": "first"}),
+                ("test.project.some_test", {"name": "some_test"}),
+                ("model.project.second", {"name": "second", "tags": []}),
+            ],
+            list(iter_manifest_nodes(self.manifest_path, None, ["name", "tags"])),
+        )
+
+    def test_golden_manifest(self):
+        manifest_path = goldens_dir_path.joinpath("target", "manifest.json")
+        with open(manifest_path, "r") as f:
+            expected = [
+                (unique_id, node)
+                for unique_id, node in json.load(f)["nodes"].items()
+                if node["resource_type"] == "model"
+            ]
+        self.assertListEqual(expected, list(iter_manifest_nodes(manifest_path, chunk_size=100)))
+
+    def test_golden_manifest_chunk_sizes(self):
+        manifest_path = goldens_dir_path.joinpath("target", "manifest.json")
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        # Chunks end anywhere, e.g. in the middle of numbers like ``1692200505.722525``
+        for chunk_size in list(range(1, 65)) + [100, 1000]:
+            with self.subTest(chunk_size=chunk_size):
+                self.assertDictEqual(
+                    manifest["nodes"],
+                    dict(iter_manifest_nodes(manifest_path, None, None, chunk_size)),
+                )
+                # Selected fields get decoded one by one
+                self.assertDictEqual(
+                    {
+                        unique_id: {"name": node["name"], "created_at": node["created_at"]}
+                        for unique_id, node in manifest["nodes"].items()
+                    },
+                    dict(
+                        iter_manifest_nodes(manifest_path, None, ["name", "created_at"], chunk_size)
+                    ),
+                )
+                self.assertDictEqual(
+                    manifest["metadata"], read_manifest_metadata(manifest_path, chunk_size)
+                )
+
+    def test_numbers_split_between_chunks(self):
+        self.manifest_path.write_text('{"metadata":{"v":12.5,"w":-1E+3,"x":[0,true]}}')
+        for chunk_size in (1, 3, 11, 33):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertDictEqual(
+                    {"v": 12.5, "w": -1000.0, "x": [0, True]},
+                    read_manifest_metadata(self.manifest_path, chunk_size),
+                )
+
+    def test_read_metadata(self):
+        for manifest in (self.manifest, dict(reversed(list(self.manifest.items())))):
+            with open(self.manifest_path, "w") as f:
+                json.dump(manifest, f)
+            self.assertDictEqual(
+                self.manifest["metadata"], read_manifest_metadata(self.manifest_path, chunk_size=16)
+            )
+
+    def test_truncated_manifest(self):
+        self.manifest_path.write_text('{"metadata": {}, "nodes": {"model.a": {"name": ')
+        with self.assertRaises((DataPipelinesError, json.JSONDecodeError)):
+            list(iter_manifest_nodes(self.manifest_path))
+
+    def test_peak_memory(self):
+        """Benchmark: peak memory of streaming vs loading all of the manifest."""
+        nodes_count = 2000
+        with open(self.manifest_path, "w") as f:
+            json.dump(
+                {
+                    "metadata": {},
+                    "nodes": {
+                        f"model.project.model_{i}": {
+                            "resource_type": "model",
+                            "name": f"model_{i}",
+                            "raw_code": "select 1 as id\n" * 100,
+                            "columns": {"id": {"name": "id", "description": "ID"}},
+                        }
+                        for i in range(nodes_count)
+                    },
+                    "macros": {f"macro.m_{i}": {"macro_sql": "{{ x }}" * 200} for i in range(2000)},
+                },
+                f,
+            )
+
+        def _peak_memory(function):
+            tracemalloc.start()
+            try:
+                function()
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        def _load_all():
+            with open(self.manifest_path, "r") as f:
+                json.load(f)
+
+        def _stream():
+            models_count = sum(
+                1
+                for _ in iter_manifest_nodes(
+                    self.manifest_path, fields=["name"], chunk_size=1 << 16
+                )
+            )
+            self.assertEqual(nodes_count, models_count)
+
+        full_load_peak = _peak_memory(_load_all)
+        streaming_peak = _peak_memory(_stream)
+        self.assertLess(
+            streaming_peak * 10,
+            full_load_peak,
+            msg=f"Streaming peak: {streaming_peak} B, full load peak: {full_load_peak} B",
+        )
+
+
+class SlimManifestTestCase(unittest.TestCase):
+    manifest = {
+        "metadata": {"dbt_version": "1.7.3", "project_id": "abc", "env": {"KEY": "value"}},
+        "nodes": {
+            "model.project.first": {
+                "unique_id": "model.project.first",
+                "resource_type": "model",
+                "name": "first",
+                "package_name": "project",
+                "tags": ["daily"],
+                "raw_code": "select 1",
+                "config": {"materialized": "table", "persist_docs": {}},
+                "depends_on": {"macros": ["macro.m"], "nodes": ["source.project.raw.s"]},
+            },
+            "test.project.not_null": {
+                "unique_id": "test.project.not_null",
+                "resource_type": "test",
+                "name": "not_null",
+                "package_name": "project",
+                "tags": [],
+                "config": {"materialized": "test"},
+                "depends_on": {"macros": [], "nodes": ["model.project.first"]},
+            },
+        },
+        "sources": {
+            "source.project.raw.s": {
+                "unique_id": "source.project.raw.s",
+                "resource_type": "source",
+                "name": "s",
+                "source_name": "raw",
+                "package_name": "project",
+                "tags": [],
+                "columns": {"id": {}},
+            }
+        },
+        "macros": {"macro.m": {"macro_sql": "{{ x }}"}},
+    }
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = pathlib.Path(self.tmp_dir.name)
+        self.manifest_path = self.tmp_path.joinpath("manifest.json")
+        with open(self.manifest_path, "w") as f:
+            json.dump(self.manifest, f)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_build_slim_manifest(self):
+        self.assertDictEqual(
+            {
+                "metadata": {"dbt_version": "1.7.3", "project_id": "abc"},
+                "nodes": {
+                    "model.project.first": {
+                        "unique_id": "model.project.first",
+                        "name": "first",
+                        "resource_type": "model",
+                        "package_name": "project",
+                        "tags": ["daily"],
+                        "depends_on": {"nodes": ["source.project.raw.s"]},
+                        "config": {"materialized": "table"},
+                    },
+                    "test.project.not_null": {
+                        "unique_id": "test.project.not_null",
+                        "name": "not_null",
+                        "resource_type": "test",
+                        "package_name": "project",
+                        "tags": [],
+                        "depends_on": {"nodes": ["model.project.first"]},
+                        "config": {"materialized": "test"},
+                    },
+                },
+                "sources": {
+                    "source.project.raw.s": {
+                        "unique_id": "source.project.raw.s",
+                        "name": "s",
+                        "source_name": "raw",
+                        "resource_type": "source",
+                        "package_name": "project",
+                        "tags": [],
+                    }
+                },
+                "parent_map": {
+                    "model.project.first": ["source.project.raw.s"],
+                    "test.project.not_null": ["model.project.first"],
+                    "source.project.raw.s": [],
+                },
+                "child_map": {
+                    "model.project.first": ["test.project.not_null"],
+                    "test.project.not_null": [],
+                    "source.project.raw.s": ["model.project.first"],
+                },
+            },
+            build_slim_manifest(self.manifest_path, chunk_size=16),
+        )
+
+    def test_golden_manifest_maps(self):
+        manifest_path = goldens_dir_path.joinpath("target", "manifest.json")
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        slim_manifest = build_slim_manifest(manifest_path)
+
+        self.assertSetEqual(set(manifest["nodes"]), set(slim_manifest["nodes"]))
+        for unique_id, parents in slim_manifest["parent_map"].items():
+            self.assertListEqual(manifest["parent_map"][unique_id], parents)
+
+    def test_encodings_round_trip(self):
+        slim_manifest = build_slim_manifest(self.manifest_path)
+        for encoding in SLIM_MANIFEST_FILE_NAMES:
+            if encoding == "msgpack":
+                try:
+                    import msgpack  # noqa: F401
+                except ModuleNotFoundError:
+                    continue
+            with self.subTest(encoding=encoding):
+                path = write_slim_manifest(slim_manifest, self.tmp_path, encoding)
+                self.assertEqual(SLIM_MANIFEST_FILE_NAMES[encoding], path.name)
+                self.assertDictEqual(slim_manifest, read_slim_manifest(path))
+
+    def test_gzip_output_deterministic(self):
+        slim_manifest = build_slim_manifest(self.manifest_path)
+        first = write_slim_manifest(slim_manifest, self.tmp_path, "gzip").read_bytes()
+        time.sleep(1.1)
+        second = write_slim_manifest(slim_manifest, self.tmp_path, "gzip").read_bytes()
+        self.assertEqual(first, second)
+
+    @patch.dict("sys.modules", {"msgpack": None})
+    def test_msgpack_not_installed(self):
+        with self.assertRaises(DependencyNotInstalledError):
+            write_slim_manifest({}, self.tmp_path, "msgpack")
+
+    def test_parse_cost(self):
+        """Size and memory parsing the slim manifest takes vs the full one."""
+        with open(self.manifest_path, "w") as f:
+            json.dump(
+                {
+                    "metadata": {},
+                    "nodes": {
+                        f"model.project.model_{i}": {
+                            "unique_id": f"model.project.model_{i}",
+                            "resource_type": "model",
+                            "name": f"model_{i}",
+                            "raw_code": "select 1 as id\n" * 100,
+                            "columns": {"id": {"name": "id", "description": "ID"}},
+                            "config": {"materialized": "view"},
+                            "depends_on": {"nodes": [f"model.project.model_{i - 1}"]},
+                        }
+                        for i in range(2000)
+                    },
+                    "macros": {f"macro.m_{i}": {"macro_sql": "{{ x }}" * 200} for i in range(2000)},
+                },
+                f,
+            )
+        slim_manifest_path = write_slim_manifest(
+            build_slim_manifest(self.manifest_path), self.tmp_path
+        )
+
+        def _peak_memory(load):
+            tracemalloc.start()
+            try:
+                load()
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        def _load_full():
+            with open(self.manifest_path, "r") as f:
+                json.load(f)
+
+        full_peak = _peak_memory(_load_full)
+        slim_peak = _peak_memory(lambda: read_slim_manifest(slim_manifest_path))
+        self.assertLess(slim_manifest_path.stat().st_size * 10, self.manifest_path.stat().st_size)
+        self.assertLess(slim_peak * 3, full_peak, msg=f"Slim: {slim_peak} B, full: {full_peak} B")
@@ -0,0 +1,170 @@
+import io
+import pathlib
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from data_pipelines_cli.filesystem_utils import UPLOAD_KWARGS_KEY, LocalRemoteSync
+from data_pipelines_cli.rate_limiting import (
+    RateLimiter,
+    ThrottledReader,
+    TokenBucket,
+    is_throttling_error,
+)
+
+goldens_dir_path = pathlib.Path(__file__).parent.joinpath("goldens")
+
+
+class _HttpError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class _ClientError(Exception):
+    def __init__(self, error_code):
+        super().__init__(f"An error occurred ({error_code})")
+        self.response = {"Error": {"Code": error_code}}
+
+
+class ThrottlingErrorTestCase(unittest.TestCase):
+    def test_throttling_errors(self):
+        self.assertTrue(is_throttling_error(_HttpError(429)))
+        self.assertTrue(is_throttling_error(_ClientError("SlowDown")))
+        self.assertTrue(is_throttling_error(OSError("Please reduce your request rate: SlowDown")))
+        try:
+            try:
+                raise _ClientError("SlowDown")
+            except _ClientError as err:
+                raise OSError("Upload failed") from err
+        except OSError as err:
+            self.assertTrue(is_throttling_error(err))
+
+    def test_other_errors(self):
+        self.assertFalse(is_throttling_error(_HttpError(404)))
+        self.assertFalse(is_throttling_error(_ClientError("AccessDenied")))
+        self.assertFalse(is_throttling_error(FileNotFoundError("my_bucket/dag.py")))
+
+
+class TokenBucketTestCase(unittest.TestCase):
+    def test_rate(self):
+        bucket = TokenBucket(rate=200, capacity=10)
+        start_time = time.monotonic()
+        for _ in range(50):
+            bucket.acquire()
+        # 10 tokens at once, 40 more refilled at 200 per second
+        self.assertGreaterEqual(time.monotonic() - start_time, 0.18)
+
+    def test_amount_above_capacity(self):
+        bucket = TokenBucket(rate=1000)
+        self.assertEqual(0, bucket.acquire(1000))
+        self.assertAlmostEqual(0.5, bucket.acquire(500), delta=0.05)
+
+
+class RateLimiterTestCase(unittest.TestCase):
+    def test_retries_throttled_calls(self):
+        func = MagicMock(side_effect=[_HttpError(429), _ClientError("SlowDown"), "result"])
+        rate_limiter = RateLimiter(max_requests_per_second=1000, backoff=0)
+        self.assertEqual("result", rate_limiter.call(func, "path"))
+
+        self.assertEqual(3, func.call_count)
+        func.assert_called_with("path")
+        self.assertEqual(2, rate_limiter.throttled_count)
+        # Rates halved twice, then slightly recovered after the success
+        self.assertAlmostEqual(1000 * (1 / 4 + 1 / 32), rate_limiter._requests_bucket.rate)
+
+    def test_gives_up(self):
+        func = MagicMock(side_effect=_HttpError(429))
+        with self.assertRaises(_HttpError):
+            RateLimiter(max_retries=2, backoff=0).call(func)
+        self.assertEqual(3, func.call_count)
+
+    def test_other_errors_not_retried(self):
+        func = MagicMock(side_effect=FileNotFoundError("path"))
+        with self.assertRaises(FileNotFoundError):
+            RateLimiter(backoff=0).call(func)
+        self.assertEqual(1, func.call_count)
+
+    def test_bytes_charged_while_read(self):
+        rate_limiter = RateLimiter(max_bytes_per_second=100_000)
+        reader = ThrottledReader(io.BytesIO(b"x" * 130_000), rate_limiter)
+        start_time = time.monotonic()
+        read_times = []
+        for chunk in iter(lambda: reader.read(10_000), b""):
+            read_times.append(time.monotonic() - start_time)
+        # 100 000 bytes at once, then 10 000 bytes every 0.1 s
+        self.assertEqual(13, len(read_times))
+        self.assertLess(read_times[9], 0.05)
+        self.assertGreaterEqual(read_times[10], 0.09)
+        self.assertGreaterEqual(read_times[12], 0.28)
+
+    def test_bytes_charged_again(self):
+        rate_limiter = RateLimiter(max_bytes_per_second=1000)
+        reader = ThrottledReader(io.BytesIO(b"x" * 3000), rate_limiter)
+        with patch.object(rate_limiter, "acquire_bytes") as acquire_bytes_mock:
+            reader.read(1000)
+            reader.seek(0)
+            reader.read(1500)
+            reader.seek(0)
+            reader.read()
+        self.assertListEqual(
+            [1000, 1500, 3000], [call.args[0] for call in acquire_bytes_mock.call_args_list]
+        )
+
+    def test_throttled_upload_retried(self):
+        sync = LocalRemoteSync(
+            goldens_dir_path.joinpath("test_sync_directory"),
+            "memory://rate-limiting-retry-tests",
+            {UPLOAD_KWARGS_KEY: {"max_bytes_per_second": 1_000_000}},
+        )
+        sync.rate_limiter.backoff = 0
+        remote_open = sync.remote_fs.open
+        opened_files = []
+        throttled_chunks = []
+
+        def _throttled_write(data):
+            throttled_chunks.append(data)
+            raise _HttpError(429)
+
+        def _open(*args, **kwargs):
+            remote_file = remote_open(*args, **kwargs)
+            if not opened_files:
+                # Fail once the first chunk got read
+                remote_file.write = MagicMock(side_effect=_throttled_write)
+            opened_files.append(remote_file)
+            return remote_file
+
+        with patch.object(sync.remote_fs, "open", side_effect=_open), patch.object(
+            sync.rate_limiter, "acquire_bytes"
+        ) as acquire_bytes_mock:
+            sync.sync(delete=True)
+        local_size = sum(
+            path.stat().st_size
+            for path in goldens_dir_path.joinpath("test_sync_directory").glob("**/*")
+            if path.is_file()
+        )
+        # The chunk sent before throttling gets charged again once the upload is repeated
+        self.assertEqual(1, len(throttled_chunks))
+        self.assertEqual(
+            local_size + len(throttled_chunks[0]),
+            sum(call.args[0] for call in acquire_bytes_mock.call_args_list),
+        )
+        self.assertEqual(1, sync.rate_limiter.throttled_count)
+        sync.remote_fs.rm(sync.remote_path_str, recursive=True)
+
+    def test_sync_limited(self):
+        sync = LocalRemoteSync(
+            goldens_dir_path.joinpath("test_sync_directory"),
+            "memory://rate-limiting-tests",
+            {UPLOAD_KWARGS_KEY: {"max_bytes_per_second": 2000, "max_requests_per_second": 100}},
+        )
+        self.assertEqual(2000, sync.rate_limiter.max_bytes_per_second)
+        self.assertEqual(100, sync.rate_limiter.max_requests_per_second)
+
+        start_time = time.monotonic()
+        with patch("data_pipelines_cli.rate_limiting.echo_info") as echo_info_mock:
+            sync.sync(delete=True)
+        # 2619 bytes, 2000 of them at once
+        self.assertGreaterEqual(time.monotonic() - start_time, 0.25)
+        echo_info_mock.assert_called_once()
+        sync.remote_fs.rm(sync.remote_path_str, recursive=True)